@@ -0,0 +1,75 @@
+import threading
+from datetime import date, timedelta
+
+
+class DailyRollup:
+    """
+    날짜별 복약 집계 (이달의 복용 내역 달력용).
+    복용 완료가 일어날 때마다 그 날짜 항목만 갱신해 두고,
+    "원래 먹어야 하는 약"은 약 저장소의 복용 기간 구간 인덱스에서 조회할 때 그 달 날짜만큼만 계산한다.
+    (약 등록 때 복용 기간의 날짜마다 항목을 만들지 않으므로 days가 커도 등록 비용은 그대로)
+
+    날짜별 항목:
+    - taken: 실제로 먹은 (약 id, 시간대) 쌍
+    - has_evening_action: 저녁 버튼을 한 번이라도 눌렀는지
+    - records: 그날의 복용 기록 목록
+    """
+
+    def __init__(self, repository):
+        self._repository = repository  # MedicationRepository
+        self._lock = threading.Lock()
+        self._days = {}  # 'YYYY-MM-DD' -> 항목 dict
+
+    def _entry(self, date_str):
+        entry = self._days.get(date_str)
+        if entry is None:
+            entry = {
+                'taken': set(),
+                'has_evening_action': False,
+                'records': []
+            }
+            self._days[date_str] = entry
+        return entry
+
+    def add_history_record(self, record):
+        """복용 완료 시: 그날 항목의 taken/저녁 여부/기록 목록 갱신"""
+        with self._lock:
+            entry = self._entry(record['date'])
+            entry['records'].append(record)
+            entry['taken'].add((record['medication_id'], record['time']))
+            if record['time'] == '저녁':
+                entry['has_evening_action'] = True
+
+    def rebuild(self, history_records):
+        """복용 기록으로 집계를 처음부터 다시 만듦 (서버 시작 시 등)"""
+        with self._lock:
+            self._days.clear()
+        for record in history_records:
+            self.add_history_record(record)
+
+    def month(self, year, month):
+        """
+        해당 월의 (날짜별 복용 기록, 날짜별 O/X 상태)를 반환. 기록/상태가 없는 날짜는 키가 없음.
+        O/X는 먹어야 할 약이 있고 저녁 버튼을 누른 날만: 모두 먹었으면 O, 아니면 X
+        """
+        first = date(year, month, 1)
+        last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        required_by_day = self._repository.required_pairs_between(first, last)
+        daily_history = {}
+        daily_status = {}
+        current = first
+        with self._lock:
+            while current <= last:
+                date_str = current.isoformat()
+                entry = self._days.get(date_str)
+                if entry is not None:
+                    if entry['records']:
+                        daily_history[date_str] = list(entry['records'])
+                    required = required_by_day.get(date_str)
+                    if required and entry['has_evening_action']:
+                        daily_status[date_str] = 'O' if required.issubset(entry['taken']) else 'X'
+                current += timedelta(days=1)
+        return daily_history, daily_status
+
+    def __len__(self):
+        return len(self._days)
@@ -1,12 +1,39 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context, g
 from flask_cors import CORS
 import os
 import json
 import re
+import base64
+import sqlite3
+import binascii
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+import httpx
+import openai
 from openai import OpenAI
 
+from adherence import DailyRollup
+from blob_store import BlobStore, is_blob_hash
+from cache import LRUCache, DiskBackedCache, SingleFlight
+from chat_cache import ChatAnswerCache
+from history_index import HistoryDateIndex
+from http_cache import CollectionVersions, conditional_get
+from image_preprocess import preprocess_image
+from json_provider import create_json_provider
+from llm_backend import CassetteBackend, LatencyModel
+from llm_transport import CircuitOpenError, ResilientClient, RetryBudget, build_http_client
+from medication_store import MAX_COURSE_DAYS, MedicationRepository, registered_day, validate_medication
+from metrics import MetricsRegistry
+from ocr_jobs import OCRJobQueue, QueueFullError
+from pagination import RecordView, encode_cursor, parse_fields, parse_page_args, project
+from profiling import RequestProfiler, add_phase
+from receipt_parser import extract_table_medications, parse_medication_table
+from sqlite_store import SQLiteStore
+
 # .env 파일에서 환경변수 로드 (로컬 개발용)
 # Render 등 클라우드 배포 시에는 환경변수를 직접 설정하면 됩니다
 load_dotenv()
@@ -14,6 +41,72 @@ load_dotenv()
 app = Flask(__name__)
 CORS(app)  # CORS 허용
 
+# JSON 직렬화: auto(orjson이 설치되어 있으면 사용) / orjson / stdlib (json_provider.py 참고)
+JSON_PROVIDER = os.getenv("JSON_PROVIDER", "auto")
+app.json = create_json_provider(app, JSON_PROVIDER)
+
+# 메트릭 (GET /api/metrics, Prometheus 텍스트 형식. metrics.py 참고)
+metrics = MetricsRegistry(prefix='medicine_helper_')
+http_request_seconds = metrics.histogram(
+    'http_request_duration_seconds', 'Flask 엔드포인트별 응답 시간 (스트리밍은 첫 응답까지)',
+    ['endpoint', 'method', 'status']
+)
+llm_call_seconds = metrics.histogram(
+    'llm_call_duration_seconds', 'OpenAI 호출 위치별 걸린 시간 (재시도 포함)', ['call_site', 'outcome']
+)
+llm_tokens = metrics.counter('llm_tokens_total', 'OpenAI 응답의 토큰 사용량', ['call_site', 'kind'])
+llm_output_rejected = metrics.counter(
+    'llm_output_rejected_total', '모델 응답을 쓰지 못하고 다른 경로로 대체한 횟수 (JSON 파싱 실패 등)', ['stage', 'reason']
+)
+ocr_step_seconds = metrics.histogram('ocr_step_duration_seconds', 'OCR 처리 중 앱 안에서 하는 단계별 시간', ['step'])
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def observe_request_time(response):
+    started = g.get('request_started')
+    if started is not None:
+        http_request_seconds.observe(
+            time.perf_counter() - started,
+            endpoint=request.endpoint or 'unknown',
+            method=request.method,
+            status=response.status_code
+        )
+    return response
+
+
+def observe_llm_call(call_site, seconds, outcome, response):
+    """ResilientClient observer: 호출 시간 + 응답에 usage가 있으면 토큰 수 기록"""
+    llm_call_seconds.observe(seconds, call_site=call_site, outcome=outcome)
+    add_phase('llm', seconds)
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        llm_tokens.inc(usage.prompt_tokens or 0, call_site=call_site, kind='prompt')
+        llm_tokens.inc(usage.completion_tokens or 0, call_site=call_site, kind='completion')
+
+
+# 요청 프로파일링 (profiling.py 참고)
+# - PROFILE_ADMIN_TOKEN을 정하면 X-Profile 헤더에 같은 값을 보낸 요청만, PROFILE_SAMPLE_RATE를 정하면 그 비율만큼 프로파일링
+# - 결과는 PROFILE_DIR에 pstats(.prof) 또는 collapsed 스택(.collapsed.txt)으로 저장
+# - Server-Timing 헤더(parse/llm/compute/serialize)는 SERVER_TIMING=1일 때만 모든 응답에 붙임 (기본은 프로파일링한 요청에만)
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")
+PROFILE_OUTPUT = os.getenv("PROFILE_OUTPUT", "pstats")
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+request_profiler = RequestProfiler(
+    PROFILE_DIR,
+    sample_rate=PROFILE_SAMPLE_RATE,
+    admin_token=PROFILE_ADMIN_TOKEN,
+    output=PROFILE_OUTPUT,
+    server_timing=SERVER_TIMING
+)
+request_profiler.init_app(app)
+
 # 디버깅: 앱이 제대로 생성되었는지 확인
 print(f"[DEBUG] Flask 앱 생성됨: {app.name}")
 print(f"[DEBUG] Flask 앱 파일 위치: {__file__}")
@@ -21,27 +114,186 @@ print(f"[DEBUG] Flask 앱 파일 위치: {__file__}")
 # OpenAI API 키 설정
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-if not OPENAI_API_KEY:
+# LLM 백엔드 선택 (llm_backend.py 참고)
+# - openai: 실제 호출 / record: 실제 호출 + 카세트 녹화 / replay: 녹화된 카세트로만 응답 (오프라인 벤치마크용)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")
+LLM_CASSETTE_DIR = os.getenv("LLM_CASSETTE_DIR", "cassettes")
+LLM_REPLAY_LATENCY = os.getenv("LLM_REPLAY_LATENCY", "none")
+LLM_REPLAY_SEED = os.getenv("LLM_REPLAY_SEED")
+
+# OpenAI 전송 설정 (llm_transport.py 참고)
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+# 호출 위치별 타임아웃(초): Vision OCR은 길게, 채팅/설명은 짧게
+LLM_TIMEOUTS = {
+    'default': float(os.getenv("LLM_TIMEOUT_DEFAULT", "30")),
+    'ocr': float(os.getenv("LLM_TIMEOUT_OCR", "60")),
+    'extract': float(os.getenv("LLM_TIMEOUT_EXTRACT", "20")),
+    'chat': float(os.getenv("LLM_TIMEOUT_CHAT", "20")),
+    'descriptions': float(os.getenv("LLM_TIMEOUT_DESCRIPTIONS", "15")),
+}
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+LLM_RETRY_BUDGET_RATIO = float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.2"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+
+# 업스트림 장애로 보는 오류 (서킷 브레이커가 열렸거나 재시도 후에도 실패)
+UPSTREAM_ERRORS = (CircuitOpenError, openai.APIError)
+
+if LLM_BACKEND == 'replay':
+    client = CassetteBackend(
+        LLM_CASSETTE_DIR,
+        mode='replay',
+        latency=LatencyModel(LLM_REPLAY_LATENCY, seed=LLM_REPLAY_SEED)
+    )
+    print(f"[INFO] LLM 카세트 재생 모드입니다: {LLM_CASSETTE_DIR} (지연: {LLM_REPLAY_LATENCY})")
+elif not OPENAI_API_KEY:
     print("[경고] OPENAI_API_KEY 환경변수가 설정되지 않았습니다!")
     print("[경고] 챗봇, OCR, 약 설명 변환 기능이 작동하지 않습니다.")
     print("[경고] .env 파일을 생성하거나 환경변수를 설정해주세요.")
     client = None
 else:
-    client = OpenAI(api_key=OPENAI_API_KEY)
+    # 재시도는 ResilientClient가 담당하므로 라이브러리 자체 재시도는 끔
+    client = OpenAI(
+        api_key=OPENAI_API_KEY,
+        http_client=build_http_client(
+            max_connections=LLM_MAX_CONNECTIONS,
+            max_keepalive=LLM_MAX_KEEPALIVE,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+            connect_timeout=LLM_CONNECT_TIMEOUT
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUTS['default'], connect=LLM_CONNECT_TIMEOUT),
+        max_retries=0
+    )
     print("[INFO] OpenAI API 키가 설정되었습니다.")
+    if LLM_BACKEND == 'record':
+        client = CassetteBackend(LLM_CASSETTE_DIR, mode='record', inner=client)
+        print(f"[INFO] LLM 요청/응답을 녹화합니다: {LLM_CASSETTE_DIR}")
+
+if client is not None:
+    client = ResilientClient(
+        client,
+        LLM_TIMEOUTS,
+        max_attempts=LLM_MAX_ATTEMPTS,
+        budget=RetryBudget(ratio=LLM_RETRY_BUDGET_RATIO),
+        failure_threshold=LLM_BREAKER_FAILURES,
+        reset_timeout=LLM_BREAKER_RESET,
+        observer=observe_llm_call,
+        connect_timeout=LLM_CONNECT_TIMEOUT
+    )
 
 # 약 데이터 저장소 (실제로는 데이터베이스를 사용해야 함)
-medications_db = []
+# id 조회/발급과 이름·등록일 인덱스는 MedicationRepository가 담당
+medications_db = MedicationRepository()
+# 약 조회 응답에서 빼는 내부 필드 (이미지는 /api/medications/<id>/image로 받음)
+MEDICATION_INTERNAL_FIELDS = frozenset(['image_hash'])
 medication_history_db = []
+# 복용 기록 날짜 → 목록 위치 인덱스 (기간 조회용)
+history_date_index = HistoryDateIndex()
+
+# 날짜별 복약 집계 (이달의 복용 내역 달력용, 약 등록/복용 완료 때마다 갱신)
+daily_rollup = DailyRollup(medications_db)
 
 # 사용자 데이터 저장소
 users_db = []
 
+# 선택: SQLite 영구 저장 (DATABASE_PATH를 설정하면 재시작/재배포 후에도 데이터 유지)
+# 메모리 저장소는 그대로 읽기용으로 쓰고, 쓰기는 메모리와 SQLite에 함께 반영한다
+DATABASE_PATH = os.getenv("DATABASE_PATH")
+sqlite_store = SQLiteStore(DATABASE_PATH) if DATABASE_PATH else None
+
+# 조회 API 조건부 GET용: 데이터 묶음별 버전 (쓰기마다 증가) + ETag별 직렬화된 응답 본문 캐시
+collection_versions = CollectionVersions(['medications', 'history', 'users'])
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "256"))
+response_cache = LRUCache(maxsize=RESPONSE_CACHE_SIZE)
+
+
+def save_medications(medications):
+    """
+    약 여러 개를 한 번에 저장 + 관련 인덱스/집계 갱신 (약을 저장할 때는 항상 이 함수를 사용)
+    SQLite를 쓰면 트랜잭션 한 번으로 일괄 저장
+    복용 기간 값이 잘못된 약이 하나라도 있으면 아무것도 저장하지 않고 ValueError
+    """
+    for medication in medications:
+        validate_medication(medication)
+    try:
+        if sqlite_store:
+            try:
+                sqlite_store.insert_medications(medications)
+            except sqlite3.IntegrityError:
+                # 다른 워커가 같은 id로 먼저 저장함: DB의 가장 큰 id 뒤에서 새 id를 받아 한 번 더 시도
+                # (다시 겹치면 그대로 오류. 기존 기록을 덮어쓰지는 않음)
+                medications_db.reserve_ids_through(sqlite_store.max_id('medications'))
+                for medication in medications:
+                    medication['id'] = medications_db.next_id()
+                sqlite_store.insert_medications(medications)
+        medications_db.add_many(medications)
+    finally:
+        # 중간에 실패해도 일부가 저장됐을 수 있으므로 캐시된 응답은 항상 무효화
+        collection_versions.bump('medications')
+    return medications
+
+
+def save_medication(medication):
+    return save_medications([medication])[0]
+
+
+def save_history_records(records):
+    """복용 기록 저장 + 날짜별 집계 갱신"""
+    try:
+        if sqlite_store:
+            sqlite_store.insert_history_records(records)
+        history_date_index.append(medication_history_db, records)
+        for record in records:
+            daily_rollup.add_history_record(record)
+    finally:
+        collection_versions.bump('history')
+    return records
+
+
+def next_user_id():
+    # 사용자는 id 순서대로 덧붙이므로 마지막 사용자 id 다음 번호
+    return users_db[-1]['id'] + 1 if users_db else 1
+
+
+def save_user(user):
+    if sqlite_store:
+        try:
+            sqlite_store.insert_user(user)
+        except sqlite3.IntegrityError:
+            # 다른 워커가 같은 id로 먼저 저장함 (약과 같은 방식으로 한 번만 다시 시도)
+            user['id'] = sqlite_store.max_id('users') + 1
+            sqlite_store.insert_user(user)
+    users_db.append(user)
+    collection_versions.bump('users')
+    return user
+
+
+def load_from_sqlite():
+    """서버 시작 시 SQLite에 저장된 데이터를 메모리 저장소/집계로 불러옴"""
+    medications_db.add_many(sqlite_store.load_medications())
+    medication_history_db.extend(sqlite_store.load_history())
+    history_date_index.rebuild(medication_history_db)
+    users_db.extend(sqlite_store.load_users())
+    daily_rollup.rebuild(medication_history_db)
+    collection_versions.bump('medications', 'history', 'users')
+    print(f"[INFO] SQLite에서 불러옴: 약 {len(medications_db)}개, 복용 기록 {len(medication_history_db)}개, 사용자 {len(users_db)}명")
+
+
+if sqlite_store:
+    load_from_sqlite()
+
+
 # 이미지 저장 디렉토리
 UPLOAD_FOLDER = 'uploads'
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
+# 약봉투 사진은 내용 해시 이름으로 한 번만 저장 (약 기록에는 해시만 보관)
+blob_store = BlobStore(os.path.join(UPLOAD_FOLDER, 'blobs'))
+
 
 def safe_int(value, default):
     """
@@ -65,93 +317,72 @@ def safe_int(value, default):
     except Exception:
         return default
 
-# -------- 표 한 줄을 "약 1개"로 보는 매우 느슨한 파서 --------
+# 약 이름별 설명 캐시 (메모리 LRU + 디스크)
+# temperature=0.0이라 같은 이름이면 결과가 같으므로, 처음 보는 이름만 모델에 보낸다
+DESCRIPTION_PROMPT_VERSION = "1"
+DESCRIPTION_CACHE_PATH = os.getenv("DESCRIPTION_CACHE_PATH", os.path.join('cache', 'descriptions.sqlite3'))
+DESCRIPTION_CACHE_SIZE = int(os.getenv("DESCRIPTION_CACHE_SIZE", "1024"))
+description_cache = DiskBackedCache(DESCRIPTION_CACHE_PATH, maxsize=DESCRIPTION_CACHE_SIZE)
+# 같은 약 이름 목록을 동시에 요청하면 (가족이 여러 기기에서 동시에 열 때 등) 모델 호출 1번으로 합침
+description_flight = SingleFlight()
 
-def parse_medication_line(line):
-    """
-    영수증 표의 한 줄을 가능한 한 '약 1개'로 해석한다.
-    - 숫자가 없어도 이름만 있으면 약으로 취급
-    - 숫자가 여러 개 있으면 마지막 두 개를 (1일 복용횟수, 복용일수)로 가정
-    """
-    line = line.strip()
-    if not line:
-        return None
-    # 거의 숫자/원/콤마만 있으면 건너뛰기
-    if re.fullmatch(r'[\d\s,\.원]+', line):
-        return None
-    # 약 이름: 처음으로 "공백 + 숫자"가 등장하기 전까지를 이름으로 사용
-    m = re.search(r'\s+\d+(\s|$)', line)
-    if m:
-        name = line[:m.start()].strip()
-    else:
-        name = line.strip()
-    # 맨 끝의 숫자 두 개를 dosage/days로 사용 (없으면 None)
-    nums = re.findall(r'\d+', line)
-    dosage = days = None
-    if len(nums) >= 2:
-        dosage = safe_int(nums[-2], None)
-        days = safe_int(nums[-1], None)
-    # 이름 후처리: 뒤에 붙은 "250mg", "500ML" 같은 건 잘라냄
-    name = re.sub(r'\s*\d+\s*(mg|MG|ml|ML)\b.*$', '', name).strip()
-    if not name:
-        return None
-    return {
-        "name": name,
-        "dosage": dosage,
-        "days": days,
-        "before_meal": None,
-        "times": []
-    }
 
-def extract_table_medications(raw_text):
-    """
-    약봉투 영수증 하단 표(약품명 / 투약량 / 횟수 / 일수)를
-    최대한 느슨하게 파싱해서 약 목록을 뽑아낸다.
-    - 숫자가 없어도 이름만 있으면 약으로 취급
-    - 사업자명/금액/성명/주소/유효기간 같은 건 강하게 제외
-    """
-    meds = []
-    if not raw_text:
-        return meds
-    lines = [l.strip() for l in raw_text.splitlines()]
-    # 1) 헤더 줄(약품명, 투약량, 횟수, 일수 등)을 찾는다. 못 찾으면 전체 텍스트를 대상으로.
-    header_idx = None
-    for i, line in enumerate(lines):
-        if ('약품' in line or '약 품' in line) and any(k in line for k in ['횟수', '일수', '투약', '투약량']):
-            header_idx = i + 1
-            break
-    if header_idx is None:
-        header_idx = 0
-    # 2) 명백히 약이 아닌 줄은 제외
-    skip_keywords = [
-        '사업자', '등록번호', '요양기관', '성명', '환자', '연락처', '전화', 'TEL',
-        '주소', '대구광역시', '광역시', '구 ', '동 ', '합계', '총 수 납', '총수납',
-        '요양급여', '본인부담', '영수증', '카드', '현금', '처방전', '조제', '조제료',
-        '사용상', '주의사항', '주의 하세요', '보험', '발행일', '금액', '총액',
-        '유효기간', '유효 사용기간', '유효사용기간', '유효 사용 기한', '주사액'
-    ]
-    for line in lines[header_idx:]:
-        if not line:
-            continue
-        # 유효기간/주의사항이 나오면 표가 끝났다고 보고 탈출
-        if any(k in line for k in ['유효기간', '유효사용기간', '유효 사용기간', '사용상 주의사항']):
-            break
-        if any(k in line for k in skip_keywords):
-            continue
-        parsed = parse_medication_line(line)
-        if not parsed:
-            continue
-        meds.append(parsed)
-    return meds
+def description_cache_key(name):
+    return f"{DESCRIPTION_PROMPT_VERSION}:{name.strip()}"
+
 
 def generate_descriptions_for_names(medication_names):
     """
     약 이름 리스트를 받아서 각 약에 대한 간단한 모양/색 설명을 한 줄씩 생성.
-    - 같은 입력이면 항상 같은 결과가 나오도록 temperature=0.0 사용
-    - 반환값: 약 개수와 동일한 길이의 문자열 리스트
+    - 이름별 캐시에 있는 약은 재사용하고, 없는 약만 모델에 요청
+    - 반환값: 약 개수와 동일한 길이의 문자열 리스트 (입력 순서 유지)
     """
     if not client or not medication_names:
         return [""] * len(medication_names)
+    keys = [description_cache_key(str(n)) for n in medication_names]
+    cached = description_cache.get_many(set(keys))
+
+    # 캐시에 없는 이름만 (중복 제거, 입력 순서 유지) 모델에 요청
+    missing_names = []
+    missing_keys = set()
+    for name, key in zip(medication_names, keys):
+        if key not in cached and key not in missing_keys:
+            missing_keys.add(key)
+            missing_names.append(str(name))
+
+    if missing_names:
+        flight_key = tuple(description_cache_key(name) for name in missing_names)
+        with ocr_step_seconds.time(step='descriptions'):
+            new_entries, _ = description_flight.do(flight_key, lambda: fetch_descriptions(missing_names))
+        cached.update(new_entries)
+    return [cached.get(key, "") for key in keys]
+
+
+def cached_descriptions_for_names(medication_names):
+    """모델을 부르지 않고 캐시에 있는 설명만 (없는 약은 빈 문자열, 입력 순서 유지)"""
+    keys = [description_cache_key(str(n)) for n in medication_names]
+    cached = description_cache.get_many(set(keys))
+    return [cached.get(key, "") for key in keys]
+
+
+def fetch_descriptions(missing_names):
+    """캐시에 없는 약들의 설명을 모델에 요청하고 {캐시 키: 설명}을 반환"""
+    lines, complete = request_descriptions(missing_names)
+    new_entries = {}
+    for name, desc in zip(missing_names, lines):
+        new_entries[description_cache_key(name)] = desc
+    # 모델이 일부 약을 생략하면 줄과 이름의 대응이 어긋날 수 있으므로 저장하지 않는다
+    if complete:
+        description_cache.set_many(new_entries)
+    return new_entries
+
+
+def request_descriptions(medication_names):
+    """
+    모델에 약 설명을 한 번에 요청.
+    - 같은 입력이면 항상 같은 결과가 나오도록 temperature=0.0 사용
+    - 반환값: (약 개수와 같은 길이의 문자열 리스트, 모든 약에 설명이 나왔는지 여부)
+    """
     names_str = ', '.join(medication_names)
     num_meds = len(medication_names)
     prompt = f"""
@@ -179,6 +410,7 @@ def generate_descriptions_for_names(medication_names):
 
 """
     response = client.chat.completions.create(
+        call_site='descriptions',
         model="gpt-4o-mini",
         messages=[
             {
@@ -210,10 +442,84 @@ def generate_descriptions_for_names(medication_names):
     description = re.sub(r'\n{3,}', '\n\n', description)
     description = description.strip()
     lines = [line.strip() for line in description.splitlines() if line.strip()]
+    complete = len(lines) == len(medication_names)
     # 약 개수만큼 맞춰서 리턴
     if len(lines) < len(medication_names):
         lines += [""] * (len(medication_names) - len(lines))
-    return lines[:len(medication_names)]
+    return lines[:len(medication_names)], complete
+
+
+CHAT_MODEL = "gpt-4o-mini"
+CHAT_SYSTEM_PROMPT = (
+    "당신은 고령층을 위한 약 복용 도우미 챗봇입니다. "
+    "친절하고 간단한 언어로 짧게 답변해주세요. "
+    "약 복용, 복약 내역, 약 검색 등에 대해 도움을 드립니다. "
+    "증상 진단이나 병명 추정은 절대 하지 말고, "
+    "필요 시에는 의사·약사 상담을 권유하세요. "
+    "마크다운 문법(**, *, _, - 등)을 사용하지 말고 순수 텍스트만 반환하세요."
+)
+
+
+# OpenAI 장애로 답을 만들 수 없을 때 보내는 안내 문구
+CHAT_DEGRADED_ANSWER = "지금은 답변을 만들기 어려워요. 잠시 후 다시 물어봐 주세요. 급하신 내용은 약사나 의사에게 문의해 주세요."
+
+
+# 자주 묻는 질문 답변 캐시 (띄어쓰기/문장부호/조사 차이는 같은 질문으로 봄)
+# CHAT_CACHE_MODE: off(사용 안 함) / on(TTL 동안 재사용) / pinned(temperature 0 답변을 고정)
+chat_cache = ChatAnswerCache(
+    mode=os.getenv("CHAT_CACHE_MODE", "on"),
+    maxsize=int(os.getenv("CHAT_CACHE_SIZE", "512")),
+    ttl=int(os.getenv("CHAT_CACHE_TTL", str(6 * 60 * 60)))
+)
+
+
+def chat_completion_kwargs(user_message):
+    temperature = chat_cache.temperature
+    return {
+        "call_site": "chat",
+        "model": CHAT_MODEL,
+        "messages": [
+            {
+                "role": "system",
+                "content": CHAT_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": user_message
+            }
+        ],
+        "temperature": 0.7 if temperature is None else temperature,
+        "max_tokens": 500
+    }
+
+
+def clean_chat_text(text):
+    """마크다운 문법 제거 및 줄바꿈 정리"""
+    text = text.replace('**', '').replace('*', '').replace('_', '')
+    return re.sub(r'\n{3,}', '\n\n', text)
+
+
+class StreamingTextCleaner:
+    """
+    clean_chat_text와 같은 정리를 토큰 조각 단위로 적용.
+    '*', '_'는 조각마다 지우면 되고, 줄바꿈은 조각 경계를 넘어 연속 개수를 세서 2개까지만 남긴다.
+    """
+
+    def __init__(self):
+        self.newline_run = 0
+
+    def feed(self, chunk):
+        chunk = chunk.replace('*', '').replace('_', '')
+        out = []
+        for ch in chunk:
+            if ch == '\n':
+                self.newline_run += 1
+                if self.newline_run > 2:
+                    continue
+            else:
+                self.newline_run = 0
+            out.append(ch)
+        return ''.join(out)
 
 
 @app.route('/api/chat', methods=['POST'])
@@ -230,45 +536,793 @@ def chat():
         
         if not user_message:
             return jsonify({'error': '메시지가 필요합니다.'}), 400
+
+        # 자주 묻는 질문이면 캐시된 답변으로 바로 응답
+        cached_answer = chat_cache.get(user_message)
+        if cached_answer is not None:
+            return jsonify({
+                'response': cached_answer,
+                'cached': True
+            })
         
         # GPT API 호출
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "당신은 고령층을 위한 약 복용 도우미 챗봇입니다. "
-                        "친절하고 간단한 언어로 짧게 답변해주세요. "
-                        "약 복용, 복약 내역, 약 검색 등에 대해 도움을 드립니다. "
-                        "증상 진단이나 병명 추정은 절대 하지 말고, "
-                        "필요 시에는 의사·약사 상담을 권유하세요. "
-                        "마크다운 문법(**, *, _, - 등)을 사용하지 말고 순수 텍스트만 반환하세요."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": user_message
-                }
-            ],
-            temperature=0.7,
-            max_tokens=500
-        )
+        response = client.chat.completions.create(**chat_completion_kwargs(user_message))
         
-        bot_response = response.choices[0].message.content
-        # 마크다운 문법 제거 및 줄바꿈 정리
-        bot_response = bot_response.replace('**', '').replace('*', '').replace('_', '')
-        bot_response = re.sub(r'\n{3,}', '\n\n', bot_response)
+        bot_response = clean_chat_text(response.choices[0].message.content)
+        chat_cache.set(user_message, bot_response)
         
         return jsonify({
             'response': bot_response
         })
+
+    except UPSTREAM_ERRORS as e:
+        # 업스트림 장애: 오래 기다리지 않고 안내 문구로 바로 응답
+        print(f"챗봇 업스트림 오류: {str(e)}")
+        return jsonify({
+            'response': CHAT_DEGRADED_ANSWER,
+            'degraded': True
+        })
         
     except Exception as e:
         print(f"챗봇 오류: {str(e)}")
         return jsonify({'error': f'챗봇 응답 생성 중 오류가 발생했습니다: {str(e)}'}), 500
 
 
+def sse_event(data, event=None):
+    """
+    server-sent events 한 건 (data는 JSON으로 직렬화)
+    응답과 같은 JSON provider를 거치므로 RecordView 같은 읽기 전용 뷰도 그대로 넣을 수 있다
+    """
+    payload = app.json.dumps(data, ensure_ascii=False)
+    if event:
+        return f"event: {event}\ndata: {payload}\n\n"
+    return f"data: {payload}\n\n"
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    챗봇 응답을 server-sent events로 스트리밍 (첫 토큰부터 바로 전송)
+    - data: {"delta": "..."}  토큰 조각 (마크다운 제거 적용)
+    - event: done, data: {"response": "전체 답변"}
+    - event: error, data: {"error": "..."}
+    요청 형식은 /api/chat과 같음
+    """
+    if not client:
+        return jsonify({'error': 'OpenAI API 키가 설정되지 않았습니다. 환경변수 OPENAI_API_KEY를 설정해주세요.'}), 500
+
+    data = request.json or {}
+    user_message = data.get('message', '')
+    if not user_message:
+        return jsonify({'error': '메시지가 필요합니다.'}), 400
+
+    cached_answer = chat_cache.get(user_message)
+
+    def generate():
+        if cached_answer is not None:
+            # 캐시된 답변은 한 번에 보냄
+            yield sse_event({'delta': cached_answer})
+            yield sse_event({'response': cached_answer, 'cached': True}, event='done')
+            return
+        cleaner = StreamingTextCleaner()
+        parts = []
+        try:
+            stream = client.chat.completions.create(stream=True, **chat_completion_kwargs(user_message))
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                text = cleaner.feed(delta)
+                if text:
+                    parts.append(text)
+                    yield sse_event({'delta': text})
+            bot_response = ''.join(parts)
+            chat_cache.set(user_message, bot_response)
+            yield sse_event({'response': bot_response}, event='done')
+        except UPSTREAM_ERRORS as e:
+            print(f"챗봇 스트리밍 업스트림 오류: {str(e)}")
+            if not parts:
+                yield sse_event({'delta': CHAT_DEGRADED_ANSWER})
+            yield sse_event({'response': ''.join(parts) or CHAT_DEGRADED_ANSWER, 'degraded': True}, event='done')
+        except Exception as e:
+            print(f"챗봇 스트리밍 오류: {str(e)}")
+            yield sse_event({'error': f'챗봇 응답 생성 중 오류가 발생했습니다: {str(e)}'}, event='error')
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+# -------- OCR 파이프라인 (단계별 함수) --------
+
+OCR_MODEL = "gpt-4o"  # Vision 지원 모델
+EXTRACT_MODEL = "gpt-4o-mini"
+# 프롬프트/모델을 바꾸면 이 값을 올려서 예전 캐시 결과를 무효화
+OCR_PIPELINE_VERSION = "2"
+
+# 같은 약봉투 사진을 다시 올리면 OpenAI 호출 없이 바로 응답하기 위한 캐시
+# (디코딩한 이미지 바이트 해시 + 파이프라인 버전 → 1단계 OCR 텍스트, 2단계 파싱 결과)
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", "128"))
+OCR_CACHE_TTL = int(os.getenv("OCR_CACHE_TTL", str(24 * 60 * 60)))
+ocr_cache = LRUCache(maxsize=OCR_CACHE_SIZE, ttl=OCR_CACHE_TTL)
+ocr_flight = SingleFlight()
+
+# Vision OCR에 보내기 전 사진 전처리 (EXIF 회전, 크기 축소, 선택: 흑백/약봉투 영역 자르기)
+OCR_PREPROCESS = os.getenv("OCR_PREPROCESS", "1") == "1"
+OCR_MAX_EDGE = int(os.getenv("OCR_MAX_EDGE", "1600"))
+OCR_GRAYSCALE = os.getenv("OCR_GRAYSCALE", "0") == "1"
+OCR_CROP = os.getenv("OCR_CROP", "0") == "1"
+OCR_JPEG_QUALITY = int(os.getenv("OCR_JPEG_QUALITY", "85"))
+
+
+def preprocess_settings():
+    if not OCR_PREPROCESS:
+        return "raw"
+    return f"edge={OCR_MAX_EDGE},gray={int(OCR_GRAYSCALE)},crop={int(OCR_CROP)},q={OCR_JPEG_QUALITY}"
+
+
+def ocr_cache_key(image_hash):
+    """
+    이미지 내용 기반 캐시 키.
+    base64 문자열이 아니라 디코딩한 바이트의 해시(블롭 저장소 해시)를 쓰므로,
+    헤더/줄바꿈 차이가 있어도 같은 사진이면 같은 키가 나온다.
+    전처리/2단계 방식 설정이 바뀌면 결과도 달라질 수 있으므로 키에 포함한다.
+    """
+    key_source = (
+        f"{OCR_PIPELINE_VERSION}|{OCR_PIPELINE_MODE}|{OCR_MODEL}|{EXTRACT_MODEL}|"
+        f"{OCR_EXTRACT_MODE}:{OCR_LOCAL_CONFIDENCE}|"
+        f"{preprocess_settings()}|{image_hash}"
+    )
+    return hashlib.sha256(key_source.encode('utf-8')).hexdigest()
+
+
+def prepare_vision_image(image_hash):
+    """
+    Vision OCR에 보낼 base64 이미지와 전처리 통계를 반환.
+    블롭 저장소에 이미 저장된 파일을 Pillow로 한 번만 열어서 처리하고,
+    전처리가 꺼져 있거나 실패하거나 오히려 커지면 원본을 그대로 사용한다.
+    base64 인코딩은 여기서(요청을 만들 때) 한 번만 한다.
+    """
+    if not OCR_PREPROCESS:
+        return blob_store.read_base64(image_hash), None
+    path = blob_store.path(image_hash)
+    original_bytes = os.path.getsize(path)
+    try:
+        with ocr_step_seconds.time(step='preprocess'):
+            processed, stats = preprocess_image(
+                path,
+                max_edge=OCR_MAX_EDGE,
+                grayscale=OCR_GRAYSCALE,
+                crop=OCR_CROP,
+                quality=OCR_JPEG_QUALITY
+            )
+    except Exception as e:
+        print("[OCR] 이미지 전처리 실패, 원본을 사용합니다:", e)
+        return blob_store.read_base64(image_hash), None
+    stats['original_bytes'] = original_bytes
+    unchanged = stats['original_format'] == 'JPEG' and stats['processed_size'] == stats['original_size']
+    if unchanged and stats['processed_bytes'] >= original_bytes:
+        stats['used'] = False
+        stats['bytes_saved'] = 0
+        return blob_store.read_base64(image_hash), stats
+    stats['used'] = True
+    stats['bytes_saved'] = original_bytes - stats['processed_bytes']
+    print(f"[OCR] 전처리: {stats['original_size']} → {stats['processed_size']}, "
+          f"{original_bytes:,} → {stats['processed_bytes']:,} bytes ({stats['elapsed_ms']}ms)")
+    return base64.b64encode(processed).decode('ascii'), stats
+
+
+def run_ocr_stage(image_base64):
+    """1단계: 이미지 → 전체 텍스트"""
+    ocr_response = client.chat.completions.create(
+        call_site='ocr',
+        model=OCR_MODEL,
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "당신은 OCR 엔진입니다. "
+                    "주어진 약봉투 사진에서 사람이 읽을 수 있는 모든 글자를 가능한 한 많이 그대로 적어주세요. "
+                    "줄바꿈도 대략적으로 유지하려고 노력하고, 글자가 애매하면 보이는 대로 추측해서 한글/숫자를 적어도 됩니다. "
+                    "중요: 요약, 해석, 설명, 번역을 하지 말고, 이미지에서 읽은 텍스트를 그대로 적어주세요. "
+                    "문장이 끊기거나 철자가 조금 이상해도 괜찮습니다. "
+                    "오직 이미지에서 읽은 텍스트만 출력하세요."
+                )
+            },
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": "이 약봉투에서 보이는 글자를 전부 그대로 적어주세요."
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{image_base64}"
+                        }
+                    }
+                ]
+            }
+        ],
+        temperature=0.0,
+        max_tokens=1200
+    )
+    ocr_text = ocr_response.choices[0].message.content.strip()
+    # 혹시 모를 코드블록 제거
+    if ocr_text.startswith("```"):
+        ocr_text = re.sub(r'^```(?:[a-zA-Z]+)?', '', ocr_text).strip()
+        ocr_text = re.sub(r'```$', '', ocr_text).strip()
+    return ocr_text
+
+
+# 약 정보 추출 규칙 (2단계 추출 프롬프트와 한 번에 처리하는 OCR 프롬프트가 같이 사용)
+EXTRACT_RULES = (
+    "중요 규칙:\n"
+    "- 약 이름은 OCR 텍스트에 실제로 등장하는 단어들만 사용하세요. 텍스트에 없는 새로운 약 이름을 새로 만들지 마세요.\n"
+    "- 철자가 조금 틀리거나 몇 글자가 빠져도 괜찮습니다. 보이는 대로 최대한 비슷하게 적으세요.\n"
+    "- \"1일 1회\", \"하루 1번\" → dosage: 1 로 설정합니다.\n"
+    "- \"1일 2회\" → dosage: 2 로 설정합니다.\n"
+    "- \"1일 3회\" → dosage: 3 으로 설정합니다.\n"
+    "- \"3일분\", \"7일분\" 처럼 되어 있으면 안의 숫자만 뽑아서 days에 정수로 넣으세요.\n"
+    "- 복용 횟수나 일수가 텍스트에서 전혀 보이지 않으면 해당 필드는 null로 두세요.\n"
+    "- before_meal은 식전/식후/공복 등 정보가 보일 때만 true/false로 설정하고, 전혀 없으면 null로 두어도 됩니다.\n"
+    "- 여러 약이 적혀 있다면 medications 배열에 약마다 하나씩 객체를 넣으세요.\n"
+    "- 약이 하나도 확실하지 않으면 medications는 빈 배열 [] 로 두고, name도 null로 두세요.\n"
+    "- 가능한 한 버리지 말고, 애매해도 약 이름으로 보이는 것은 최대한 살려서 넣으세요.\n"
+    "- 특히 표 형태로 \"약품명 / 1회투약량 / 1일 투약횟수 / 투약일수\" 와 같은 구조가 보이면,\n"
+    "  그 표의 각 행을 반드시 하나의 약 객체로 만들어야 합니다.\n"
+    "  예를 들어 다음과 같이 보인다면:\n"
+    "    약품명            1회투약량   1일투약횟수  투약일수\n"
+    "    시클러캡슐250mg      1           3          3일분\n"
+    "    아세틸캡슐           1           3          3일분\n"
+    "    코푸정               1           3          3일분\n"
+    "    염산알마게이트정500  1           3          3일분\n"
+    "  medications 배열에는 시클러캡슐, 아세틸캡슐, 코푸정, 염산알마게이트정500 이 네 개의 객체가 모두 들어가야 합니다.\n"
+    "- 한 행(첫 번째 약)만 추출하지 말고, 표에 있는 모든 행을 빠짐없이 추출하세요.\n\n"
+)
+
+EXTRACT_SYSTEM_PROMPT = (
+    "당신은 한국 약봉투 인식 및 정보 추출 전문가입니다.\n"
+    "아래는 OCR로 추출한 원문 텍스트입니다. 이 텍스트 안에서 약 정보를 찾아 JSON으로 정리하세요.\n\n"
+    "요구 스키마(반드시 이 키들을 사용해야 합니다):\n"
+    "{\n"
+    "  \"raw_text\": \"OCR로 읽은 전체 텍스트 문자열\",\n"
+    "  \"name\": \"첫 번째 약 이름 또는 null\",\n"
+    "  \"dosage\": 1일 복용 횟수(정수 또는 null),\n"
+    "  \"days\": 총 복용 일수(정수 또는 null),\n"
+    "  \"before_meal\": true 또는 false 또는 null,\n"
+    "  \"times\": [\"아침\", \"점심\", \"저녁\"] 중 일부 또는 빈 배열,\n"
+    "  \"medications\": [\n"
+    "    {\n"
+    "      \"name\": \"약 이름 문자열 또는 null\",\n"
+    "      \"dosage\": 1일 복용 횟수(정수 또는 null),\n"
+    "      \"days\": 총 복용 일수(정수 또는 null),\n"
+    "      \"before_meal\": true 또는 false 또는 null,\n"
+    "      \"times\": [\"아침\", \"점심\", \"저녁\"] 중 일부 또는 빈 배열\n"
+    "    }\n"
+    "  ]\n"
+    "}\n\n"
+) + EXTRACT_RULES + (
+    "출력 형식(매우 중요):\n"
+    "- 오직 하나의 JSON 객체만 출력하세요.\n"
+    "- JSON 바깥에 다른 설명, 문장, 주석, 텍스트는 절대 쓰지 마세요.\n"
+    "- JSON은 표준 형식을 지키고, 마지막 원소 뒤에 쉼표(,)를 두지 마세요.\n"
+)
+
+
+# 2단계(텍스트 → JSON) 방식
+# - llm  : 항상 EXTRACT_MODEL로 추출
+# - auto : 표 직접 파싱 신뢰도가 OCR_LOCAL_CONFIDENCE 이상이면 LLM 호출 없이 그 결과를 사용
+OCR_EXTRACT_MODE = os.getenv("OCR_EXTRACT_MODE", "auto")
+OCR_LOCAL_CONFIDENCE = float(os.getenv("OCR_LOCAL_CONFIDENCE", "0.8"))
+if OCR_EXTRACT_MODE not in ('llm', 'auto'):
+    print(f"[경고] 알 수 없는 OCR_EXTRACT_MODE '{OCR_EXTRACT_MODE}', 'auto'로 사용합니다.")
+    OCR_EXTRACT_MODE = 'auto'
+
+# 2단계가 어느 경로로 처리됐는지 횟수
+# local: LLM 생략, llm: 항상 LLM 모드, llm_fallback: 신뢰도 부족,
+# structured: 한 번에 처리(single), structured_fallback: single 응답이 잘못되어 두 단계로 다시 처리
+# local_degraded: 추출 모델 장애로 표 직접 파싱 결과를 대신 사용
+extract_path_counts = {
+    'local': 0, 'llm': 0, 'llm_fallback': 0, 'structured': 0, 'structured_fallback': 0, 'local_degraded': 0
+}
+extract_path_lock = threading.Lock()
+
+
+def count_extract_path(path):
+    with extract_path_lock:
+        extract_path_counts[path] += 1
+
+
+def extract_medication_info(ocr_text):
+    """
+    2단계 실행. 잘 정리된 약국 영수증처럼 표 직접 파싱 신뢰도가 높으면
+    LLM 왕복 없이 표 결과를 medication_info 형태로 바로 사용한다.
+    반환값: (medication_info, {"path", "confidence"})
+    """
+    with ocr_step_seconds.time(step='table_parse'):
+        table_meds, confidence = parse_medication_table(ocr_text)
+    if OCR_EXTRACT_MODE == 'auto' and confidence >= OCR_LOCAL_CONFIDENCE:
+        count_extract_path('local')
+        medication_info = {"raw_text": ocr_text, "medications": table_meds}
+        return medication_info, {"path": "local", "confidence": confidence}
+    count_extract_path('llm' if OCR_EXTRACT_MODE == 'llm' else 'llm_fallback')
+    try:
+        return run_extract_stage(ocr_text), {"path": "llm", "confidence": confidence}
+    except UPSTREAM_ERRORS as e:
+        # 추출 모델 장애: 신뢰도가 낮아도 표 직접 파싱 결과로 응답
+        print(f"[OCR] 추출 단계 업스트림 오류, 표 직접 파싱 결과를 사용합니다: {e}")
+        count_extract_path('local_degraded')
+        medication_info = {"raw_text": ocr_text, "medications": table_meds}
+        return medication_info, {"path": "local_degraded", "confidence": confidence}
+
+
+def extract_stats():
+    with extract_path_lock:
+        stats = dict(extract_path_counts)
+    stats['mode'] = OCR_EXTRACT_MODE
+    stats['pipeline'] = OCR_PIPELINE_MODE
+    stats['threshold'] = OCR_LOCAL_CONFIDENCE
+    return stats
+
+
+def run_extract_stage(ocr_text):
+    """2단계: 텍스트 → 약 정보 JSON 추출 (파싱 실패 시 빈 dict)"""
+    extract_user = (
+        "다음은 OCR로 읽은 원문 텍스트입니다:\n\n"
+        "----- OCR TEXT START -----\n"
+        f"{ocr_text}\n"
+        "----- OCR TEXT END -----\n\n"
+        "위 텍스트에서 약 정보를 추출하여, 앞에서 설명한 스키마에 맞는 JSON 하나를 만들어 주세요."
+    )
+    extract_response = client.chat.completions.create(
+        call_site='extract',
+        model=EXTRACT_MODEL,
+        messages=[
+            {"role": "system", "content": EXTRACT_SYSTEM_PROMPT},
+            {"role": "user", "content": extract_user}
+        ],
+        temperature=0.1,
+        max_tokens=900
+    )
+    medication_info = parse_model_json(extract_response.choices[0].message.content, 'extract')
+    # JSON 파싱: 실패해도 그대로 진행 (표 직접 파싱으로 복구)
+    return medication_info if medication_info is not None else {}
+
+
+def parse_model_json(content, stage):
+    """모델 응답 문자열을 JSON으로 파싱 (코드블록으로 감싸져 있으면 제거). 실패하면 None (stage는 메트릭용)"""
+    json_text = (content or "").strip()
+    if json_text.startswith("```"):
+        json_text = re.sub(r'^```(?:json)?', '', json_text, flags=re.IGNORECASE).strip()
+        json_text = re.sub(r'```$', '', json_text).strip()
+    try:
+        return json.loads(json_text)
+    except Exception as e:
+        llm_output_rejected.inc(stage=stage, reason='json')
+        print("[OCR] JSON 파싱 실패:", e)
+        print("[OCR] 원본 JSON 텍스트 일부:", json_text[:500])
+        return None
+
+
+# 1~2단계 방식
+# - two_stage : OCR_MODEL로 글자만 읽고, 약 정보 추출은 따로 (OCR_EXTRACT_MODE)
+# - single    : OCR_MODEL에 raw_text + medications를 JSON 스키마(structured output)로 한 번에 요청
+OCR_PIPELINE_MODE = os.getenv("OCR_PIPELINE_MODE", "two_stage")
+if OCR_PIPELINE_MODE not in ('two_stage', 'single'):
+    print(f"[경고] 알 수 없는 OCR_PIPELINE_MODE '{OCR_PIPELINE_MODE}', 'two_stage'로 사용합니다.")
+    OCR_PIPELINE_MODE = 'two_stage'
+
+TIME_LABELS = ["아침", "점심", "저녁"]
+_MEDICATION_PROPERTIES = {
+    "name": {"type": ["string", "null"]},
+    "dosage": {"type": ["integer", "null"]},
+    "days": {"type": ["integer", "null"]},
+    "before_meal": {"type": ["boolean", "null"]},
+    "times": {"type": "array", "items": {"type": "string", "enum": TIME_LABELS}}
+}
+# EXTRACT_SYSTEM_PROMPT에 적힌 스키마를 JSON 스키마로 옮긴 것 (strict 모드라 모든 키가 필수, null 허용)
+MEDICATION_INFO_SCHEMA = {
+    "type": "object",
+    "properties": dict(_MEDICATION_PROPERTIES, **{
+        "raw_text": {"type": "string"},
+        "medications": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": _MEDICATION_PROPERTIES,
+                "required": list(_MEDICATION_PROPERTIES),
+                "additionalProperties": False
+            }
+        }
+    }),
+    "required": ["raw_text"] + list(_MEDICATION_PROPERTIES) + ["medications"],
+    "additionalProperties": False
+}
+
+STRUCTURED_OCR_SYSTEM_PROMPT = (
+    "당신은 한국 약봉투 OCR 엔진이자 약 정보 추출 전문가입니다.\n"
+    "1) 주어진 약봉투 사진에서 사람이 읽을 수 있는 모든 글자를 요약/해석/번역 없이 그대로 raw_text에 적으세요. "
+    "줄바꿈도 대략적으로 유지하고, 글자가 애매하면 보이는 대로 추측해서 적어도 됩니다.\n"
+    "2) 그 텍스트에서 약 정보를 찾아 나머지 필드를 채우세요.\n\n"
+) + EXTRACT_RULES
+
+
+def _check_medication_fields(obj):
+    if not isinstance(obj.get("name"), (str, type(None))):
+        raise ValueError("name")
+    for key in ("dosage", "days"):
+        value = obj.get(key)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+            raise ValueError(key)
+    if not isinstance(obj.get("before_meal"), (bool, type(None))):
+        raise ValueError("before_meal")
+    times = obj.get("times", [])
+    if not isinstance(times, list) or any(t not in TIME_LABELS for t in times):
+        raise ValueError("times")
+
+
+def validate_medication_info(data):
+    """MEDICATION_INFO_SCHEMA에 맞는지 확인하고 그대로 반환. 맞지 않으면 ValueError"""
+    if not isinstance(data, dict) or not isinstance(data.get("raw_text"), str):
+        raise ValueError("raw_text")
+    _check_medication_fields(data)
+    medications = data.get("medications")
+    if not isinstance(medications, list):
+        raise ValueError("medications")
+    for med in medications:
+        if not isinstance(med, dict):
+            raise ValueError("medications")
+        _check_medication_fields(med)
+    return data
+
+
+def run_structured_ocr_stage(image_base64):
+    """
+    1~2단계를 한 번에: 이미지 → {"raw_text", ..., "medications"} (JSON 스키마 structured output)
+    응답이 거부되었거나 스키마에 맞지 않으면 None
+    """
+    response = client.chat.completions.create(
+        call_site='ocr',
+        model=OCR_MODEL,
+        messages=[
+            {"role": "system", "content": STRUCTURED_OCR_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": "이 약봉투에서 보이는 글자를 전부 그대로 적고, 약 정보를 추출해 주세요."
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{image_base64}"
+                        }
+                    }
+                ]
+            }
+        ],
+        response_format={
+            "type": "json_schema",
+            "json_schema": {"name": "medication_receipt", "strict": True, "schema": MEDICATION_INFO_SCHEMA}
+        },
+        temperature=0.0,
+        max_tokens=2000
+    )
+    message = response.choices[0].message
+    if getattr(message, 'refusal', None):
+        llm_output_rejected.inc(stage='structured', reason='refusal')
+        print("[OCR] 모델이 응답을 거부했습니다:", message.refusal)
+        return None
+    data = parse_model_json(message.content, 'structured')
+    if data is None:
+        return None
+    try:
+        return validate_medication_info(data)
+    except ValueError as e:
+        llm_output_rejected.inc(stage='structured', reason='schema')
+        print(f"[OCR] 스키마에 맞지 않는 응답입니다 ({e})")
+        return None
+
+
+def run_ocr_and_extract(vision_base64, progress):
+    """
+    OCR_PIPELINE_MODE에 따라 1~2단계 실행. 반환값: (ocr_text, medication_info, {"path", "confidence"})
+    single 모드에서 응답이 스키마에 맞지 않으면 two_stage 방식으로 다시 처리한다.
+    """
+    if OCR_PIPELINE_MODE == 'single':
+        medication_info = run_structured_ocr_stage(vision_base64)
+        if medication_info is not None:
+            count_extract_path('structured')
+            return medication_info["raw_text"], medication_info, {"path": "structured", "confidence": None}
+        count_extract_path('structured_fallback')
+    ocr_text = run_ocr_stage(vision_base64)
+    progress('extract')
+    medication_info, extract_info = extract_medication_info(ocr_text)
+    return ocr_text, medication_info, extract_info
+
+
+def merge_table_medications(medication_info, ocr_text):
+    """LLM 추출 결과와 표 직접 파싱 결과를 합쳐서 약 후보 목록(medications_raw)을 만든다."""
+    # medications 배열이 있으면 그걸 사용, 없으면 단일 객체로 처리
+    medications_raw = []
+    if isinstance(medication_info, dict) and isinstance(medication_info.get("medications"), list):
+        medications_raw = list(medication_info["medications"])
+    elif isinstance(medication_info, dict) and medication_info:
+        medications_raw = [medication_info]
+    else:
+        medications_raw = []
+
+    # LLM이 표의 첫 행만 뽑아오는 경우 보정:
+    # raw_text에 있는 "약품명 / 투약량 / 횟수 / 일수" 표를 한 번 더 직접 파싱해서 합침
+    if isinstance(medication_info, dict):
+        raw_text_for_table = medication_info.get("raw_text", "") or ocr_text
+    else:
+        raw_text_for_table = ocr_text
+    with ocr_step_seconds.time(step='table_merge'):
+        table_meds = extract_table_medications(raw_text_for_table)
+    if table_meds:
+        if len(medications_raw) <= 1:
+            # 한 개만 있으면 표에서 읽은 약 목록으로 통째로 교체
+            medications_raw = table_meds
+        else:
+            # 이미 여러 개 있으면, 표에서 추가로 발견된 약만 합치기
+            existing_names = {(m.get("name") or "").strip() for m in medications_raw}
+            for tm in table_meds:
+                n = (tm.get("name") or "").strip()
+                if n and n not in existing_names:
+                    medications_raw.append(tm)
+    return medications_raw
+
+
+def run_ocr_pipeline(image_hash, progress=None):
+    """
+    1~2단계(OCR + JSON 추출)를 실행하고 결과를 캐시에 저장.
+    progress: 단계 시작을 알리는 콜백 (비동기 작업 진행 상황 표시용)
+    반환값: (캐시 엔트리 dict, 캐시 적중 여부)
+    캐시 엔트리: {"ocr_text", "medication_info", "extract", "descriptions", "preprocess"}
+    """
+    cache_key = ocr_cache_key(image_hash)
+    entry = ocr_cache.get(cache_key)
+    if entry is not None:
+        return entry, True
+    # 같은 사진이 동시에 여러 번 올라오면 먼저 온 요청의 결과를 같이 사용 (캐시 적중과 같게 취급)
+    # 진행 단계는 기다리는 요청(비동기 작업)에도 같이 전달
+    return ocr_flight.do(
+        cache_key,
+        lambda report: compute_ocr_entry(cache_key, image_hash, report),
+        progress=progress or (lambda stage: None)
+    )
+
+
+def compute_ocr_entry(cache_key, image_hash, progress):
+    """run_ocr_pipeline의 캐시 미스 처리 (같은 키로는 한 번에 하나만 실행됨)"""
+    # 바로 앞에 끝난 같은 요청이 방금 캐시에 넣었을 수 있음
+    # (미스는 run_ocr_pipeline에서 이미 셌으므로 통계에 다시 세지 않는 peek으로 확인)
+    entry = ocr_cache.peek(cache_key)
+    if entry is not None:
+        return entry
+    progress = progress or (lambda stage: None)
+    progress('ocr')
+    vision_base64, preprocess_stats = prepare_vision_image(image_hash)
+    ocr_text, medication_info, extract_info = run_ocr_and_extract(vision_base64, progress)
+    entry = {
+        "ocr_text": ocr_text,
+        "medication_info": medication_info,
+        "extract": extract_info,
+        "descriptions": {},  # 약 이름 → 설명 (3단계에서 채움)
+        "preprocess": preprocess_stats
+    }
+    # 장애 때문에 대신 만든 결과는 캐시하지 않음 (다음에 다시 제대로 처리)
+    if extract_info["path"] != "local_degraded":
+        ocr_cache.set(cache_key, entry)
+    return entry
+
+
+def build_medication_record(raw_med, medication_info, image_hash):
+    """약 후보 하나를 정제해서 저장용 약 dict로 만든다. 이름이 없으면 None."""
+    if not isinstance(raw_med, dict):
+        return None
+
+    # 약 이름
+    name = (raw_med.get("name") or "").strip()
+    if not name:
+        return None
+
+    # dosage와 days를 안전하게 정수로 변환 (없으면 기본값 사용)
+    if isinstance(medication_info, dict):
+        base_dosage = medication_info.get("dosage")
+        base_days = medication_info.get("days")
+        fallback_dosage = safe_int(base_dosage, 3)
+        fallback_days = safe_int(base_days, 3)
+    else:
+        fallback_dosage = 3
+        fallback_days = 3
+
+    raw_dosage = raw_med.get("dosage", fallback_dosage)
+    dosage_value = safe_int(raw_dosage, fallback_dosage)
+
+    raw_days = raw_med.get("days", fallback_days)
+    days_value = safe_int(raw_days, fallback_days)
+    if not 1 <= days_value <= MAX_COURSE_DAYS:
+        # OCR/모델이 읽은 일수가 말이 안 되면 기본값(3일)으로
+        days_value = 3
+
+    # 1일 복용 횟수(dosage)에 따라 복용 시간대(times) 자동 설정
+    if dosage_value >= 3:
+        times_list = ["아침", "점심", "저녁"]
+    elif dosage_value == 2:
+        times_list = ["아침", "저녁"]
+    else:  # 1회 또는 그 외
+        times_list = ["저녁"]
+
+    # 식후로 통일 (before_meal은 false)
+    before_meal = False
+
+    # 식사 시간 정의 (기본값)
+    meal_times = {
+        "아침": {"hour": 8, "minute": 0},
+        "점심": {"hour": 12, "minute": 0},
+        "저녁": {"hour": 18, "minute": 0}
+    }
+
+    # 알림 시간 계산 (식후 30분 후로 통일)
+    notification_times = {}
+    now = datetime.now()
+    for time_label in times_list:
+        meal_time = meal_times.get(time_label, meal_times["저녁"])
+        notification_time = now.replace(
+            hour=meal_time["hour"],
+            minute=meal_time["minute"],
+            second=0,
+            microsecond=0
+        ) + timedelta(minutes=30)
+
+        notification_times[time_label] = {
+            "hour": notification_time.hour,
+            "minute": notification_time.minute
+        }
+
+    # 약 정보 저장 (서버 메모리용)
+    return {
+        "id": medications_db.next_id(),
+        "name": name,
+        "dosage": dosage_value,
+        "days": days_value,
+        "before_meal": before_meal,
+        "times": times_list,
+        "notification_times": notification_times,
+        "registered_date": datetime.now().isoformat(),
+        "image_hash": image_hash  # 이미지 원본은 블롭 저장소에 한 번만 보관
+    }
+
+
+def process_ocr_image(image_hash, progress=None):
+    """
+    OCR 파이프라인 전체(1~3단계)를 실행해서 (HTTP 상태 코드, 응답 dict)를 반환.
+    요청 처리(동기 모드)와 백그라운드 작업(비동기 모드)이 같이 사용한다.
+    progress: 단계가 바뀔 때 호출되는 콜백 ('ocr', 'extract', 'descriptions', 'saving')
+    """
+    progress = progress or (lambda stage: None)
+    # ------------ 1~2단계: OCR + JSON 추출 (캐시 적중 시 생략) ------------
+    try:
+        entry, cache_hit = run_ocr_pipeline(image_hash, progress=progress)
+    except CircuitOpenError as e:
+        # Vision 모델 장애 중에는 기다리지 않고 바로 실패
+        return 503, {
+            'error': '지금은 이미지 분석을 할 수 없습니다. 잠시 후 다시 시도해주세요.',
+            'retry_after': max(1, round(e.retry_after))
+        }
+    medication_info = entry["medication_info"]
+    medications_raw = merge_table_medications(medication_info, entry["ocr_text"])
+
+    # ------------ 3단계: 정제해서 저장 ------------
+
+    saved_meds = []
+
+    for raw_med in medications_raw:
+        medication_data = build_medication_record(raw_med, medication_info, image_hash)
+        if not medication_data:
+            continue
+        saved_meds.append(medication_data)
+
+    # 약 설명을 한 번 생성해서 각 약 객체에 저장 (오늘의 약에서 재사용)
+    # 설명까지 채운 뒤에 한 번에 저장해야 SQLite에도 설명이 같이 들어감
+    if saved_meds:
+        progress('descriptions')
+        try:
+            med_names = [m["name"] for m in saved_meds]
+            cached_descs = entry["descriptions"]
+            if all(n in cached_descs for n in med_names):
+                desc_list = [cached_descs[n] for n in med_names]
+            else:
+                desc_list = generate_descriptions_for_names(med_names)
+                cached_descs.update(zip(med_names, desc_list))
+            for med, desc in zip(saved_meds, desc_list):
+                med["description"] = desc
+        except Exception as e:
+            print("[OCR] 약 설명 생성 중 오류:", e)
+
+    # 아무 약도 저장 못 했으면 에러
+    if not saved_meds:
+        return 400, {
+            'success': False,
+            'error': '약 정보를 추출할 수 없습니다. 다시 시도해주세요.'
+        }
+
+    progress('saving')
+    save_medications(saved_meds)
+
+    # 기존 호환성: 첫 번째 약은 medication 키로도 내려줌 (내부 필드는 가린 뷰로)
+    public_meds = project(saved_meds, None, MEDICATION_INTERNAL_FIELDS)
+    return 200, {
+        'success': True,
+        'medication': public_meds[0],
+        'medications': public_meds,
+        'cache_hit': cache_hit,
+        'extract': entry["extract"],
+        'preprocess': None if cache_hit else entry["preprocess"]
+    }
+
+
+# 비동기 OCR 작업 큐 (POST /api/ocr?async=1 → 작업 id 반환, /api/ocr/jobs/<id>로 조회)
+OCR_JOB_WORKERS = int(os.getenv("OCR_JOB_WORKERS", "2"))
+OCR_JOB_MAX_PENDING = int(os.getenv("OCR_JOB_MAX_PENDING", "32"))
+ocr_jobs = OCRJobQueue(max_workers=OCR_JOB_WORKERS, max_pending=OCR_JOB_MAX_PENDING)
+
+
+def wants_async(data):
+    value = request.args.get('async', data.get('async', False))
+    if isinstance(value, str):
+        return value.lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+# 바이너리 업로드(multipart / image/*) 한 장의 최대 크기
+OCR_MAX_UPLOAD_BYTES = int(os.getenv("OCR_MAX_UPLOAD_BYTES", str(20 * 1024 * 1024)))
+
+
+def strip_data_url_header(image_base64):
+    """base64 데이터에서 헤더 제거 (data:image/jpeg;base64, 부분). 쉼표 뒤 전체를 그대로 사용"""
+    _, comma, payload = image_base64.partition(',')
+    return payload if comma else image_base64
+
+
+def store_uploaded_image():
+    """
+    /api/ocr 요청 본문에서 이미지를 꺼내 블롭 저장소에 저장.
+    - multipart/form-data: "image" 파일 필드 (큰 파일은 werkzeug가 임시 파일로 받아 둠)
+    - image/* 또는 application/octet-stream: 요청 본문 전체가 이미지
+    - 그 외: 기존 JSON {"image": "base64..."}
+    바이너리 업로드는 조각 단위로 디스크에 쓰므로 base64 변환/문자열 복사가 없다.
+    반환값: (이미지 해시, 옵션 dict) / 이미지가 없으면 해시 None
+    형식이 잘못되면 binascii.Error/ValueError
+    """
+    mimetype = request.mimetype or ''
+    if mimetype == 'multipart/form-data':
+        upload = request.files.get('image')
+        if upload is None:
+            return None, request.form
+        return blob_store.put_stream(upload.stream, max_bytes=OCR_MAX_UPLOAD_BYTES), request.form
+    if mimetype.startswith('image/') or mimetype == 'application/octet-stream':
+        if request.content_length is not None and request.content_length > OCR_MAX_UPLOAD_BYTES:
+            raise ValueError('이미지가 너무 큽니다.')
+        return blob_store.put_stream(request.stream, max_bytes=OCR_MAX_UPLOAD_BYTES), {}
+
+    data = request.get_json(silent=True) or {}
+    image_base64 = data.get('image', '')
+    if not image_base64:
+        return None, data
+    # 이미지는 한 번만 디코딩해서 내용 해시 이름으로 디스크에 저장 (약 기록에는 해시만 남김)
+    return blob_store.put_base64(strip_data_url_header(image_base64)), data
+
+
 @app.route('/api/ocr', methods=['POST'])
 def ocr():
     """
@@ -276,293 +1330,267 @@ def ocr():
     1) 이미지에서 보이는 모든 텍스트를 최대한 OCR
     2) 그 텍스트에서 약 정보만 JSON으로 추출
     - 여러 약이 있으면 medications 배열에 여러 개 등록
+    - 같은 사진을 다시 올리면 캐시된 1~2단계 결과와 약 설명을 재사용
+    - ?async=1 (또는 JSON의 "async": true)이면 작업만 등록하고 202 + job_id를 바로 반환
+    - 이미지는 JSON(base64) 외에 multipart/form-data("image" 필드)나 image/jpeg 본문으로도 받음
     """
     if not client:
         return jsonify({'error': 'OpenAI API 키가 설정되지 않았습니다. 환경변수 OPENAI_API_KEY를 설정해주세요.'}), 500
     
     try:
-        data = request.json
-        image_base64 = data.get('image', '')
-        
-        if not image_base64:
-            return jsonify({'error': '이미지가 필요합니다.'}), 400
-        
-        # base64 데이터에서 헤더 제거 (data:image/jpeg;base64, 부분)
-        if ',' in image_base64:
-            image_base64 = image_base64.split(',')[1]
-        # ------------ 1단계: OCR (이미지 → 전체 텍스트) ------------
-        ocr_response = client.chat.completions.create(
-            model="gpt-4o",  # Vision 지원 모델
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "당신은 OCR 엔진입니다. "
-                        "주어진 약봉투 사진에서 사람이 읽을 수 있는 모든 글자를 가능한 한 많이 그대로 적어주세요. "
-                        "줄바꿈도 대략적으로 유지하려고 노력하고, 글자가 애매하면 보이는 대로 추측해서 한글/숫자를 적어도 됩니다. "
-                        "중요: 요약, 해석, 설명, 번역을 하지 말고, 이미지에서 읽은 텍스트를 그대로 적어주세요. "
-                        "문장이 끊기거나 철자가 조금 이상해도 괜찮습니다. "
-                        "오직 이미지에서 읽은 텍스트만 출력하세요."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": "이 약봉투에서 보이는 글자를 전부 그대로 적어주세요."
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{image_base64}"
-                            }
-                        }
-                    ]
-                }
-            ],
-            temperature=0.0,
-            max_tokens=1200
-        )
-        ocr_text = ocr_response.choices[0].message.content.strip()
-        # 혹시 모를 코드블록 제거
-        if ocr_text.startswith("```"):
-            ocr_text = re.sub(r'^```(?:[a-zA-Z]+)?', '', ocr_text).strip()
-            ocr_text = re.sub(r'```$', '', ocr_text).strip()
-        # ------------ 2단계: 텍스트 → 약 정보 JSON 추출 ------------
-        extract_system = (
-            "당신은 한국 약봉투 인식 및 정보 추출 전문가입니다.\n"
-            "아래는 OCR로 추출한 원문 텍스트입니다. 이 텍스트 안에서 약 정보를 찾아 JSON으로 정리하세요.\n\n"
-            "요구 스키마(반드시 이 키들을 사용해야 합니다):\n"
-            "{\n"
-            "  \"raw_text\": \"OCR로 읽은 전체 텍스트 문자열\",\n"
-            "  \"name\": \"첫 번째 약 이름 또는 null\",\n"
-            "  \"dosage\": 1일 복용 횟수(정수 또는 null),\n"
-            "  \"days\": 총 복용 일수(정수 또는 null),\n"
-            "  \"before_meal\": true 또는 false 또는 null,\n"
-            "  \"times\": [\"아침\", \"점심\", \"저녁\"] 중 일부 또는 빈 배열,\n"
-            "  \"medications\": [\n"
-            "    {\n"
-            "      \"name\": \"약 이름 문자열 또는 null\",\n"
-            "      \"dosage\": 1일 복용 횟수(정수 또는 null),\n"
-            "      \"days\": 총 복용 일수(정수 또는 null),\n"
-            "      \"before_meal\": true 또는 false 또는 null,\n"
-            "      \"times\": [\"아침\", \"점심\", \"저녁\"] 중 일부 또는 빈 배열\n"
-            "    }\n"
-            "  ]\n"
-            "}\n\n"
-            "중요 규칙:\n"
-            "- 약 이름은 OCR 텍스트에 실제로 등장하는 단어들만 사용하세요. 텍스트에 없는 새로운 약 이름을 새로 만들지 마세요.\n"
-            "- 철자가 조금 틀리거나 몇 글자가 빠져도 괜찮습니다. 보이는 대로 최대한 비슷하게 적으세요.\n"
-            "- \"1일 1회\", \"하루 1번\" → dosage: 1 로 설정합니다.\n"
-            "- \"1일 2회\" → dosage: 2 로 설정합니다.\n"
-            "- \"1일 3회\" → dosage: 3 으로 설정합니다.\n"
-            "- \"3일분\", \"7일분\" 처럼 되어 있으면 안의 숫자만 뽑아서 days에 정수로 넣으세요.\n"
-            "- 복용 횟수나 일수가 텍스트에서 전혀 보이지 않으면 해당 필드는 null로 두세요.\n"
-            "- before_meal은 식전/식후/공복 등 정보가 보일 때만 true/false로 설정하고, 전혀 없으면 null로 두어도 됩니다.\n"
-            "- 여러 약이 적혀 있다면 medications 배열에 약마다 하나씩 객체를 넣으세요.\n"
-            "- 약이 하나도 확실하지 않으면 medications는 빈 배열 [] 로 두고, name도 null로 두세요.\n"
-            "- 가능한 한 버리지 말고, 애매해도 약 이름으로 보이는 것은 최대한 살려서 넣으세요.\n"
-            "- 특히 표 형태로 \"약품명 / 1회투약량 / 1일 투약횟수 / 투약일수\" 와 같은 구조가 보이면,\n"
-            "  그 표의 각 행을 반드시 하나의 약 객체로 만들어야 합니다.\n"
-            "  예를 들어 다음과 같이 보인다면:\n"
-            "    약품명            1회투약량   1일투약횟수  투약일수\n"
-            "    시클러캡슐250mg      1           3          3일분\n"
-            "    아세틸캡슐           1           3          3일분\n"
-            "    코푸정               1           3          3일분\n"
-            "    염산알마게이트정500  1           3          3일분\n"
-            "  medications 배열에는 시클러캡슐, 아세틸캡슐, 코푸정, 염산알마게이트정500 이 네 개의 객체가 모두 들어가야 합니다.\n"
-            "- 한 행(첫 번째 약)만 추출하지 말고, 표에 있는 모든 행을 빠짐없이 추출하세요.\n\n"
-            "출력 형식(매우 중요):\n"
-            "- 오직 하나의 JSON 객체만 출력하세요.\n"
-            "- JSON 바깥에 다른 설명, 문장, 주석, 텍스트는 절대 쓰지 마세요.\n"
-            "- JSON은 표준 형식을 지키고, 마지막 원소 뒤에 쉼표(,)를 두지 마세요.\n"
-        )
-        extract_user = (
-            "다음은 OCR로 읽은 원문 텍스트입니다:\n\n"
-            "----- OCR TEXT START -----\n"
-            f"{ocr_text}\n"
-            "----- OCR TEXT END -----\n\n"
-            "위 텍스트에서 약 정보를 추출하여, 앞에서 설명한 스키마에 맞는 JSON 하나를 만들어 주세요."
-        )
-        extract_response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": extract_system},
-                {"role": "user", "content": extract_user}
-            ],
-            temperature=0.1,
-            max_tokens=900
-        )
-        json_text = extract_response.choices[0].message.content.strip()
-        # 혹시 코드블록으로 감싸져 있으면 제거
-        if json_text.startswith("```"):
-            json_text = re.sub(r'^```(?:json)?', '', json_text, flags=re.IGNORECASE).strip()
-            json_text = re.sub(r'```$', '', json_text).strip()
-        # JSON 파싱: 실패해도 그대로 진행 (표 직접 파싱으로 복구)
-        medication_info = {}
         try:
-            medication_info = json.loads(json_text)
-        except Exception as e:
-            print("[OCR] JSON 파싱 실패, 표 직접 파싱만 사용합니다:", e)
-            print("[OCR] 원본 JSON 텍스트 일부:", json_text[:500])
+            image_hash, data = store_uploaded_image()
+        except (binascii.Error, ValueError):
+            return jsonify({'error': '이미지 형식이 올바르지 않습니다.'}), 400
 
-        # medications 배열이 있으면 그걸 사용, 없으면 단일 객체로 처리
-        medications_raw = []
-        if isinstance(medication_info, dict) and isinstance(medication_info.get("medications"), list):
-            medications_raw = medication_info["medications"]
-        elif isinstance(medication_info, dict) and medication_info:
-            medications_raw = [medication_info]
-        else:
-            medications_raw = []
+        if not image_hash:
+            return jsonify({'error': '이미지가 필요합니다.'}), 400
 
-        # LLM이 표의 첫 행만 뽑아오는 경우 보정:
-        # raw_text에 있는 "약품명 / 투약량 / 횟수 / 일수" 표를 한 번 더 직접 파싱해서 합침
-        if isinstance(medication_info, dict):
-            raw_text_for_table = medication_info.get("raw_text", "") or ocr_text
-        else:
-            raw_text_for_table = ocr_text
-        table_meds = extract_table_medications(raw_text_for_table)
-        if table_meds:
-            if len(medications_raw) <= 1:
-                # 한 개만 있으면 표에서 읽은 약 목록으로 통째로 교체
-                medications_raw = table_meds
-            else:
-                # 이미 여러 개 있으면, 표에서 추가로 발견된 약만 합치기
-                existing_names = {(m.get("name") or "").strip() for m in medications_raw}
-                for tm in table_meds:
-                    n = (tm.get("name") or "").strip()
-                    if n and n not in existing_names:
-                        medications_raw.append(tm)
+        if wants_async(data):
+            try:
+                job = ocr_jobs.submit(process_ocr_image, image_hash)
+            except QueueFullError:
+                return jsonify({'error': '지금은 요청이 많아 잠시 후 다시 시도해주세요.'}), 503
+            return jsonify({
+                'success': True,
+                'job_id': job['id'],
+                'status': job['status'],
+                'status_url': f"/api/ocr/jobs/{job['id']}",
+                'events_url': f"/api/ocr/jobs/{job['id']}/events"
+            }), 202
+
+        status_code, payload = process_ocr_image(image_hash)
+        return jsonify(payload), status_code
+        
+    except Exception as e:
+        print(f"OCR 전체 파이프라인 오류: {str(e)}")
+        return jsonify({'error': f'이미지 분석 중 오류가 발생했습니다: {str(e)}'}), 500
 
-        # ------------ 3단계: 정제해서 서버 메모리에 저장 ------------
 
-        saved_meds = []
+# 여러 장의 약봉투를 한 번에 처리하는 배치 OCR (이미지별 1~2단계를 스레드 풀에서 동시에 실행)
+OCR_BATCH_MAX_IMAGES = int(os.getenv("OCR_BATCH_MAX_IMAGES", "10"))
+OCR_BATCH_WORKERS = int(os.getenv("OCR_BATCH_WORKERS", "4"))
+ocr_batch_executor = ThreadPoolExecutor(max_workers=OCR_BATCH_WORKERS, thread_name_prefix='ocr-batch')
 
-        for raw_med in medications_raw:
-            if not isinstance(raw_med, dict):
-                continue
 
-            # 약 이름
-            name = (raw_med.get("name") or "").strip()
-            if not name:
-                continue
+def timed_ocr_pipeline(image_hash):
+    started = time.perf_counter()
+    entry, cache_hit = run_ocr_pipeline(image_hash)
+    return entry, cache_hit, (time.perf_counter() - started) * 1000
 
-            # dosage와 days를 안전하게 정수로 변환 (없으면 기본값 사용)
-            if isinstance(medication_info, dict):
-                base_dosage = medication_info.get("dosage")
-                base_days = medication_info.get("days")
-                fallback_dosage = safe_int(base_dosage, 3)
-                fallback_days = safe_int(base_days, 3)
-            else:
-                fallback_dosage = 3
-                fallback_days = 3
-
-            raw_dosage = raw_med.get("dosage", fallback_dosage)
-            dosage_value = safe_int(raw_dosage, fallback_dosage)
-
-            raw_days = raw_med.get("days", fallback_days)
-            days_value = safe_int(raw_days, fallback_days)
-
-            # 1일 복용 횟수(dosage)에 따라 복용 시간대(times) 자동 설정
-            if dosage_value >= 3:
-                times_list = ["아침", "점심", "저녁"]
-            elif dosage_value == 2:
-                times_list = ["아침", "저녁"]
-            else:  # 1회 또는 그 외
-                times_list = ["저녁"]
-
-            # 식후로 통일 (before_meal은 false)
-            before_meal = False
-
-            # 식사 시간 정의 (기본값)
-            meal_times = {
-                "아침": {"hour": 8, "minute": 0},
-                "점심": {"hour": 12, "minute": 0},
-                "저녁": {"hour": 18, "minute": 0}
-            }
-
-            # 알림 시간 계산 (식후 30분 후로 통일)
-            notification_times = {}
-            now = datetime.now()
-            for time_label in times_list:
-                meal_time = meal_times.get(time_label, meal_times["저녁"])
-                notification_time = now.replace(
-                    hour=meal_time["hour"],
-                    minute=meal_time["minute"],
-                    second=0,
-                    microsecond=0
-                ) + timedelta(minutes=30)
-                
-                notification_times[time_label] = {
-                    "hour": notification_time.hour,
-                    "minute": notification_time.minute
-                }
-
-            # 약 정보 저장 (서버 메모리용)
-            medication_id = len(medications_db) + 1
-            medication_data = {
-                "id": medication_id,
-                "name": name,
-                "dosage": dosage_value,
-                "days": days_value,
-                "before_meal": before_meal,
-                "times": times_list,
-                "notification_times": notification_times,
-                "registered_date": datetime.now().isoformat(),
-                "image_base64": image_base64  # 서버 안에서만 보관
-            }
 
-            medications_db.append(medication_data)
-            saved_meds.append(medication_data)
+@app.route('/api/ocr/batch', methods=['POST'])
+def ocr_batch():
+    """
+    약봉투 여러 장을 한 번에 OCR 처리
+    - 요청: {"images": ["base64...", "base64...", ...]}
+    - 같은 사진은 한 번만 처리 (duplicate_of로 표시)
+    - 여러 봉투에 같은 이름의 약이 있으면 약 하나로 합쳐서 등록
+    - 약 설명은 전체 약 이름을 모아서 한 번만 생성
+    - 응답: 합쳐진 medications + 이미지별 결과(images) + 처리 시간(timing)
+    """
+    if not client:
+        return jsonify({'error': 'OpenAI API 키가 설정되지 않았습니다. 환경변수 OPENAI_API_KEY를 설정해주세요.'}), 500
 
-        # 약 설명을 한 번 생성해서 각 약 객체에 저장 (오늘의 약에서 재사용)
-        if saved_meds:
+    try:
+        started = time.perf_counter()
+        data = request.json
+        images = data.get('images', [])
+
+        if not isinstance(images, list) or not images:
+            return jsonify({'error': '이미지 목록(images)이 필요합니다.'}), 400
+        if len(images) > OCR_BATCH_MAX_IMAGES:
+            return jsonify({'error': f'이미지는 한 번에 최대 {OCR_BATCH_MAX_IMAGES}장까지 보낼 수 있습니다.'}), 400
+
+        # 1) 이미지 저장 + 같은 사진 묶기
+        image_results = []
+        first_index_by_hash = {}
+        futures = {}
+        for index, image_base64 in enumerate(images):
+            result = {'index': index, 'image_hash': None, 'duplicate_of': None, 'error': None}
+            image_results.append(result)
+            if not isinstance(image_base64, str) or not image_base64:
+                result['error'] = '이미지가 비어 있습니다.'
+                continue
             try:
-                med_names = [m["name"] for m in saved_meds]
-                desc_list = generate_descriptions_for_names(med_names)
-                for med, desc in zip(saved_meds, desc_list):
-                    med["description"] = desc
+                image_hash = blob_store.put_base64(strip_data_url_header(image_base64))
+            except (binascii.Error, ValueError):
+                result['error'] = '이미지 형식이 올바르지 않습니다.'
+                continue
+            result['image_hash'] = image_hash
+            if image_hash in first_index_by_hash:
+                result['duplicate_of'] = first_index_by_hash[image_hash]
+                continue
+            first_index_by_hash[image_hash] = index
+            # 2) 서로 다른 사진만 스레드 풀에서 동시에 OCR + JSON 추출
+            futures[index] = ocr_batch_executor.submit(timed_ocr_pipeline, image_hash)
+
+        ocr_started = time.perf_counter()
+        merged = {}  # 약 이름 → 저장할 약 dict (처음 나온 봉투 기준)
+        for index, future in futures.items():
+            result = image_results[index]
+            try:
+                entry, cache_hit, elapsed_ms = future.result()
             except Exception as e:
-                print("[OCR] 약 설명 생성 중 오류:", e)
-
-        # 아무 약도 저장 못 했으면 에러
-        if not saved_meds:
+                print(f"[OCR 배치] {index}번 이미지 오류: {e}")
+                result['error'] = f'이미지 분석 중 오류가 발생했습니다: {str(e)}'
+                continue
+            result['cache_hit'] = cache_hit
+            result['elapsed_ms'] = round(elapsed_ms, 1)
+            medication_info = entry["medication_info"]
+            names = []
+            for raw_med in merge_table_medications(medication_info, entry["ocr_text"]):
+                name = (raw_med.get("name") or "").strip() if isinstance(raw_med, dict) else ""
+                if name in merged:
+                    names.append(name)
+                    continue
+                medication_data = build_medication_record(raw_med, medication_info, result['image_hash'])
+                if not medication_data:
+                    continue
+                names.append(medication_data['name'])
+                merged[medication_data['name']] = medication_data
+            result['medication_names'] = names
+        ocr_ms = (time.perf_counter() - ocr_started) * 1000
+
+        # 중복 사진은 원본 결과를 그대로 따라감
+        for result in image_results:
+            if result['duplicate_of'] is not None:
+                original = image_results[result['duplicate_of']]
+                for key in ('cache_hit', 'medication_names', 'error'):
+                    result[key] = original.get(key)
+
+        if not merged:
             return jsonify({
                 'success': False,
-                'error': '약 정보를 추출할 수 없습니다. 다시 시도해주세요.'
+                'error': '약 정보를 추출할 수 없습니다. 다시 시도해주세요.',
+                'images': image_results
             }), 400
 
-        # localStorage 용량 폭발 방지용: image_base64는 응답에서 제거
-        public_meds = []
-        for med in saved_meds:
-            med_copy = dict(med)
-            med_copy["image_base64"] = ""
-            public_meds.append(med_copy)
+        # 3) 모든 봉투의 약 이름을 모아서 설명을 한 번에 생성
+        saved_meds = list(merged.values())
+        descriptions_started = time.perf_counter()
+        try:
+            desc_list = generate_descriptions_for_names([m["name"] for m in saved_meds])
+            for med, desc in zip(saved_meds, desc_list):
+                med["description"] = desc
+        except Exception as e:
+            print("[OCR 배치] 약 설명 생성 중 오류:", e)
+        descriptions_ms = (time.perf_counter() - descriptions_started) * 1000
+
+        save_medications(saved_meds)
+        ids_by_name = {m['name']: m['id'] for m in saved_meds}
+        for result in image_results:
+            result['medication_ids'] = [ids_by_name[n] for n in result.get('medication_names') or []]
 
-        # 기존 호환성: 첫 번째 약은 medication 키로도 내려줌
         return jsonify({
             'success': True,
-            'medication': public_meds[0],
-            'medications': public_meds
+            'medications': project(saved_meds, None, MEDICATION_INTERNAL_FIELDS),
+            'images': image_results,
+            'timing': {
+                'total_ms': round((time.perf_counter() - started) * 1000, 1),
+                'ocr_ms': round(ocr_ms, 1),
+                'descriptions_ms': round(descriptions_ms, 1)
+            }
         })
-        
+
     except Exception as e:
-        print(f"OCR 전체 파이프라인 오류: {str(e)}")
+        print(f"OCR 배치 처리 오류: {str(e)}")
         return jsonify({'error': f'이미지 분석 중 오류가 발생했습니다: {str(e)}'}), 500
 
 
+def public_job(job):
+    """작업 스냅샷에서 응답에 내보낼 항목만 추림"""
+    return {
+        'job_id': job['id'],
+        'status': job['status'],
+        'stage': job['stage'],
+        'stages': job['stages'],
+        'created_at': job['created_at'],
+        'updated_at': job['updated_at'],
+        'status_code': job['status_code'],
+        'result': job['result']
+    }
+
+
+@app.route('/api/ocr/jobs/<job_id>', methods=['GET'])
+def get_ocr_job(job_id):
+    """비동기 OCR 작업 상태 조회 (끝나면 result에 /api/ocr와 같은 응답이 들어 있음)"""
+    job = ocr_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+    return jsonify(public_job(job))
+
+
+@app.route('/api/ocr/jobs/<job_id>/events', methods=['GET'])
+def stream_ocr_job(job_id):
+    """비동기 OCR 작업 진행 상황을 server-sent events로 전달 (끝나면 스트림 종료)"""
+    job = ocr_jobs.get(job_id)
+    if not job:
+        return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+
+    def generate():
+        current = job
+        while True:
+            yield sse_event(public_job(current), event=current['stage'])
+            if current['status'] in ('done', 'failed'):
+                return
+            version = current['version']
+            current = ocr_jobs.wait_for_change(job_id, version, timeout=15)
+            if current is None:
+                return
+            if current['version'] == version:
+                # 변화가 없으면 연결 유지용 주석만 보냄
+                yield ": keep-alive\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @app.route('/api/medications', methods=['GET'])
+@conditional_get(collection_versions, response_cache, 'medications')
 def get_medications():
-    """등록된 약 목록 조회"""
-    # image_base64는 응답에서 제거해서 localStorage 용량 문제 방지
-    public_meds = []
-    for med in medications_db:
-        med_copy = dict(med)
-        med_copy["image_base64"] = ""
-        public_meds.append(med_copy)
+    """
+    등록된 약 목록 조회 (name, registered_date 쿼리로 인덱스 조회 가능)
+    - limit/cursor를 주면 최근 등록 순으로 한 페이지씩 (응답의 next_cursor로 다음 페이지)
+    - fields=id,name,times 처럼 필요한 필드만 받을 수 있음
+    """
+    name = request.args.get('name')
+    registered_date = request.args.get('registered_date')
+    fields = parse_fields(request.args.get('fields'))
+    try:
+        paginate, limit, before_id = parse_page_args(request.args, 'id')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not name and not registered_date:
+        if not paginate:
+            # 약 dict를 복사하지 않고 내부 필드만 가린 뷰로 내려줌
+            return jsonify({'medications': project(medications_db.all(), fields, MEDICATION_INTERNAL_FIELDS)})
+        # 정렬된 id 인덱스에서 필요한 만큼만 꺼냄
+        page = medications_db.newest(limit + 1, before_id)
+    else:
+        if name:
+            meds = medications_db.find_by_name(name)
+            if registered_date:
+                meds = [m for m in meds if registered_day(m.get('registered_date')) == registered_date]
+        else:
+            meds = medications_db.find_by_registered_date(registered_date)
+        if not paginate:
+            return jsonify({'medications': project(meds, fields, MEDICATION_INTERNAL_FIELDS)})
+        page = sorted(
+            (m for m in meds if before_id is None or m['id'] < before_id),
+            key=lambda m: m['id'],
+            reverse=True
+        )[:limit + 1]
+
+    has_more = len(page) > limit
+    page = page[:limit]
     return jsonify({
-        'medications': public_meds
+        'medications': project(page, fields, MEDICATION_INTERNAL_FIELDS),
+        'next_cursor': encode_cursor({'id': page[-1]['id']}) if has_more else None
     })
 
 
@@ -571,12 +1599,24 @@ def create_medication():
     """약 정보 저장 (프론트엔드에서 동기화용)"""
     try:
         data = request.json
-        medication_id = len(medications_db) + 1
+        medication_id = medications_db.next_id()
         
         dosage_raw = data.get("dosage", 1)
         days_raw = data.get("days", 7)
         dosage_val = safe_int(dosage_raw, 1)
         days_val = safe_int(days_raw, 7)
+
+        # 이미지가 같이 오면 블롭 저장소에 한 번만 저장하고 해시만 기록
+        # (클라이언트가 보낸 해시는 형식이 맞고 실제로 저장된 이미지일 때만 사용)
+        image_hash = data.get("image_hash", "")
+        if not (is_blob_hash(image_hash) and blob_store.exists(image_hash)):
+            image_hash = ""
+        image_base64 = data.get("image_base64", "")
+        if image_base64:
+            try:
+                image_hash = blob_store.put_base64(strip_data_url_header(image_base64))
+            except (binascii.Error, ValueError):
+                return jsonify({'error': '이미지 형식이 올바르지 않습니다.'}), 400
         
         medication_data = {
             "id": medication_id,
@@ -587,15 +1627,18 @@ def create_medication():
             "times": data.get("times", ["아침"]),
             "notification_times": data.get("notification_times", {}),
             "registered_date": data.get("registered_date", datetime.now().isoformat()),
-            "image_base64": data.get("image_base64", ""),
+            "image_hash": image_hash,
             "description": data.get("description", "")
         }
         
-        medications_db.append(medication_data)
+        try:
+            save_medication(medication_data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         return jsonify({
             'success': True,
-            'medication': medication_data
+            'medication': RecordView(medication_data, hidden=MEDICATION_INTERNAL_FIELDS)
         })
     except Exception as e:
         return jsonify({'error': f'약 정보 저장 중 오류가 발생했습니다: {str(e)}'}), 500
@@ -604,12 +1647,27 @@ def create_medication():
 @app.route('/api/medications/<int:medication_id>', methods=['GET'])
 def get_medication(medication_id):
     """특정 약 정보 조회"""
-    medication = next((m for m in medications_db if m['id'] == medication_id), None)
+    medication = medications_db.get(medication_id)
+    if not medication:
+        return jsonify({'error': '약을 찾을 수 없습니다.'}), 404
+    return jsonify(RecordView(medication, hidden=MEDICATION_INTERNAL_FIELDS))
+
+
+@app.route('/api/medications/<int:medication_id>/image', methods=['GET'])
+def get_medication_image(medication_id):
+    """약 등록 때 올린 약봉투 사진 원본 (블롭 저장소에서 바로 전송)"""
+    medication = medications_db.get(medication_id)
     if not medication:
         return jsonify({'error': '약을 찾을 수 없습니다.'}), 404
-    med_copy = dict(medication)
-    med_copy["image_base64"] = ""  # 여기서도 응답에는 이미지 제거
-    return jsonify(med_copy)
+    image_hash = medication.get("image_hash")
+    if not image_hash or not blob_store.exists(image_hash):
+        return jsonify({'error': '저장된 이미지가 없습니다.'}), 404
+    return send_file(
+        blob_store.path(image_hash),
+        mimetype=blob_store.mimetype(image_hash),
+        etag=image_hash,
+        max_age=365 * 24 * 60 * 60
+    )
 
 
 @app.route('/api/medications/convert', methods=['POST'])
@@ -629,7 +1687,16 @@ def convert_medication_description():
         if not medication_names or len(medication_names) == 0:
             return jsonify({'error': '약 이름이 필요합니다.'}), 400
         
-        desc_list = generate_descriptions_for_names(medication_names)
+        try:
+            desc_list = generate_descriptions_for_names(medication_names)
+        except UPSTREAM_ERRORS as e:
+            # 업스트림 장애(브레이커 열림 등): 캐시에 있는 설명만 채우고 나머지는 빈 줄로 바로 응답
+            print(f"약 설명 변환 업스트림 오류: {str(e)}")
+            return jsonify({
+                'description': "\n".join(cached_descriptions_for_names(medication_names)),
+                'time': time_of_day,
+                'degraded': True
+            })
         description = "\n".join(desc_list)
         
         return jsonify({
@@ -643,27 +1710,22 @@ def convert_medication_description():
 
 
 @app.route('/api/medications/today', methods=['GET'])
+@conditional_get(collection_versions, response_cache, 'medications')
 def get_today_medications():
     """오늘 복용해야 할 약 목록 조회"""
     today = datetime.now().date()
     today_medications = []
     
-    for med in medications_db:
-        days_value = safe_int(med.get('days'), 0)
-        if days_value <= 0:
-            continue
-        registered_date = datetime.fromisoformat(med['registered_date']).date()
-        days_diff = (today - registered_date).days
-        
-        if 0 <= days_diff < days_value:
-            for time in med['times']:
-                today_medications.append({
-                    'id': med['id'],
-                    'name': med['name'],
-                    'time': time,
-                    'before_meal': med['before_meal'],
-                    'description': med.get('description', '')
-                })
+    # 복용 기간 구간 인덱스로 오늘 복용 중인 약만 바로 조회
+    for med in medications_db.active_on(today):
+        for time in med['times']:
+            today_medications.append({
+                'id': med['id'],
+                'name': med['name'],
+                'time': time,
+                'before_meal': med['before_meal'],
+                'description': med.get('description', '')
+            })
     
     return jsonify({
         'medications': today_medications,
@@ -683,7 +1745,7 @@ def complete_medication():
             return jsonify({'error': '약 ID가 필요합니다.'}), 400
 
         # 해당 약 정보 조회 (여기서 이름을 쪼갬)
-        medication = next((m for m in medications_db if m['id'] == medication_id), None)
+        medication = medications_db.get(medication_id)
         name_parts = []
 
         if medication and medication.get("name"):
@@ -712,8 +1774,8 @@ def complete_medication():
                 # 복약 내역 화면에서 블럭 하나에 약 하나씩 보여줄 수 있도록 개별 이름 저장
                 'medication_name': part_name
             }
-            medication_history_db.append(record)
             new_records.append(record)
+        save_history_records(new_records)
         
         # 응답 형식은 그대로: record 한 개만 내려보내되, 첫 번째 것을 사용
         return jsonify({
@@ -727,23 +1789,62 @@ def complete_medication():
 
 
 @app.route('/api/history', methods=['GET'])
+@conditional_get(collection_versions, response_cache, 'history')
 def get_history():
-    """복용 내역 조회 (기간 필터 가능)"""
+    """
+    복용 내역 조회 (기간 필터 가능)
+    - limit/cursor를 주면 최근 기록부터 한 페이지씩 (응답의 next_cursor로 다음 페이지)
+    - fields=date,time,medication_name 처럼 필요한 필드만 받을 수 있음
+    """
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
-    
+    fields = parse_fields(request.args.get('fields'))
+    try:
+        paginate, limit, before_pos = parse_page_args(request.args, 'pos')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if paginate:
+        return jsonify(history_page(start_date, end_date, limit, before_pos, fields))
+
     filtered_history = medication_history_db
     
-    if start_date and end_date:
-        filtered_history = [
-            h for h in medication_history_db
-            if start_date <= h['date'] <= end_date
-        ]
+    if start_date and end_date and sqlite_store:
+        # SQLite를 쓰면 history(date) 인덱스로 기간 조회
+        filtered_history = sqlite_store.history_between(start_date, end_date)
+    elif start_date and end_date:
+        positions = sorted(history_date_index.positions_between(start_date, end_date))
+        filtered_history = [medication_history_db[pos] for pos in positions]
     
-    return jsonify({'history': filtered_history})
+    return jsonify({'history': project(filtered_history, fields)})
+
+
+def history_page(start_date, end_date, limit, before_pos, fields):
+    """
+    복용 기록은 완료한 순서대로 덧붙이기만 하므로, 목록 위치(pos)가 곧 시간 순서 인덱스.
+    before_pos 앞에서부터 거꾸로 기록을 최대 limit개 모은다.
+    기간이 있으면 날짜 인덱스에서 end_date ~ start_date 날짜의 위치만 본다.
+    """
+    end = len(medication_history_db) if before_pos is None else min(before_pos, len(medication_history_db))
+    if start_date and end_date:
+        positions = history_date_index.positions_between(start_date, end_date, before=end)
+    else:
+        positions = range(end - 1, -1, -1)
+    page = []
+    for pos in positions:
+        page.append((pos, medication_history_db[pos]))
+        if len(page) > limit:
+            break
+    has_more = len(page) > limit
+    page = page[:limit]
+    return {
+        'history': project([record for _, record in page], fields),
+        'next_cursor': encode_cursor({'pos': page[-1][0]}) if has_more else None
+    }
 
 
 @app.route('/api/history/month', methods=['GET'])
+@conditional_get(collection_versions, response_cache, 'medications', 'history')
 def get_month_history():
     """이달의 복용 내역 조회 + 날짜별 O/X 상태"""
     year = request.args.get('year', datetime.now().year)
@@ -751,59 +1852,9 @@ def get_month_history():
     year = int(year)
     month = int(month)
     
-    month_history = [
-        h for h in medication_history_db
-        if datetime.fromisoformat(h['date']).year == year and
-           datetime.fromisoformat(h['date']).month == month
-    ]
-    
-    daily_history = {}
-    for record in month_history:
-        date_str = record['date']
-        if date_str not in daily_history:
-            daily_history[date_str] = []
-        daily_history[date_str].append(record)
-    
-    start_date = datetime(year, month, 1).date()
-    if month == 12:
-        next_month_date = datetime(year + 1, 1, 1).date()
-    else:
-        next_month_date = datetime(year, month + 1, 1).date()
-    
-    daily_status = {}
-    current = start_date
-    while current < next_month_date:
-        date_str = current.isoformat()
-        # 1) 이 날짜에 "원래 먹어야 하는" 약들(약 + 시간대) 계산
-        required_pairs = set()  # (med_id, time) 쌍
-        for med in medications_db:
-            days_value = safe_int(med.get('days'), 0)
-            if days_value <= 0:
-                continue
-            registered_date = datetime.fromisoformat(med['registered_date']).date()
-            days_diff = (current - registered_date).days
-            if 0 <= days_diff < days_value:
-                for t in med.get('times', []):
-                    required_pairs.add((med['id'], t))
-        # 먹어야 할 약이 하나도 없는 날 → 상태 아예 기록하지 않음
-        if not required_pairs:
-            current += timedelta(days=1)
-            continue
-        # 2) 이 날짜의 실제 복용 기록들
-        day_records = [r for r in medication_history_db if r['date'] == date_str]
-        # 3) 저녁 버튼을 한 번이라도 누른 날만 O/X 평가
-        has_evening_action = any(r['time'] == '저녁' for r in day_records)
-        if not has_evening_action:
-            current += timedelta(days=1)
-            continue
-        # 4) 실제로 먹은 (med_id, time) 쌍
-        taken_pairs = {(r['medication_id'], r['time']) for r in day_records}
-        # 5) 모든 (med_id, time)이 완료되었는지 체크
-        all_taken = required_pairs.issubset(taken_pairs)
-        daily_status[date_str] = 'O' if all_taken else 'X'
-        current += timedelta(days=1)
-    
-    # -------- O / X 계산 끝 --------
+    # 약 등록/복용 완료 때마다 갱신해 둔 날짜별 집계에서 이번 달 항목만 읽음
+    # (날짜별 O/X: 먹어야 할 약이 있고 저녁 버튼을 누른 날만, 모두 먹었으면 O 아니면 X)
+    daily_history, daily_status = daily_rollup.month(year, month)
     
     return jsonify({
         'history': daily_history,
@@ -826,7 +1877,7 @@ def create_user():
     """사용자 정보 저장 (로그인/회원가입 시)"""
     try:
         data = request.json
-        user_id = len(users_db) + 1
+        user_id = next_user_id()
         
         user_data = {
             "id": user_id,
@@ -837,7 +1888,7 @@ def create_user():
             "type": data.get("type", "login")
         }
         
-        users_db.append(user_data)
+        save_user(user_data)
         
         return jsonify({
             'success': True,
@@ -853,10 +1904,62 @@ def health_check():
     """서버 상태 확인"""
     return jsonify({
         'status': 'healthy',
-        'timestamp': datetime.now().isoformat()
+        'timestamp': datetime.now().isoformat(),
+        'ocr_cache': ocr_cache.stats(),
+        'description_cache': description_cache.stats(),
+        'chat_cache': chat_cache.stats(),
+        'ocr_extract': extract_stats(),
+        'llm': client.stats() if hasattr(client, 'stats') else None,
+        'json_provider': type(app.json).__name__,
+        'profiling': request_profiler.stats(),
+        'collection_versions': collection_versions.stats(),
+        'response_cache': response_cache.stats(),
+        'single_flight': {
+            'ocr': ocr_flight.stats(),
+            'descriptions': description_flight.stats()
+        }
     })
 
 
+
+@metrics.collector
+def collect_app_state():
+    """메트릭 출력 때마다 캐시 통계, 저장소 크기, 추출 경로 횟수를 읽어 옴"""
+    caches = {
+        'ocr': ocr_cache.stats(),
+        'description': description_cache.stats(),
+        'chat': chat_cache.stats(),
+        'response': response_cache.stats()
+    }
+    with extract_path_lock:
+        extract_paths = dict(extract_path_counts)
+    return [
+        ('cache_hits_total', 'counter', '캐시 적중 횟수 (description은 메모리 적중만, 디스크 적중은 disk_hits)',
+         [({'cache': name}, stats['hits']) for name, stats in caches.items()]),
+        ('cache_misses_total', 'counter', '캐시 미스 횟수',
+         [({'cache': name}, stats['misses']) for name, stats in caches.items()]),
+        ('cache_disk_hits_total', 'counter', '약 설명 캐시의 디스크(SQLite) 적중 횟수',
+         [({'cache': 'description'}, caches['description']['disk_hits'])]),
+        ('cache_hit_ratio', 'gauge', '캐시 적중률 (0~1)',
+         [({'cache': name}, stats['hit_ratio']) for name, stats in caches.items()]),
+        ('cache_entries', 'gauge', '캐시에 들어 있는 항목 수',
+         [({'cache': name}, stats['size']) for name, stats in caches.items()]),
+        ('store_records', 'gauge', '메모리 저장소 레코드 수',
+         [({'store': 'medications'}, len(medications_db)),
+          ({'store': 'medication_history'}, len(medication_history_db)),
+          ({'store': 'users'}, len(users_db))]),
+        ('ocr_extract_path_total', 'counter', '약 정보 추출 단계가 처리된 경로별 횟수 (ocr_extract 헬스 항목과 같음)',
+         [({'path': path}, count) for path, count in extract_paths.items()]),
+        ('ocr_jobs', 'gauge', '비동기 OCR 작업 상태별 개수',
+         [({'status': status}, count) for status, count in ocr_jobs.stats().items()]),
+    ]
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus 텍스트 형식 메트릭 (응답 시간, OpenAI 호출 시간/토큰, 캐시 적중률, 저장소 크기 등)"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/', methods=['GET'])
 def root():
     """루트 경로"""
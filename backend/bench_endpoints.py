@@ -0,0 +1,245 @@
+"""
+주요 조회/기록 API 벤치마크 스크립트 (서버 없이 Flask 테스트 클라이언트로 직접 호출)
+
+가짜 데이터(약 10개~10만 개, 복용 기록 1천~100만 개)를 만들어 넣고
+엔드포인트별 p50/p99 응답 시간과 요청당 메모리 할당량(tracemalloc 최대치)을 출력한다.
+저장된 기준값(baseline)보다 일정 비율 이상 느려지면 종료 코드 1로 끝난다.
+--check를 주면 기준값 파일이 없거나 기준값이 없는 항목이 있어도 실패로 본다 (CI용).
+
+사용법:
+    python bench_endpoints.py                          # small, medium 데이터셋
+    python bench_endpoints.py --datasets small large   # 데이터셋 선택
+    python bench_endpoints.py --update-baseline        # 현재 결과를 기준값으로 저장
+    python bench_endpoints.py --tolerance 1.3          # 기준값 대비 1.3배 넘게 느려지면 실패
+    python bench_endpoints.py --check                  # 기준값이 없으면 비교를 건너뛰지 않고 실패
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# 벤치마크는 항상 메모리 저장소 + 외부 호출 없이 실행
+os.environ.pop("DATABASE_PATH", None)
+
+import app as app_module  # noqa: E402
+
+DATASETS = {
+    # 이름: (약 개수, 복용 기록 개수)
+    'small': (10, 1_000),
+    'medium': (1_000, 100_000),
+    'large': (100_000, 1_000_000),
+}
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+TIMES = ["아침", "점심", "저녁"]
+
+
+def reset_stores():
+    app_module.medications_db.clear()
+    del app_module.medication_history_db[:]
+    app_module.history_date_index.rebuild([])
+    app_module.daily_rollup.rebuild([])
+    app_module.collection_versions.bump('medications', 'history')
+
+
+def load_dataset(num_medications, num_history, seed=42):
+    """약/복용 기록을 최근 2년 범위에 골고루 흩어서 생성"""
+    reset_stores()
+    rng = random.Random(seed)
+    now = datetime.now()
+    medications = []
+    for i in range(num_medications):
+        registered = now - timedelta(days=rng.randint(0, 730), hours=rng.randint(0, 23))
+        times = TIMES[:rng.randint(1, 3)]
+        medications.append({
+            "id": app_module.medications_db.next_id(),
+            "name": f"벤치약{i % 300}",
+            "dosage": len(times),
+            "days": rng.choice([3, 5, 7, 14, 30]),
+            "before_meal": False,
+            "times": times,
+            "notification_times": {},
+            "registered_date": registered.isoformat(),
+            "image_hash": "",
+            "description": "흰색 동그란 알약"
+        })
+    app_module.save_medications(medications)
+
+    batch = []
+    for _ in range(num_history):
+        day = (now - timedelta(days=rng.randint(0, 730))).date().isoformat()
+        batch.append({
+            'medication_id': rng.randint(1, max(num_medications, 1)),
+            'time': rng.choice(TIMES),
+            'completed_at': f"{day}T12:00:00",
+            'date': day,
+            'medication_name': f"벤치약{rng.randint(0, 299)}"
+        })
+        if len(batch) >= 10_000:
+            app_module.save_history_records(batch)
+            batch = []
+    app_module.save_history_records(batch)
+
+
+def endpoint_cases():
+    """(이름, 메서드, 경로, JSON 본문) 목록"""
+    today = datetime.now().date()
+    month_ago = today - timedelta(days=30)
+    return [
+        ('GET /api/medications', 'get', '/api/medications', None),
+        ('GET /api/medications (limit=50)', 'get', '/api/medications?limit=50&fields=id,name,times', None),
+        ('GET /api/medications/today', 'get', '/api/medications/today', None),
+        ('GET /api/history (30일)', 'get',
+         f'/api/history?start_date={month_ago.isoformat()}&end_date={today.isoformat()}', None),
+        ('GET /api/history (limit=50)', 'get', '/api/history?limit=50', None),
+        ('GET /api/history/month', 'get', f'/api/history/month?year={today.year}&month={today.month}', None),
+        ('POST /api/medications/complete', 'post', '/api/medications/complete',
+         {'medication_id': 1, 'time': '저녁'}),
+    ]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_case(client, method, path, body, iterations, alloc_iterations):
+    call = getattr(client, method)
+
+    def send():
+        # 조회 API는 ETag 응답 캐시(response_cache)에 맞으면 라우트 코드를 실행하지 않으므로
+        # 호출 직전마다 비워서 실제 계산 시간을 잰다 (비우는 시간은 측정 밖)
+        return call(path, json=body) if body is not None else call(path)
+
+    # 워밍업
+    app_module.response_cache.clear()
+    send()
+
+    durations = []
+    for _ in range(iterations):
+        app_module.response_cache.clear()
+        started = time.perf_counter()
+        response = send()
+        durations.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(f"{path} 응답 오류: {response.status_code}")
+    durations.sort()
+
+    # 메모리 할당은 tracemalloc 때문에 느려지므로 따로 몇 번만 측정
+    peaks = []
+    for _ in range(alloc_iterations):
+        app_module.response_cache.clear()
+        tracemalloc.start()
+        send()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak / 1024)
+
+    return {
+        'p50_ms': round(percentile(durations, 50), 3),
+        'p99_ms': round(percentile(durations, 99), 3),
+        'mean_ms': round(statistics.mean(durations), 3),
+        'alloc_kb': round(statistics.mean(peaks), 1) if peaks else 0.0
+    }
+
+
+def iterations_for(num_history):
+    # 큰 데이터셋은 반복 횟수를 줄여서 전체 시간이 너무 길어지지 않게 함
+    if num_history >= 1_000_000:
+        return 20, 2
+    if num_history >= 100_000:
+        return 50, 3
+    return 200, 5
+
+
+def compare(results, baseline, tolerance, require=False):
+    """기준값보다 tolerance배 넘게 느려진 항목 목록 (require면 기준값이 없는 항목도 포함)"""
+    regressions = []
+    for dataset, cases in results.items():
+        for name, metrics in cases.items():
+            base = baseline.get(dataset, {}).get(name)
+            if not base:
+                if require:
+                    regressions.append(f"[{dataset}] {name}: 기준값이 없습니다")
+                continue
+            for key in ('p50_ms', 'p99_ms'):
+                # 아주 짧은 시간은 측정 잡음이 크므로 0.5ms 여유를 둠
+                limit = base[key] * tolerance + 0.5
+                if metrics[key] > limit:
+                    regressions.append(f"[{dataset}] {name} {key}: {metrics[key]} > {round(limit, 3)} (기준 {base[key]})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API 엔드포인트 벤치마크')
+    parser.add_argument('--datasets', nargs='+', default=['small', 'medium'], choices=sorted(DATASETS))
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=1.5)
+    parser.add_argument('--check', action='store_true', help='기준값이 없으면 실패로 처리')
+    parser.add_argument('--output', help='결과를 JSON으로 저장할 경로')
+    args = parser.parse_args()
+
+    client = app_module.app.test_client()
+    results = {}
+    for dataset in args.datasets:
+        num_medications, num_history = DATASETS[dataset]
+        started = time.perf_counter()
+        load_dataset(num_medications, num_history)
+        print("=" * 86)
+        print(f"데이터셋 {dataset}: 약 {num_medications:,}개, 복용 기록 {num_history:,}개 "
+              f"(생성 {time.perf_counter() - started:.1f}초)")
+        print("=" * 86)
+        print(f"{'엔드포인트':<36} {'p50(ms)':>10} {'p99(ms)':>10} {'평균(ms)':>10} {'할당(KB)':>12}")
+        iterations, alloc_iterations = iterations_for(num_history)
+        results[dataset] = {}
+        for name, method, path, body in endpoint_cases():
+            metrics = run_case(client, method, path, body, iterations, alloc_iterations)
+            results[dataset][name] = metrics
+            print(f"{name:<36} {metrics['p50_ms']:>10.3f} {metrics['p99_ms']:>10.3f} "
+                  f"{metrics['mean_ms']:>10.3f} {metrics['alloc_kb']:>12.1f}")
+    print("=" * 86)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"기준값을 저장했습니다: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        if args.check:
+            print(f"기준값 파일이 없습니다: {args.baseline} (--update-baseline으로 먼저 생성)")
+            return 1
+        print("기준값 파일이 없어 비교를 건너뜁니다. (--update-baseline으로 생성)")
+        return 0
+
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance, require=args.check)
+    if regressions:
+        print("성능 저하 발견:")
+        for line in regressions:
+            print("  " + line)
+        return 1
+    print(f"기준값 대비 {args.tolerance}배 이내입니다.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+약 목록 응답 직렬화 속도 측정 스크립트 (서버 없이 Flask 앱 컨텍스트에서 직접 호출)
+
+한글 이름/설명이 들어간 가짜 약 기록 N개로 아래 세 가지를 비교한다.
+- 기존: 기록마다 dict 사본을 만들어 내부 필드를 지우고 + 표준 json (Flask 기본 provider)
+- 뷰 + 표준 json: 복사 없이 RecordView로 감싸서 표준 json
+- 뷰 + orjson: 복사 없이 RecordView로 감싸서 orjson (설치되어 있을 때만)
+세 결과를 다시 읽었을 때 내용이 다르면 종료 코드 1로 끝난다.
+
+사용법: python bench_json.py [약 개수 ...] [--rounds N]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from json_provider import OrjsonProvider, StdlibJSONProvider, orjson
+from pagination import project
+
+INTERNAL_FIELDS = frozenset(['image_hash'])
+TIMES = ["아침", "점심", "저녁"]
+NAMES = ["타이레놀정500밀리그람", "아모크라정375mg", "무코스타정", "록소닌정", "알마겔정", "싱귤레어정"]
+
+
+def make_medications(count, seed=42):
+    rng = random.Random(seed)
+    now = datetime.now()
+    return [{
+        "id": i + 1,
+        "name": rng.choice(NAMES),
+        "dosage": rng.randint(1, 3),
+        "days": rng.choice([3, 5, 7, 14, 30]),
+        "before_meal": rng.random() < 0.3,
+        "times": TIMES[:rng.randint(1, 3)],
+        "notification_times": {"아침": "08:00", "저녁": "19:00"},
+        "registered_date": (now - timedelta(days=rng.randint(0, 730))).isoformat(),
+        "image_hash": f"{rng.getrandbits(256):064x}",
+        "description": "열을 내리고 통증을 줄여 주는 약이에요. 식후 30분에 물과 함께 드세요."
+    } for i in range(count)]
+
+
+def legacy_payload(medications):
+    # 예전 목록 API처럼 기록마다 사본을 만들어 내부 필드를 지움
+    copies = []
+    for med in medications:
+        med_copy = dict(med)
+        med_copy.pop("image_hash", None)
+        copies.append(med_copy)
+    return {'medications': copies}
+
+
+def view_payload(medications):
+    return {'medications': project(medications, None, INTERNAL_FIELDS)}
+
+
+def measure(app, provider, build, medications, rounds):
+    """(요청당 ms, 응답 바이트, 요청당 최대 메모리 KB)"""
+    app.json = provider
+    with app.app_context():
+        body = provider.response(build(medications)).get_data()
+        start = time.perf_counter()
+        for _ in range(rounds):
+            provider.response(build(medications)).get_data()
+        elapsed = (time.perf_counter() - start) / rounds * 1000
+
+        tracemalloc.start()
+        provider.response(build(medications)).get_data()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return elapsed, body, peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="약 목록 JSON 직렬화 벤치마크")
+    parser.add_argument('counts', nargs='*', type=int, default=[100, 1_000, 10_000])
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    cases = [
+        ('기존 (사본 + 표준 json)', DefaultJSONProvider(app), legacy_payload),
+        ('뷰 + 표준 json', StdlibJSONProvider(app), view_payload),
+    ]
+    if orjson is not None:
+        cases.append(('뷰 + orjson', OrjsonProvider(app), view_payload))
+    else:
+        print("orjson이 설치되어 있지 않아 표준 json만 비교합니다.")
+
+    failed = False
+    for count in args.counts:
+        medications = make_medications(count)
+        rounds = max(1, args.rounds * 1_000 // max(count, 1_000))
+        print("=" * 72)
+        print(f"약 {count:,}개 x {rounds}회")
+        print(f"{'방식':<24} {'ms/요청':>10} {'배속':>7} {'응답 KB':>10} {'메모리 KB':>11}")
+        expected = None
+        base = None
+        for label, provider, build in cases:
+            elapsed, body, peak = measure(app, provider, build, medications, rounds)
+            base = base or elapsed
+            print(f"{label:<24} {elapsed:>10.3f} {base / elapsed:>6.2f}x {len(body) / 1024:>10.1f} {peak:>11.1f}")
+            decoded = json.loads(body)
+            if expected is None:
+                expected = decoded
+            elif decoded != expected:
+                print(f"  !! '{label}' 결과가 기존 방식과 다릅니다")
+                failed = True
+    print("=" * 72)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+MedicationRepository 조회 속도 측정 스크립트
+기존 방식(리스트 선형 탐색)과 비교해서, 약 개수가 늘어도 조회 시간이 일정한지 확인한다.
+- id 조회, 이름 인덱스 조회
+- "오늘 복용 중인 약" 조회 (구간 인덱스, 대부분 이미 끝난 처방이라고 가정)
+
+사용법: python bench_medication_store.py
+"""
+import random
+import time
+from datetime import datetime, timedelta
+
+from medication_store import MedicationRepository
+
+SIZES = [1_000, 10_000, 100_000]
+LOOKUPS = 2_000
+
+
+def make_medication(i, base_date):
+    return {
+        "name": f"테스트약{i % 500}",
+        "dosage": 3,
+        "days": 7,
+        "before_meal": False,
+        "times": ["아침", "점심", "저녁"],
+        "notification_times": {},
+        "registered_date": (base_date - timedelta(days=i % 1500)).isoformat(),
+        "image_hash": "",
+        "description": ""
+    }
+
+
+def per_call_us(func, keys):
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys) * 1_000_000
+
+
+def main():
+    base_date = datetime.now()
+    print("=" * 96)
+    print(f"{'약 개수':>10} {'리스트 탐색(us)':>18} {'저장소 get(us)':>16} {'이름 인덱스(us)':>16}"
+          f" {'오늘 약 스캔(us)':>16} {'오늘 약 인덱스(us)':>16}")
+    print("=" * 96)
+    for size in SIZES:
+        repo = MedicationRepository()
+        meds_list = []
+        for i in range(size):
+            med = repo.add(make_medication(i, base_date))
+            meds_list.append(med)
+        keys = [random.randint(1, size) for _ in range(LOOKUPS)]
+        names = [f"테스트약{k % 500}" for k in keys]
+
+        # 리스트 선형 탐색은 너무 느리므로 일부만 측정
+        linear_keys = keys[:max(10, LOOKUPS * 1_000 // size)]
+        linear = per_call_us(
+            lambda k: next((m for m in meds_list if m['id'] == k), None), linear_keys
+        )
+        indexed = per_call_us(repo.get, keys)
+        # 이름 인덱스는 결과 개수(약 개수 / 500)에 비례해서 늘어나는 것이 정상
+        by_name = per_call_us(repo.find_by_name, names)
+
+        today = base_date.date()
+        active_scan = per_call_us(lambda d: [
+            m for m in meds_list
+            if 0 <= (d - datetime.fromisoformat(m['registered_date']).date()).days < m['days']
+        ], [today] * 3)
+        active_indexed = per_call_us(repo.active_on, [today] * 200)
+        print(f"{size:>10,} {linear:>18.2f} {indexed:>16.3f} {by_name:>16.2f}"
+              f" {active_scan:>16.1f} {active_indexed:>16.2f}")
+    print("=" * 96)
+
+
+if __name__ == "__main__":
+    main()
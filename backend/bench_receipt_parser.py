@@ -0,0 +1,122 @@
+"""
+약품 표 파서(receipt_parser) 속도 측정 스크립트
+sample_receipts 폴더의 영수증 OCR 텍스트로 기존 파서(줄마다 키워드 리스트 any() + 정규식 여러 번)와
+새 파서(미리 컴파일한 정규식 + 키워드 자동자로 한 번에 분류)를 비교한다.
+두 파서의 결과가 다르면 어느 영수증인지 출력하고 종료 코드 1로 끝난다.
+
+사용법: python bench_receipt_parser.py [반복 횟수]
+"""
+import os
+import re
+import sys
+import time
+
+from receipt_parser import extract_table_medications
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sample_receipts')
+
+
+# -------- 비교용: 기존 파서 (app.py에 있던 그대로) --------
+
+def legacy_parse_medication_line(line):
+    line = line.strip()
+    if not line:
+        return None
+    if re.fullmatch(r'[\d\s,\.원]+', line):
+        return None
+    m = re.search(r'\s+\d+(\s|$)', line)
+    if m:
+        name = line[:m.start()].strip()
+    else:
+        name = line.strip()
+    nums = re.findall(r'\d+', line)
+    dosage = days = None
+    if len(nums) >= 2:
+        dosage = int(re.search(r'\d+', nums[-2]).group())
+        days = int(re.search(r'\d+', nums[-1]).group())
+    name = re.sub(r'\s*\d+\s*(mg|MG|ml|ML)\b.*$', '', name).strip()
+    if not name:
+        return None
+    return {"name": name, "dosage": dosage, "days": days, "before_meal": None, "times": []}
+
+
+def legacy_extract_table_medications(raw_text):
+    meds = []
+    if not raw_text:
+        return meds
+    lines = [l.strip() for l in raw_text.splitlines()]
+    header_idx = None
+    for i, line in enumerate(lines):
+        if ('약품' in line or '약 품' in line) and any(k in line for k in ['횟수', '일수', '투약', '투약량']):
+            header_idx = i + 1
+            break
+    if header_idx is None:
+        header_idx = 0
+    skip_keywords = [
+        '사업자', '등록번호', '요양기관', '성명', '환자', '연락처', '전화', 'TEL',
+        '주소', '대구광역시', '광역시', '구 ', '동 ', '합계', '총 수 납', '총수납',
+        '요양급여', '본인부담', '영수증', '카드', '현금', '처방전', '조제', '조제료',
+        '사용상', '주의사항', '주의 하세요', '보험', '발행일', '금액', '총액',
+        '유효기간', '유효 사용기간', '유효사용기간', '유효 사용 기한', '주사액'
+    ]
+    for line in lines[header_idx:]:
+        if not line:
+            continue
+        if any(k in line for k in ['유효기간', '유효사용기간', '유효 사용기간', '사용상 주의사항']):
+            break
+        if any(k in line for k in skip_keywords):
+            continue
+        parsed = legacy_parse_medication_line(line)
+        if not parsed:
+            continue
+        meds.append(parsed)
+    return meds
+
+
+def load_corpus():
+    corpus = []
+    for filename in sorted(os.listdir(CORPUS_DIR)):
+        if filename.endswith('.txt'):
+            with open(os.path.join(CORPUS_DIR, filename), encoding='utf-8') as f:
+                corpus.append((filename, f.read()))
+    return corpus
+
+
+def per_receipt_us(func, texts, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            func(text)
+    return (time.perf_counter() - start) / (rounds * len(texts)) * 1_000_000
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    corpus = load_corpus()
+
+    mismatches = []
+    for filename, text in corpus:
+        expected = legacy_extract_table_medications(text)
+        actual = extract_table_medications(text)
+        if expected != actual:
+            mismatches.append(filename)
+        print(f"{filename:<28} 약 {len(actual)}개: {', '.join(m['name'] for m in actual)}")
+
+    texts = [text for _, text in corpus]
+    lines = sum(len(text.splitlines()) for text in texts)
+    legacy = per_receipt_us(legacy_extract_table_medications, texts, rounds)
+    current = per_receipt_us(extract_table_medications, texts, rounds)
+    print("=" * 64)
+    print(f"영수증 {len(texts)}개 (총 {lines}줄) x {rounds:,}회")
+    print(f"{'기존 파서':<16} {legacy:>10.2f} us/영수증")
+    print(f"{'새 파서':<16} {current:>10.2f} us/영수증  ({legacy / current:.2f}배)")
+    print("=" * 64)
+
+    if mismatches:
+        print("기존 파서와 결과가 다른 영수증: " + ', '.join(mismatches))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import base64
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+
+_HASH_RE = re.compile(r'[0-9a-f]{64}')
+
+
+def is_blob_hash(value):
+    """sha256 16진수 64자리인지 (클라이언트가 보낸 해시로 경로를 만들기 전에 반드시 확인)"""
+    return isinstance(value, str) and _HASH_RE.fullmatch(value) is not None
+
+
+class BlobStore:
+    """
+    이미지 같은 큰 바이너리를 내용 해시(sha256) 이름으로 디스크에 한 번만 저장하는 저장소.
+    - 같은 사진은 몇 번을 올려도 파일 하나만 생김
+    - 약 기록에는 해시 문자열만 남기고, 필요할 때 mmap으로 읽어서 메모리에 통째로 올리지 않음
+    """
+
+    def __init__(self, folder):
+        # send_file 등에서 작업 폴더와 상관없이 쓸 수 있도록 절대 경로로 보관
+        self.folder = os.path.abspath(folder)
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder)
+
+    def path(self, blob_hash):
+        """해시 → 파일 경로. 해시 형식이 아니면 ValueError (저장소 밖 파일을 가리키지 못하게)"""
+        if not is_blob_hash(blob_hash):
+            raise ValueError('이미지 해시 형식이 올바르지 않습니다.')
+        # 한 폴더에 파일이 너무 많아지지 않도록 앞 두 글자로 하위 폴더를 나눔
+        return os.path.join(self.folder, blob_hash[:2], blob_hash)
+
+    def exists(self, blob_hash):
+        return is_blob_hash(blob_hash) and os.path.exists(self.path(blob_hash))
+
+    def put_bytes(self, data):
+        """바이트를 저장하고 해시를 반환 (이미 있으면 다시 쓰지 않음)"""
+        blob_hash = hashlib.sha256(data).hexdigest()
+        target = self.path(blob_hash)
+        if os.path.exists(target):
+            return blob_hash
+        folder = os.path.dirname(target)
+        os.makedirs(folder, exist_ok=True)
+        # 임시 파일에 다 쓴 뒤 이름을 바꿔서, 다른 워커가 반쯤 쓴 파일을 읽지 않게 함
+        fd, tmp_path = tempfile.mkstemp(dir=folder)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, target)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return blob_hash
+
+    def put_base64(self, image_base64):
+        """base64 문자열을 한 번만 디코딩해서 저장. 형식이 잘못되거나 비어 있으면 binascii.Error/ValueError"""
+        data = base64.b64decode(image_base64)
+        if not data:
+            raise ValueError('빈 이미지입니다.')
+        return self.put_bytes(data)
+
+    def put_stream(self, stream, chunk_size=64 * 1024, max_bytes=None):
+        """
+        파일 객체(업로드 스트림)를 조각 단위로 임시 파일에 쓰면서 해시를 계산하고 저장.
+        요청 본문 전체를 메모리에 올리지 않는다. 비어 있거나 max_bytes를 넘으면 ValueError
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise ValueError('이미지가 너무 큽니다.')
+                    digest.update(chunk)
+                    f.write(chunk)
+            if size == 0:
+                raise ValueError('빈 이미지입니다.')
+            blob_hash = digest.hexdigest()
+            target = self.path(blob_hash)
+            if os.path.exists(target):
+                os.remove(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(tmp_path, target)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return blob_hash
+
+    def read_base64(self, blob_hash):
+        """저장된 바이트를 base64 문자열로 (외부 API에 보낼 때 한 번만 인코딩)"""
+        with self.open_view(blob_hash) as view:
+            if view is None:
+                raise FileNotFoundError(blob_hash)
+            return base64.b64encode(view).decode('ascii')
+
+    @contextmanager
+    def open_view(self, blob_hash):
+        """
+        저장된 바이트를 읽기 전용 memoryview(mmap)로 빌려줌. 없으면 None.
+            with blob_store.open_view(h) as view: ...
+        """
+        target = self.path(blob_hash)
+        if not os.path.exists(target) or os.path.getsize(target) == 0:
+            yield None
+            return
+        with open(target, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        try:
+            yield view
+        finally:
+            view.release()
+            mapped.close()
+
+    def mimetype(self, blob_hash):
+        """파일 앞부분(매직 바이트)으로 이미지 형식 추정"""
+        with open(self.path(blob_hash), 'rb') as f:
+            head = f.read(12)
+        if head.startswith(b'\x89PNG'):
+            return 'image/png'
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            return 'image/webp'
+        return 'image/jpeg'
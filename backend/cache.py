@@ -0,0 +1,235 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    크기 제한 + TTL이 있는 스레드 안전 LRU 캐시.
+    - maxsize개를 넘으면 가장 오래 안 쓰인 항목부터 버림
+    - ttl(초)이 지나면 만료된 것으로 보고 miss 처리 (None이면 만료 없음)
+    - hits/misses/evictions 카운터 제공
+    """
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (저장 시각, 값)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            stored_at, value = item
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key, default=None):
+        """get과 같지만 hits/misses와 LRU 순서는 건드리지 않음 (이미 get으로 센 조회를 다시 확인할 때)"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            stored_at, value = item
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                return default
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        """hit/miss 통계 (헬스체크/메트릭용)"""
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_ratio': round(self.hits / total, 4) if total else 0.0
+        }
+
+
+class DiskBackedCache:
+    """
+    메모리 LRU + 디스크(SQLite 파일) 2단 캐시.
+    - 재시작/재배포 후에도 디스크에 남은 값은 그대로 재사용
+    - 여러 gunicorn 워커가 같은 파일을 공유해도 되도록 SQLite 사용 (값은 JSON 문자열)
+    """
+
+    def __init__(self, path, maxsize=1024):
+        self.path = path
+        self.memory = LRUCache(maxsize=maxsize)
+        self.disk_hits = 0
+        self._local = threading.local()
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+
+    def _connect(self):
+        # sqlite3 연결은 스레드 간 공유가 안 되므로 스레드마다 하나씩
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, keys):
+        """keys 중 캐시에 있는 것만 {key: value}로 반환"""
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.memory.get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            placeholders = ','.join('?' * len(missing))
+            rows = self._connect().execute(
+                f"SELECT key, value FROM cache WHERE key IN ({placeholders})", missing
+            ).fetchall()
+            for key, raw in rows:
+                value = json.loads(raw)
+                self.memory.set(key, value)
+                found[key] = value
+                self.disk_hits += 1
+        return found
+
+    def set_many(self, mapping):
+        if not mapping:
+            return
+        for key, value in mapping.items():
+            self.memory.set(key, value)
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)",
+                [(k, json.dumps(v, ensure_ascii=False)) for k, v in mapping.items()]
+            )
+
+    def stats(self):
+        stats = self.memory.stats()
+        stats['disk_hits'] = self.disk_hits
+        stats['path'] = self.path
+        return stats
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.lock = threading.Lock()
+        self.listeners = []
+        self.last_event = None
+
+    def report(self, event):
+        # 리스너 호출도 잠금 안에서 해서, 중간에 합류한 요청이 이벤트를 거꾸로 받지 않게 함
+        with self.lock:
+            self.last_event = event
+            for listener in self.listeners:
+                listener(event)
+
+    def listen(self, listener):
+        with self.lock:
+            self.listeners.append(listener)
+            if self.last_event is not None:
+                listener(self.last_event)
+
+
+class SingleFlight:
+    """
+    같은 키의 작업이 이미 진행 중이면 새로 실행하지 않고 그 결과를 같이 받는다.
+    (여러 기기가 동시에 같은 약 설명/같은 사진 OCR을 요청할 때 OpenAI 호출 1번으로 합치기)
+        result, shared = flight.do(key, lambda: ...)
+    - 먼저 들어온 요청(leader)만 func를 실행하고, 나머지는 끝날 때까지 기다림
+    - func가 예외를 내면 기다리던 요청도 같은 예외를 받음
+    - 끝난 작업은 바로 잊어버리므로 결과 보관은 캐시가 담당
+    - progress 콜백을 넘기면 func는 func(report)로 호출되고, report(단계)는 leader와 기다리는 요청
+      모두의 progress로 전달된다 (늦게 합류한 요청은 마지막 단계부터 받음).
+      같은 키는 항상 progress를 넘기거나 항상 넘기지 않아야 한다.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, func, progress=None):
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                leader = True
+
+        if progress is not None:
+            call.listen(progress)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = func(call.report) if progress is not None else func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        with self._lock:
+            return {
+                'in_flight': len(self._calls),
+                'executions': self.executions,
+                'coalesced': self.coalesced
+            }
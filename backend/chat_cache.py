@@ -0,0 +1,81 @@
+import re
+import unicodedata
+
+from cache import LRUCache
+
+
+# 단어 끝에서 떼어낼 조사/어미 (긴 것부터 검사)
+JOSA_SUFFIXES = sorted([
+    '이에요', '이예요', '인가요', '인데요', '입니까', '습니까', '합니까',
+    '에서는', '에게는', '으로는',
+    '에서', '에게', '한테', '으로', '까지', '부터', '이랑', '하고', '예요', '에요', '나요', '까요', '세요',
+    '은', '는', '이', '가', '을', '를', '에', '로', '와', '과', '도', '만', '요', '의'
+], key=len, reverse=True)
+
+_PUNCTUATION_RE = re.compile(r'[^\w\s]', re.UNICODE)
+_SPACES_RE = re.compile(r'\s+')
+
+
+def strip_josa(token):
+    for suffix in JOSA_SUFFIXES:
+        # "이", "약" 처럼 조사만 남는 경우는 그대로 둠
+        if token.endswith(suffix) and len(token) > len(suffix):
+            return token[:-len(suffix)]
+    return token
+
+
+def normalize_question(message):
+    """
+    챗봇 질문을 캐시 키로 쓰기 위해 정규화.
+    - 전각/반각, 대소문자 통일 (NFKC + lower)
+    - 문장부호 제거, 띄어쓰기 차이 무시
+    - 단어 끝 조사/어미 하나 제거 ("30분이 언제예요?" == "30분은 언제에요")
+    """
+    text = unicodedata.normalize('NFKC', message or '').lower()
+    text = _PUNCTUATION_RE.sub(' ', text).replace('_', ' ')
+    tokens = [strip_josa(t) for t in _SPACES_RE.split(text) if t]
+    return ''.join(tokens)
+
+
+class ChatAnswerCache:
+    """
+    자주 묻는 질문 답변 캐시.
+    mode:
+    - 'off'    : 캐시 사용 안 함
+    - 'on'     : 처음 생성한 답변을 TTL 동안 재사용
+    - 'pinned' : 캐시에 없을 때 temperature=0으로 답을 만들고, 그 답을 만료 없이 고정해서 재사용
+    """
+
+    MODES = ('off', 'on', 'pinned')
+
+    def __init__(self, mode='on', maxsize=512, ttl=6 * 60 * 60):
+        if mode not in self.MODES:
+            print(f"[경고] 알 수 없는 CHAT_CACHE_MODE '{mode}', 'on'으로 사용합니다.")
+            mode = 'on'
+        self.mode = mode
+        self._cache = LRUCache(maxsize=maxsize, ttl=None if mode == 'pinned' else ttl)
+
+    @property
+    def enabled(self):
+        return self.mode != 'off'
+
+    @property
+    def temperature(self):
+        """캐시에 없을 때 답변 생성에 쓸 temperature (None이면 기본값 사용)"""
+        return 0.0 if self.mode == 'pinned' else None
+
+    def get(self, message):
+        if not self.enabled:
+            return None
+        key = normalize_question(message)
+        return self._cache.get(key) if key else None
+
+    def set(self, message, answer):
+        key = normalize_question(message)
+        if self.enabled and key and answer:
+            self._cache.set(key, answer)
+
+    def stats(self):
+        stats = self._cache.stats()
+        stats['mode'] = self.mode
+        return stats
@@ -0,0 +1,65 @@
+"""
+복용 기록 날짜 인덱스.
+
+복용 기록 목록(medication_history_db)은 덧붙이기만 하므로 목록 위치(pos)가 곧 저장 순서다.
+날짜('YYYY-MM-DD')마다 그날 기록의 위치를 오름차순으로 모아 두고, 날짜 목록은 정렬해 둔다.
+기간 조회는 end_date 쪽 날짜부터 start_date 쪽 날짜까지만 보고 목록 전체를 훑지 않는다.
+(기록의 날짜가 저장 순서와 어긋나도 - 예: 과거 날짜로 불러온 기록 - 위치 순서대로 돌려준다)
+"""
+import bisect
+import heapq
+import threading
+
+
+class HistoryDateIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._positions = {}  # 'YYYY-MM-DD' -> [목록 위치, ...] (오름차순)
+        self._dates = []      # 기록이 있는 날짜 (정렬)
+
+    def _add(self, position, record):
+        date_str = record.get('date')
+        if not isinstance(date_str, str):
+            return
+        positions = self._positions.get(date_str)
+        if positions is None:
+            positions = self._positions[date_str] = []
+            bisect.insort(self._dates, date_str)
+        positions.append(position)
+
+    def append(self, history, records):
+        """history 목록 끝에 records를 덧붙이고 위치를 인덱스에 기록 (동시에 저장해도 위치가 어긋나지 않게 잠금 안에서)"""
+        with self._lock:
+            start = len(history)
+            history.extend(records)
+            for offset, record in enumerate(records):
+                self._add(start + offset, record)
+
+    def rebuild(self, history):
+        with self._lock:
+            self._positions = {}
+            self._dates = []
+            for position, record in enumerate(history):
+                self._add(position, record)
+
+    def positions_between(self, start_date, end_date, before=None):
+        """
+        date가 start_date ~ end_date(양 끝 포함)인 기록 위치를 큰 것부터 차례로 돌려주는 iterator.
+        before를 주면 그보다 작은 위치만.
+        """
+        with self._lock:
+            lo = bisect.bisect_left(self._dates, start_date)
+            hi = bisect.bisect_right(self._dates, end_date)
+            # 날짜별 위치 목록은 덧붙이기만 하므로, 지금 길이까지만 보면 잠금 밖에서 읽어도 안전
+            ranges = []
+            for date_str in self._dates[lo:hi]:
+                positions = self._positions[date_str]
+                end = len(positions) if before is None else bisect.bisect_left(positions, before)
+                if end:
+                    ranges.append((positions, end))
+        return heapq.merge(*(_descending(positions, end) for positions, end in ranges), reverse=True)
+
+
+def _descending(positions, end):
+    for i in range(end - 1, -1, -1):
+        yield positions[i]
@@ -0,0 +1,78 @@
+"""
+조회 API용 조건부 GET (ETag / If-None-Match).
+
+- 데이터 묶음(약, 복용 기록 등)마다 버전 번호를 두고, 쓰기가 있을 때마다 올림
+- ETag는 (경로, 쿼리, 관련 묶음 버전, 오늘 날짜)로 만들기 때문에 응답을 계산하기 전에 알 수 있음
+  → 클라이언트가 가진 ETag와 같으면 아무 계산 없이 304
+- 직렬화한 응답 본문은 ETag별로 캐시해서, 다른 클라이언트가 같은 내용을 요청해도 다시 만들지 않음
+"""
+import hashlib
+import threading
+import uuid
+from datetime import date
+from functools import wraps
+
+from flask import Response, request
+
+
+class CollectionVersions:
+    """데이터 묶음별 버전 카운터. 서버가 재시작되면 ETag가 달라지도록 부팅 id를 섞음"""
+
+    def __init__(self, names):
+        self._boot_id = uuid.uuid4().hex
+        self._versions = {name: 0 for name in names}
+        self._lock = threading.Lock()
+
+    def bump(self, *names):
+        with self._lock:
+            for name in names:
+                self._versions[name] += 1
+
+    def get(self, name):
+        with self._lock:
+            return self._versions[name]
+
+    def etag(self, path, args, names):
+        """요청 하나에 대한 ETag 값 (따옴표 없는 문자열)"""
+        with self._lock:
+            versions = ','.join(f"{name}={self._versions[name]}" for name in names)
+        query = '&'.join(f"{k}={v}" for k, v in sorted(args.items(multi=True)))
+        # '오늘의 약', 기본 연/월처럼 날짜에 따라 결과가 바뀌는 API가 있으므로 날짜도 포함
+        source = f"{self._boot_id}|{path}|{query}|{versions}|{date.today().isoformat()}"
+        return hashlib.sha1(source.encode('utf-8')).hexdigest()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._versions)
+
+
+def conditional_get(versions, body_cache, *names):
+    """
+    GET 라우트용 데코레이터. names는 이 응답이 의존하는 데이터 묶음 이름들.
+    - If-None-Match가 현재 ETag와 같으면 라우트를 실행하지 않고 304
+    - 같은 ETag의 본문이 캐시에 있으면 그대로 응답
+    - 200 응답만 캐시 (오류 응답은 매번 다시 계산)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            tag = versions.etag(request.path, request.args, names)
+            if request.if_none_match.contains(tag):
+                response = Response(status=304)
+                response.set_etag(tag)
+                return response
+
+            body = body_cache.get(tag)
+            if body is not None:
+                response = Response(body, mimetype='application/json')
+            else:
+                response = view(*args, **kwargs)
+                if isinstance(response, tuple) or response.status_code != 200:
+                    return response
+                body_cache.set(tag, response.get_data())
+            response.set_etag(tag)
+            # 브라우저가 저장해 두되 쓸 때마다 ETag로 확인하게 함
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,69 @@
+import io
+import time
+
+from PIL import Image, ImageOps
+
+
+def find_receipt_box(image, threshold=160, min_ratio=0.3, max_ratio=0.95):
+    """
+    어두운 배경 위의 밝은 종이(약봉투/영수증) 영역을 대충 찾아서 (left, top, right, bottom) 반환.
+    찾은 영역이 너무 작거나 사진 전체와 거의 같으면 None (자르지 않음)
+    """
+    gray = image.convert('L')
+    # 계산량을 줄이기 위해 작은 사본에서 찾고 원래 크기로 환산
+    small = gray.copy()
+    small.thumbnail((256, 256))
+    mask = small.point(lambda v: 255 if v >= threshold else 0)
+    box = mask.getbbox()
+    if not box:
+        return None
+    area_ratio = ((box[2] - box[0]) * (box[3] - box[1])) / float(small.width * small.height)
+    if area_ratio < min_ratio or area_ratio > max_ratio:
+        return None
+    scale_x = image.width / float(small.width)
+    scale_y = image.height / float(small.height)
+    return (
+        int(box[0] * scale_x),
+        int(box[1] * scale_y),
+        min(image.width, int(round(box[2] * scale_x))),
+        min(image.height, int(round(box[3] * scale_y)))
+    )
+
+
+def preprocess_image(source, max_edge=1600, grayscale=False, crop=False, quality=85):
+    """
+    Vision OCR에 보내기 전에 사진을 가볍게 만든다.
+    - EXIF 회전 정보대로 바로 세움
+    - (선택) 약봉투 영역만 잘라냄
+    - 긴 변이 max_edge를 넘으면 줄임
+    - (선택) 흑백 변환
+    - JPEG(quality)로 다시 저장
+    source: 파일 경로 또는 파일 객체
+    반환값: (JPEG 바이트, 통계 dict)
+    """
+    started = time.perf_counter()
+    with Image.open(source) as opened:
+        original_format = opened.format
+        original_size = opened.size
+        image = ImageOps.exif_transpose(opened)
+        if crop:
+            box = find_receipt_box(image)
+            if box:
+                image = image.crop(box)
+        if max(image.size) > max_edge:
+            image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        if grayscale:
+            image = image.convert('L')
+        elif image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        out = io.BytesIO()
+        image.save(out, format='JPEG', quality=quality, optimize=True)
+        processed_size = image.size
+    data = out.getvalue()
+    return data, {
+        'original_format': original_format,
+        'original_size': list(original_size),
+        'processed_size': list(processed_size),
+        'processed_bytes': len(data),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
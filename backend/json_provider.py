@@ -0,0 +1,94 @@
+"""
+Flask 응답용 JSON 직렬화.
+
+- orjson이 설치되어 있으면 orjson으로 직렬화 (C 구현이라 한글 문자열이 많은 큰 목록에서 표준 json보다 훨씬 빠름)
+- 설치되어 있지 않거나 JSON_PROVIDER=stdlib이면 Flask 기본 provider(표준 json) 그대로
+- pagination.RecordView 같은 읽기 전용 뷰는 직렬화할 때 한 건씩 dict로 펼침
+  (목록 전체의 사본을 미리 만들어 두지 않음)
+
+orjson 쪽은 한글을 \\uXXXX로 바꾸지 않고 UTF-8 그대로 내보내며, 키 정렬도 하지 않는다 (응답이 더 작고 빠름).
+"""
+import time
+from collections.abc import Mapping
+
+from flask.json.provider import DefaultJSONProvider, _default
+
+from profiling import add_phase
+
+try:
+    import orjson
+except ImportError:  # 선택 의존성
+    orjson = None
+
+
+def _default_with_views(o):
+    if hasattr(o, 'to_dict'):
+        return o.to_dict()
+    if isinstance(o, Mapping):
+        return dict(o)
+    return _default(o)
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask 기본 provider + 읽기 전용 뷰 지원"""
+    default = staticmethod(_default_with_views)
+
+    def response(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().response(*args, **kwargs)
+        finally:
+            add_phase('serialize', time.perf_counter() - started)
+
+
+class OrjsonProvider(StdlibJSONProvider):
+    """
+    orjson으로 직렬화/역직렬화. orjson이 처리하지 못하는 값(64비트를 넘는 정수 등)이 있거나
+    잘못된 요청 본문이면 표준 json으로 한 번 더 시도해서, 결과/오류는 기본 provider와 같게 맞춘다.
+    """
+    # datetime/dataclass는 Flask 기본과 같은 형식이 되도록 default로 넘김
+    OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+               | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson else 0
+
+    def _dump_bytes(self, obj, indent=False):
+        option = self.OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+        try:
+            return orjson.dumps(obj, default=self.default, option=option)
+        except TypeError:
+            return super().dumps(obj, indent=2 if indent else None,
+                                 separators=None if indent else (',', ':')).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        # json.dumps 인자(sort_keys 등)를 직접 지정한 호출은 기본 provider에 맡김
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dump_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # NaN 같이 표준 json만 받아주는 입력 + 오류 메시지를 기본과 같게
+            return super().loads(s)
+
+    def response(self, *args, **kwargs):
+        started = time.perf_counter()
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = self._dump_bytes(obj, indent) + b'\n'
+        add_phase('serialize', time.perf_counter() - started)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def create_json_provider(app, name='auto'):
+    """
+    name: auto(orjson이 있으면 orjson) / orjson / stdlib
+    orjson을 지정했는데 설치되어 있지 않으면 경고만 출력하고 표준 json 사용
+    """
+    if name in ('auto', 'orjson') and orjson is not None:
+        return OrjsonProvider(app)
+    if name == 'orjson':
+        print("[JSON] orjson이 설치되어 있지 않아 표준 json을 사용합니다.")
+    return StdlibJSONProvider(app)
@@ -0,0 +1,206 @@
+"""
+OpenAI 호출을 갈아 끼울 수 있게 해 주는 LLM 백엔드.
+
+앱 코드는 항상 client.chat.completions.create(**kwargs) 형태로만 호출하므로,
+같은 모양의 객체면 무엇이든 client 자리에 넣을 수 있다.
+
+- openai : 실제 OpenAI 클라이언트 (기본값)
+- record : 실제로 호출하면서 요청/응답 쌍을 카세트 폴더에 JSON으로 저장
+- replay : 저장된 카세트로만 응답 (API 키, 네트워크 불필요). 지연 시간을 흉내 낼 수 있음
+"""
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+
+class CassetteMissError(KeyError):
+    """replay 모드에서 요청에 맞는 카세트가 없음"""
+
+
+def cassette_key(kwargs):
+    """요청 파라미터(모델, 메시지, 온도 등) 전체를 정렬된 JSON으로 만들어 해시"""
+    canonical = json.dumps(kwargs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class LatencyModel:
+    """
+    replay 때 넣을 인공 지연 (초).
+    spec 예시:
+    - "none"               지연 없음
+    - "recorded"           녹화 당시 걸린 시간 그대로
+    - "fixed:0.8"          항상 0.8초
+    - "uniform:0.5,2.0"    0.5~2.0초 균등 분포
+    - "lognormal:0.0,0.5"  exp(N(0.0, 0.5)) 초
+    """
+
+    def __init__(self, spec="none", seed=None):
+        self.spec = spec or "none"
+        self._random = random.Random(seed)
+        kind, _, params = self.spec.partition(':')
+        self.kind = kind
+        self.params = [float(p) for p in params.split(',') if p]
+        if kind not in ('none', 'recorded', 'fixed', 'uniform', 'lognormal'):
+            raise ValueError(f"알 수 없는 지연 설정입니다: {spec}")
+
+    def sample(self, recorded_seconds=None):
+        if self.kind == 'recorded':
+            return recorded_seconds or 0.0
+        if self.kind == 'fixed':
+            return self.params[0]
+        if self.kind == 'uniform':
+            return self._random.uniform(self.params[0], self.params[1])
+        if self.kind == 'lognormal':
+            return self._random.lognormvariate(self.params[0], self.params[1])
+        return 0.0
+
+
+class _Completions:
+    def __init__(self, backend):
+        self._backend = backend
+
+    def create(self, **kwargs):
+        return self._backend.create_chat_completion(kwargs)
+
+
+class _Chat:
+    def __init__(self, backend):
+        self.completions = _Completions(backend)
+
+
+class CassetteBackend:
+    """
+    요청/응답을 카세트 폴더(요청 해시.json 파일)에 녹화하거나 재생하는 백엔드.
+    OpenAI 클라이언트처럼 backend.chat.completions.create(**kwargs)로 호출한다.
+    """
+
+    def __init__(self, folder, mode='replay', inner=None, latency=None):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"알 수 없는 카세트 모드입니다: {mode}")
+        if mode == 'record' and inner is None:
+            raise ValueError("record 모드에는 실제 클라이언트(inner)가 필요합니다.")
+        self.folder = folder
+        self.mode = mode
+        self.inner = inner
+        self.latency = latency or LatencyModel()
+        self.chat = _Chat(self)
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.json")
+
+    def with_options(self, **options):
+        """
+        OpenAI 클라이언트의 with_options와 같은 용도 (호출 위치별 타임아웃 등).
+        녹화 모드면 옵션을 적용한 실제 클라이언트로 호출하고 녹화/통계는 이 백엔드가 그대로 맡는다.
+        재생 모드는 실제 호출이 없으므로 자기 자신을 돌려준다.
+        """
+        if self.mode != 'record' or not hasattr(self.inner, 'with_options'):
+            return self
+        return _CassetteOptions(self, self.inner.with_options(**options))
+
+    def create_chat_completion(self, kwargs, inner=None):
+        key = cassette_key(kwargs)
+        if self.mode == 'record':
+            return self._record(key, kwargs, inner or self.inner)
+        return self._replay(key, kwargs)
+
+    # -------- 녹화 --------
+
+    def _record(self, key, kwargs, inner):
+        started = time.perf_counter()
+        response = inner.chat.completions.create(**kwargs)
+        if not kwargs.get('stream'):
+            self._write(key, kwargs, {
+                'elapsed': time.perf_counter() - started,
+                'response': response.model_dump(mode='json')
+            })
+            return response
+        return self._record_stream(key, kwargs, response, started)
+
+    def _record_stream(self, key, kwargs, stream, started):
+        chunks = []
+        first_chunk_elapsed = None
+        for chunk in stream:
+            if first_chunk_elapsed is None:
+                first_chunk_elapsed = time.perf_counter() - started
+            chunks.append(chunk.model_dump(mode='json'))
+            yield chunk
+        self._write(key, kwargs, {
+            'elapsed': time.perf_counter() - started,
+            'first_chunk_elapsed': first_chunk_elapsed,
+            'chunks': chunks
+        })
+
+    def _write(self, key, kwargs, entry):
+        entry['request'] = {k: v for k, v in kwargs.items() if k != 'messages'}
+        entry['recorded_at'] = time.time()
+        # 다 쓴 뒤 이름을 바꿔서 반쯤 쓴 카세트가 재생되지 않게 함
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(key))
+        with self._lock:
+            self.recorded += 1
+
+    # -------- 재생 --------
+
+    def _replay(self, key, kwargs):
+        path = self._path(key)
+        if not os.path.exists(path):
+            with self._lock:
+                self.misses += 1
+            raise CassetteMissError(f"녹화된 응답이 없습니다 (model={kwargs.get('model')}, key={key[:12]})")
+        with open(path, encoding='utf-8') as f:
+            entry = json.load(f)
+        with self._lock:
+            self.hits += 1
+        if 'chunks' in entry:
+            return self._replay_stream(entry)
+        time.sleep(self.latency.sample(entry.get('elapsed')))
+        return ChatCompletion.model_validate(entry['response'])
+
+    def _replay_stream(self, entry):
+        # 첫 조각 전에 첫 토큰 지연을, 나머지 조각 사이에는 남은 시간을 나눠서 기다림
+        total = self.latency.sample(entry.get('elapsed'))
+        first = entry.get('first_chunk_elapsed')
+        if self.latency.kind != 'recorded' or first is None:
+            first = total
+        chunks = entry['chunks']
+        gap = max(total - first, 0.0) / max(len(chunks) - 1, 1)
+        for i, chunk in enumerate(chunks):
+            time.sleep(first if i == 0 else gap)
+            yield ChatCompletionChunk.model_validate(chunk)
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'folder': self.folder,
+            'latency': self.latency.spec,
+            'hits': self.hits,
+            'misses': self.misses,
+            'recorded': self.recorded
+        }
+
+
+class _CassetteOptions:
+    """CassetteBackend.with_options 결과: 실제 호출만 옵션이 적용된 클라이언트로 하고 녹화는 원래 백엔드가 함"""
+
+    def __init__(self, backend, inner):
+        self._backend = backend
+        self._inner = inner
+        self.chat = _Chat(self)
+
+    def create_chat_completion(self, kwargs):
+        return self._backend.create_chat_completion(kwargs, inner=self._inner)
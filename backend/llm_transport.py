@@ -0,0 +1,264 @@
+"""
+OpenAI 호출용 전송 계층.
+
+- 연결 풀 크기/keep-alive를 정해 둔 httpx 클라이언트 하나를 모든 호출이 같이 사용
+- 호출 위치(call_site: ocr, extract, chat, descriptions)마다 다른 타임아웃
+- 일시적인 오류(타임아웃, 연결 오류, 429, 5xx)는 지터를 준 지수 백오프로 재시도하되,
+  전체 재시도 양은 RetryBudget으로 제한 (장애 때 재시도가 부하를 키우지 않도록)
+- 호출 위치별 서킷 브레이커: 연속으로 실패하면 한동안 바로 CircuitOpenError를 내서
+  워커가 느린 업스트림을 기다리며 묶이지 않게 함
+
+앱 코드는 그대로 client.chat.completions.create(**kwargs)로 호출하고,
+call_site="ocr" 처럼 호출 위치만 추가로 넘긴다.
+observer를 넘기면 호출이 끝날 때마다 (호출 위치, 걸린 초, 결과, 응답) 으로 불러 준다 (메트릭용).
+"""
+import random
+import threading
+import time
+
+import httpx
+import openai
+
+from llm_backend import _Chat
+
+
+class CircuitOpenError(Exception):
+    """서킷 브레이커가 열려 있어서 업스트림을 호출하지 않고 바로 실패"""
+
+    def __init__(self, call_site, retry_after):
+        super().__init__(f"{call_site} 호출이 잠시 중단된 상태입니다 ({retry_after:.1f}초 후 재시도)")
+        self.call_site = call_site
+        self.retry_after = retry_after
+
+
+def build_http_client(max_connections=20, max_keepalive=10, keepalive_expiry=30.0, connect_timeout=5.0):
+    """OpenAI 클라이언트에 넘길 httpx 클라이언트 (연결 풀 + keep-alive)"""
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry
+        ),
+        timeout=httpx.Timeout(60.0, connect=connect_timeout)
+    )
+
+
+def is_retryable(error):
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class RetryBudget:
+    """
+    재시도 토큰 통.
+    - 원래 요청 1건마다 ratio개씩 쌓이고, 초당 min_per_second개씩 따로 채워짐 (트래픽이 적을 때용)
+    - 재시도 1번에 토큰 1개 사용, 토큰이 없으면 재시도하지 않음
+    """
+
+    def __init__(self, ratio=0.2, min_per_second=0.5, max_tokens=10.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.exhausted = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            self.exhausted += 1
+            return False
+
+    def stats(self):
+        with self._lock:
+            self._refill()
+            return {'tokens': round(self._tokens, 2), 'exhausted': self.exhausted}
+
+
+class CircuitBreaker:
+    """
+    연속 실패 failure_threshold번이면 열림(open) → reset_timeout초 동안 바로 실패.
+    그 뒤 한 건만 시험 삼아 보내서(half_open) 성공하면 닫히고, 실패하면 다시 열림.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """호출해도 되면 그냥 반환, 아니면 CircuitOpenError"""
+        with self._lock:
+            if self.state == 'open':
+                remaining = self.opened_at + self.reset_timeout - time.monotonic()
+                if remaining > 0:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, remaining)
+                self.state = 'half_open'
+            if self.state == 'half_open':
+                if self._trial_in_flight:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.reset_timeout)
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """상태/실패 횟수는 그대로 두고 시험 호출 자리만 비움 (업스트림 상태를 알 수 없는 결과일 때)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    print(f"[LLM] {self.name} 서킷 브레이커 열림 (연속 실패 {self.failures}회)")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {'state': self.state, 'failures': self.failures, 'rejected': self.rejected}
+
+
+class ResilientClient:
+    """
+    OpenAI 클라이언트(또는 같은 모양의 백엔드)를 감싸서 타임아웃/재시도/서킷 브레이커를 적용.
+    timeouts: {호출 위치: 초}. 'default'는 call_site가 없거나 목록에 없을 때 사용.
+    connect_timeout: 연결 타임아웃(초). 주면 호출 위치별 타임아웃은 연결 이후(읽기/쓰기/풀 대기)에만 적용.
+    observer(call_site, seconds, outcome, response): 재시도까지 포함한 호출 하나가 끝날 때마다 호출.
+    outcome은 'ok' / 'error' / 'circuit_open', 실패면 response는 None.
+    """
+
+    def __init__(self, inner, timeouts, max_attempts=3, backoff_base=0.5, backoff_cap=4.0,
+                 budget=None, failure_threshold=5, reset_timeout=30.0, observer=None,
+                 connect_timeout=None):
+        self.inner = inner
+        self.timeouts = dict(timeouts)
+        self.connect_timeout = connect_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.budget = budget or RetryBudget()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.observer = observer
+        self.chat = _Chat(self)
+        self.retries = 0
+        self._breakers = {}
+        self._site_clients = {}
+        self._lock = threading.Lock()
+
+    def _breaker(self, call_site):
+        with self._lock:
+            breaker = self._breakers.get(call_site)
+            if breaker is None:
+                breaker = CircuitBreaker(call_site, self.failure_threshold, self.reset_timeout)
+                self._breakers[call_site] = breaker
+            return breaker
+
+    def _client_for(self, call_site):
+        # 실제 OpenAI 클라이언트면 호출 위치별 타임아웃을 적용한 사본을 한 번만 만들어 둠
+        # (카세트 녹화 백엔드는 안쪽 실제 클라이언트에 옵션을 넘기고, with_options가 없는 백엔드는 그대로 사용)
+        with self._lock:
+            site_client = self._site_clients.get(call_site)
+            if site_client is None:
+                timeout = self.timeouts.get(call_site, self.timeouts.get('default'))
+                site_client = self.inner
+                if timeout and hasattr(self.inner, 'with_options'):
+                    # 숫자 하나만 넘기면 httpx 클라이언트에 정해 둔 연결 타임아웃까지 덮어쓰므로 따로 지정
+                    if self.connect_timeout is not None:
+                        timeout = httpx.Timeout(timeout, connect=self.connect_timeout)
+                    site_client = self.inner.with_options(timeout=timeout)
+                self._site_clients[call_site] = site_client
+            return site_client
+
+    def create_chat_completion(self, kwargs):
+        kwargs = dict(kwargs)
+        call_site = kwargs.pop('call_site', None) or 'default'
+        if self.observer is None:
+            return self._call(call_site, kwargs)
+        started = time.perf_counter()
+        outcome = 'error'
+        response = None
+        try:
+            response = self._call(call_site, kwargs)
+            outcome = 'ok'
+            return response
+        except CircuitOpenError:
+            outcome = 'circuit_open'
+            raise
+        finally:
+            self.observer(call_site, time.perf_counter() - started, outcome, response)
+
+    def _call(self, call_site, kwargs):
+        breaker = self._breaker(call_site)
+        site_client = self._client_for(call_site)
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            attempt += 1
+            breaker.before_call()
+            try:
+                response = site_client.chat.completions.create(**kwargs)
+            except Exception as e:
+                if not is_retryable(e):
+                    # 요청 자체가 잘못된 경우(400, 카세트 없음 등)는 업스트림이 건강하다는 뜻도 아니므로
+                    # 성공/실패 어느 쪽으로도 세지 않음 (half_open이면 다음 호출이 다시 시험 호출이 됨)
+                    breaker.release()
+                    raise
+                breaker.record_failure()
+                if attempt >= self.max_attempts or not self.budget.withdraw():
+                    raise
+                with self._lock:
+                    self.retries += 1
+                delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** (attempt - 1))))
+                print(f"[LLM] {call_site} 호출 실패 ({type(e).__name__}), {delay:.2f}초 후 재시도 {attempt}/{self.max_attempts - 1}")
+                time.sleep(delay)
+                continue
+            breaker.record_success()
+            return response
+
+    def stats(self):
+        with self._lock:
+            breakers = dict(self._breakers)
+            retries = self.retries
+        stats = {
+            'timeouts': self.timeouts,
+            'connect_timeout': self.connect_timeout,
+            'retries': retries,
+            'retry_budget': self.budget.stats(),
+            'breakers': {name: breaker.stats() for name, breaker in breakers.items()}
+        }
+        if hasattr(self.inner, 'stats'):
+            stats['backend'] = self.inner.stats()
+        return stats
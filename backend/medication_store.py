@@ -0,0 +1,220 @@
+import bisect
+import itertools
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+# 한 번 처방의 최대 복용 일수 (이보다 길면 잘못 입력된 값으로 봄)
+MAX_COURSE_DAYS = 365
+
+
+def registered_day(registered_date):
+    """registered_date(ISO 문자열)에서 'YYYY-MM-DD'만 뽑음. 형식이 이상하면 None"""
+    try:
+        return datetime.fromisoformat(registered_date).date().isoformat()
+    except (TypeError, ValueError):
+        return None
+
+
+def course_interval(medication):
+    """
+    약의 복용 기간을 (시작일 ordinal, 마지막날 ordinal)로 반환.
+    registered_date 형식이 이상하거나 days가 0 이하이면 None
+    """
+    days = medication.get("days")
+    if isinstance(days, bool) or not isinstance(days, int) or days <= 0:
+        return None
+    try:
+        start = datetime.fromisoformat(medication["registered_date"]).date().toordinal()
+    except (KeyError, TypeError, ValueError):
+        return None
+    return start, min(start + days - 1, date.max.toordinal())
+
+
+def validate_medication(medication):
+    """
+    저장 전에 복용 기간 값을 확인. 문제가 있으면 ValueError
+    - days: 1 ~ MAX_COURSE_DAYS 사이 정수
+    - registered_date: ISO 형식 날짜/시각
+    """
+    days = medication.get("days")
+    if isinstance(days, bool) or not isinstance(days, int) or not 1 <= days <= MAX_COURSE_DAYS:
+        raise ValueError(f"복용 일수(days)는 1~{MAX_COURSE_DAYS} 사이의 정수여야 합니다.")
+    if registered_day(medication.get("registered_date")) is None:
+        raise ValueError("등록일(registered_date) 형식이 올바르지 않습니다.")
+
+
+class ActiveIntervalIndex:
+    """
+    "D일에 복용 중인 약" 조회용 구간 인덱스.
+    구간 길이를 2의 거듭제곱 단위로 나눈 버킷마다 시작일 순으로 정렬된 리스트를 두고,
+    버킷 k(길이 2^k 이상 2^(k+1) 미만)에서는 시작일이 [D - 2^(k+1) + 2, D] 인 구간만 보면 된다.
+    → 조회는 버킷 수 × O(log n) + 결과 개수 정도, 추가는 bisect.insort
+    """
+
+    def __init__(self):
+        self._buckets = defaultdict(list)  # k -> [(start, end, key), ...] (start 순 정렬)
+
+    def add(self, key, start, end):
+        k = (end - start + 1).bit_length() - 1
+        bisect.insort(self._buckets[k], (start, end, key))
+
+    def overlapping(self, lo, hi):
+        """[lo, hi] (ordinal, 양 끝 포함)와 겹치는 (start, end, key) 목록"""
+        found = []
+        for k, intervals in self._buckets.items():
+            # 이 버킷 구간의 최대 길이는 2^(k+1) - 1 이므로 그보다 먼저 시작한 구간은 lo에 닿지 못함
+            first = bisect.bisect_left(intervals, (lo - (1 << (k + 1)) + 2,))
+            last = bisect.bisect_left(intervals, (hi + 1,))
+            for i in range(first, last):
+                interval = intervals[i]
+                if interval[1] >= lo:
+                    found.append(interval)
+        return found
+
+    def stabbing(self, day):
+        """day(ordinal)에 걸쳐 있는 key 목록"""
+        return [key for _, _, key in self.overlapping(day, day)]
+
+    def clear(self):
+        self._buckets.clear()
+
+    def __len__(self):
+        return sum(len(v) for v in self._buckets.values())
+
+
+class MedicationRepository:
+    """
+    약 정보 저장소 (메모리).
+    - id → 약 dict 로 바로 찾기 (O(1))
+    - 여러 워커 스레드에서 동시에 등록해도 id가 겹치지 않는 단조 증가 id 발급
+    - 보조 인덱스: 약 이름별, 등록 날짜별 id 목록, 복용 기간 구간 인덱스, 정렬된 id 목록(최근 등록 순 페이지 조회)
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_id = {}  # 등록 순서 유지 (dict는 삽입 순서 보존)
+        self._sorted_ids = []
+        self._by_name = defaultdict(list)
+        self._by_day = defaultdict(list)
+        self._active = ActiveIntervalIndex()
+        self._id_counter = itertools.count(1)
+
+    def next_id(self):
+        with self._lock:
+            return next(self._id_counter)
+
+    def reserve_ids_through(self, medication_id):
+        """이후 발급하는 id가 medication_id보다 커지도록 카운터를 당김 (다른 워커가 먼저 쓴 id 건너뛰기)"""
+        with self._lock:
+            self._reserve_id(medication_id)
+
+    def add(self, medication):
+        """약 dict를 저장. id가 없으면 새로 발급해서 채움"""
+        with self._lock:
+            if medication.get("id") is None:
+                medication["id"] = self.next_id()
+            elif medication["id"] in self._by_id:
+                raise ValueError(f"이미 존재하는 약 ID입니다: {medication['id']}")
+            else:
+                self._reserve_id(medication["id"])
+            self._by_id[medication["id"]] = medication
+            self._index(medication)
+            return medication
+
+    def add_many(self, medications):
+        with self._lock:
+            for medication in medications:
+                self.add(medication)
+        return medications
+
+    def _reserve_id(self, medication_id):
+        # 밖에서 정한 id로 저장된 경우, 이후 발급 id가 그보다 커지도록 카운터를 당겨 둠
+        if isinstance(medication_id, int):
+            upcoming = next(self._id_counter)
+            self._id_counter = itertools.count(max(upcoming, medication_id + 1))
+
+    def _index(self, medication):
+        bisect.insort(self._sorted_ids, medication["id"])
+        name = (medication.get("name") or "").strip()
+        if name:
+            self._by_name[name].append(medication["id"])
+        day = registered_day(medication.get("registered_date"))
+        if day:
+            self._by_day[day].append(medication["id"])
+        interval = course_interval(medication)
+        if interval:
+            self._active.add(medication["id"], *interval)
+
+    def get(self, medication_id):
+        return self._by_id.get(medication_id)
+
+    def find_by_name(self, name):
+        with self._lock:
+            return [self._by_id[i] for i in self._by_name.get((name or "").strip(), [])]
+
+    def find_by_registered_date(self, day):
+        """day: date 객체 또는 'YYYY-MM-DD' 문자열"""
+        if not isinstance(day, str):
+            day = day.isoformat()
+        with self._lock:
+            return [self._by_id[i] for i in self._by_day.get(day, [])]
+
+    def active_on(self, day):
+        """day(date)에 복용 기간 중인 약 목록 (등록 순서)"""
+        with self._lock:
+            ids = sorted(self._active.stabbing(day.toordinal()))
+            return [self._by_id[i] for i in ids]
+
+    def active_between(self, start_day, end_day):
+        """
+        [start_day, end_day] 기간과 복용 기간이 겹치는 약 목록.
+        반환값: (약 dict, 겹치는 첫날 date, 겹치는 마지막날 date) 리스트 (등록 순서)
+        """
+        lo, hi = start_day.toordinal(), end_day.toordinal()
+        with self._lock:
+            found = sorted(self._active.overlapping(lo, hi), key=lambda item: item[2])
+            return [
+                (self._by_id[key], date.fromordinal(max(s, lo)), date.fromordinal(min(e, hi)))
+                for s, e, key in found
+            ]
+
+    def required_pairs_between(self, start_day, end_day):
+        """기간 안의 날짜별 (약 id, 시간대) 쌍 집합. 먹을 약이 없는 날은 키가 없음"""
+        pairs_by_day = defaultdict(set)
+        for med, first, last in self.active_between(start_day, end_day):
+            pairs = [(med['id'], t) for t in med.get('times', [])]
+            if not pairs:
+                continue
+            current = first
+            while current <= last:
+                pairs_by_day[current.isoformat()].update(pairs)
+                current += timedelta(days=1)
+        return dict(pairs_by_day)
+
+    def newest(self, limit, before_id=None):
+        """id 내림차순(최근 등록 순)으로 before_id보다 작은 id의 약을 최대 limit개"""
+        with self._lock:
+            end = len(self._sorted_ids) if before_id is None else bisect.bisect_left(self._sorted_ids, before_id)
+            ids = self._sorted_ids[max(0, end - limit):end]
+            return [self._by_id[i] for i in reversed(ids)]
+
+    def all(self):
+        """등록 순서대로 전체 약 목록 (스냅샷)"""
+        with self._lock:
+            return list(self._by_id.values())
+
+    def clear(self):
+        with self._lock:
+            self._by_id.clear()
+            del self._sorted_ids[:]
+            self._by_name.clear()
+            self._by_day.clear()
+            self._active.clear()
+            self._id_counter = itertools.count(1)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __iter__(self):
+        return iter(self.all())
@@ -0,0 +1,121 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFullError(Exception):
+    """대기 중인 작업이 너무 많아서 새 작업을 받을 수 없음"""
+
+
+class OCRJobQueue:
+    """
+    OCR 파이프라인을 백그라운드 스레드에서 돌리는 작업 큐.
+    - 요청 워커는 작업만 넣고 바로 응답 (job_id 반환)
+    - 정해진 수의 스레드(max_workers)만 OpenAI 호출을 수행
+    - 대기 작업이 max_pending을 넘으면 QueueFullError
+    - 끝난 작업은 keep_seconds 동안만 결과를 보관
+
+    작업 함수는 func(*args, progress=콜백) 형태로 호출되며,
+    단계가 바뀔 때 progress('ocr') 처럼 알려주면 조회/이벤트 스트림에 반영된다.
+    반환값은 (HTTP 상태 코드, 응답 dict).
+    """
+
+    def __init__(self, max_workers=2, max_pending=32, keep_seconds=3600):
+        self.max_pending = max_pending
+        self.keep_seconds = keep_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ocr-job')
+        self._jobs = {}
+        self._cond = threading.Condition()
+
+    def submit(self, func, *args):
+        with self._cond:
+            self._cleanup()
+            pending = sum(1 for job in self._jobs.values() if job['status'] in ('queued', 'running'))
+            if pending >= self.max_pending:
+                raise QueueFullError()
+            now = time.time()
+            job = {
+                'id': uuid.uuid4().hex,
+                'status': 'queued',
+                'stage': 'queued',
+                'stages': [{'stage': 'queued', 'at': now}],
+                'created_at': now,
+                'updated_at': now,
+                'status_code': None,
+                'result': None,
+                'version': 0
+            }
+            self._jobs[job['id']] = job
+        self._executor.submit(self._run, job['id'], func, args)
+        return self.get(job['id'])
+
+    def _update(self, job_id, **fields):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            now = time.time()
+            if 'stage' in fields and fields['stage'] != job['stage']:
+                job['stages'].append({'stage': fields['stage'], 'at': now})
+            job.update(fields)
+            job['updated_at'] = now
+            job['version'] += 1
+            self._cond.notify_all()
+
+    def _run(self, job_id, func, args):
+        self._update(job_id, status='running')
+        try:
+            status_code, result = func(*args, progress=lambda stage: self._update(job_id, stage=stage))
+            self._update(
+                job_id,
+                status='done' if status_code < 400 else 'failed',
+                stage='done',
+                status_code=status_code,
+                result=result
+            )
+        except Exception as e:
+            print(f"[OCR 작업] {job_id} 실패: {e}")
+            self._update(
+                job_id,
+                status='failed',
+                stage='done',
+                status_code=500,
+                result={'error': f'이미지 분석 중 오류가 발생했습니다: {str(e)}'}
+            )
+
+    def _cleanup(self):
+        # 끝난 지 오래된 작업은 버림 (호출하는 쪽에서 락을 잡고 있어야 함)
+        deadline = time.time() - self.keep_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job['status'] in ('done', 'failed') and job['updated_at'] < deadline
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """작업 상태 스냅샷 (없으면 None)"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            snapshot = dict(job)
+            snapshot['stages'] = list(job['stages'])
+            return snapshot
+
+    def wait_for_change(self, job_id, version, timeout):
+        """작업 version이 바뀌거나 timeout(초)이 지날 때까지 기다렸다가 스냅샷 반환"""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: job_id not in self._jobs or self._jobs[job_id]['version'] != version,
+                timeout=timeout
+            )
+        return self.get(job_id)
+
+    def stats(self):
+        with self._cond:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+            return counts
@@ -0,0 +1,113 @@
+"""
+목록 API 공통: 커서 페이지네이션과 필드 선택.
+
+- limit  : 한 번에 받을 개수 (1~MAX_LIMIT)
+- cursor : 이전 응답의 next_cursor 값을 그대로 전달 (내용은 클라이언트가 해석하지 않는 불투명 문자열)
+- fields : "id,name,times" 처럼 필요한 필드만 골라서 받기
+
+필드 선택/내부 필드 숨기기는 RecordView로 원본 dict를 복사하지 않고 감싸서 처리하고,
+실제로 펼치는 건 JSON 직렬화 때 한 건씩 (json_provider.py)
+"""
+import base64
+import json
+from collections.abc import Mapping
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+def encode_cursor(position):
+    """dict → URL에 그대로 쓸 수 있는 커서 문자열"""
+    raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """커서 문자열 → dict. 형식이 잘못되면 ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('cursor 값이 올바르지 않습니다.')
+    if not isinstance(position, dict):
+        raise ValueError('cursor 값이 올바르지 않습니다.')
+    return position
+
+
+def parse_page_args(args, cursor_key):
+    """
+    요청 쿼리에서 (페이지 조회 여부, limit, 커서 위치 값) 추출.
+    limit/cursor가 둘 다 없으면 페이지 조회가 아님 (기존처럼 전체 반환)
+    """
+    if 'limit' not in args and 'cursor' not in args:
+        return False, None, None
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ValueError('limit은 정수여야 합니다.')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f'limit은 1~{MAX_LIMIT} 사이여야 합니다.')
+    position = None
+    if args.get('cursor'):
+        value = decode_cursor(args['cursor']).get(cursor_key)
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError('cursor 값이 올바르지 않습니다.')
+        position = value
+    return True, limit, position
+
+
+def parse_fields(raw):
+    """'id,name,times' → ('id', 'name', 'times'). 없으면 None (전체 필드)"""
+    if not raw:
+        return None
+    fields = tuple(f.strip() for f in raw.split(',') if f.strip())
+    return fields or None
+
+
+class RecordView(Mapping):
+    """
+    레코드 dict를 복사하지 않고 감싼 읽기 전용 뷰.
+    fields가 있으면 그 키만, hidden에 있는 키는 빼고 보인다. 원본이 바뀌면 뷰에도 그대로 보임
+    """
+    __slots__ = ('_record', '_fields', '_hidden')
+
+    def __init__(self, record, fields=None, hidden=frozenset()):
+        self._record = record
+        self._fields = fields
+        self._hidden = hidden
+
+    def __getitem__(self, key):
+        if key in self._hidden or (self._fields is not None and key not in self._fields):
+            raise KeyError(key)
+        return self._record[key]
+
+    def __iter__(self):
+        keys = self._record if self._fields is None else self._fields
+        for key in keys:
+            if key in self._record and key not in self._hidden:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"RecordView({self.to_dict()!r})"
+
+    def to_dict(self):
+        """보이는 키만 담은 새 dict (직렬화할 때 사용)"""
+        record = self._record
+        hidden = self._hidden
+        if self._fields is None:
+            # 숨길 키는 몇 개 안 되므로 통째로 복사(C 구현)한 뒤 빼는 게 키마다 거르는 것보다 빠름
+            visible = record.copy()
+            for key in hidden:
+                visible.pop(key, None)
+            return visible
+        return {k: record[k] for k in self._fields if k in record and k not in hidden}
+
+
+def project(records, fields, hidden=frozenset()):
+    """fields에 있는 키만 보이고 hidden 키는 빠진 뷰 목록 (둘 다 없으면 원본 목록 그대로)"""
+    if fields is None and not hidden:
+        return records
+    return [RecordView(record, fields, hidden) for record in records]
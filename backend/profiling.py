@@ -0,0 +1,218 @@
+"""
+요청 단위 프로파일링 + Server-Timing 헤더.
+
+- 프로파일링은 켜져 있을 때만:
+  - 관리자 헤더: X-Profile 헤더 값이 PROFILE_ADMIN_TOKEN과 같을 때
+  - 샘플링: PROFILE_SAMPLE_RATE 비율(0.0~1.0)만큼 무작위로
+- 형식
+  - pstats   : cProfile 결과 (python -m pstats, snakeviz 등으로 열기)
+  - collapsed: 요청 스레드의 호출 스택을 일정 간격으로 찍어 모은 "a;b;c 횟수" 형식
+               (flamegraph.pl, speedscope 등에 바로 넣을 수 있음)
+- 결과 파일 이름: 시각_메서드_라우트_걸린시간ms.확장자
+- 요청마다 단계별 시간(parse: 요청 본문 JSON 읽기, llm: OpenAI 호출, serialize: JSON 응답 만들기,
+  compute: 나머지)을 모아서 Server-Timing 헤더로 내려줌
+"""
+import cProfile
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from flask import Request, g, has_request_context, request
+
+PHASES = ('parse', 'llm', 'serialize')
+
+
+def add_phase(name, seconds):
+    """현재 요청의 단계별 시간에 더함 (요청 처리 스레드가 아니면 무시)"""
+    if has_request_context():
+        phases = g.get('phase_timings')
+        if phases is not None:
+            phases[name] = phases.get(name, 0.0) + seconds
+
+
+def server_timing_header(phases, total):
+    """{단계: 초} + 전체 초 → 'parse;dur=0.12, llm;dur=812.3, compute;dur=3.4, serialize;dur=0.5, total;dur=816.3'"""
+    measured = {name: phases.get(name, 0.0) for name in PHASES}
+    compute = max(0.0, total - sum(measured.values()))
+    parts = [
+        ('parse', measured['parse']),
+        ('llm', measured['llm']),
+        ('compute', compute),
+        ('serialize', measured['serialize']),
+        ('total', total)
+    ]
+    return ', '.join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in parts)
+
+
+class TimedRequest(Request):
+    """요청 본문 JSON 파싱 시간을 'parse' 단계로 기록하는 Request"""
+
+    def get_json(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().get_json(*args, **kwargs)
+        finally:
+            add_phase('parse', time.perf_counter() - started)
+
+
+class StackSampler:
+    """
+    대상 스레드의 호출 스택을 interval초마다 찍어서 세는 샘플링 프로파일러.
+    cProfile보다 가볍고, 결과를 collapsed 형식으로 바로 쓸 수 있다.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RequestProfiler:
+    """
+    Flask 앱에 붙여서 쓰는 요청 프로파일러.
+        profiler = RequestProfiler(profile_dir, sample_rate=0.01, admin_token='...', output='pstats')
+        profiler.init_app(app)
+    프로파일러끼리 겹치지 않도록 한 번에 한 요청만 프로파일링한다 (동시에 들어온 요청은 그냥 통과).
+    """
+
+    def __init__(self, profile_dir, sample_rate=0.0, admin_token=None, output='pstats',
+                 sample_interval=0.005, server_timing=False):
+        if output not in ('pstats', 'collapsed'):
+            raise ValueError(f"알 수 없는 프로파일 형식입니다: {output}")
+        self.profile_dir = profile_dir
+        self.sample_rate = sample_rate
+        self.admin_token = admin_token
+        self.output = output
+        self.sample_interval = sample_interval
+        self.server_timing = server_timing
+        self.profiled = 0
+        self.skipped_busy = 0
+        self._busy = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return bool(self.admin_token) or self.sample_rate > 0
+
+    def init_app(self, app):
+        app.request_class = TimedRequest
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def _requested(self):
+        if self.admin_token:
+            header = request.headers.get('X-Profile', '')
+            if header and hmac.compare_digest(header, self.admin_token):
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _before_request(self):
+        g.phase_timings = {}
+        g.profile_started = time.perf_counter()
+        if not self.enabled or not self._requested():
+            return
+        if not self._busy.acquire(blocking=False):
+            with self._stats_lock:
+                self.skipped_busy += 1
+            return
+        if self.output == 'pstats':
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(threading.get_ident(), self.sample_interval)
+            profiler.start()
+        g.active_profiler = profiler
+
+    def _stop_profiler(self):
+        profiler = g.pop('active_profiler', None)
+        if profiler is None:
+            return None
+        try:
+            if isinstance(profiler, cProfile.Profile):
+                profiler.disable()
+            else:
+                profiler.stop()
+        finally:
+            self._busy.release()
+        return profiler
+
+    def _after_request(self, response):
+        started = g.get('profile_started')
+        if started is None:
+            return response
+        profiler = self._stop_profiler()
+        total = time.perf_counter() - started
+        if self.server_timing or profiler is not None:
+            response.headers['Server-Timing'] = server_timing_header(g.get('phase_timings', {}), total)
+        if profiler is not None:
+            filename = self._write(profiler, total)
+            response.headers['X-Profile-File'] = filename
+        return response
+
+    def _teardown_request(self, error=None):
+        # after_request까지 못 간 경우(예외 등)에도 프로파일러는 꼭 끔
+        self._stop_profiler()
+
+    def _write(self, profiler, total):
+        route = request.endpoint or request.path
+        route = re.sub(r'[^A-Za-z0-9_.-]+', '_', route).strip('_') or 'root'
+        extension = 'prof' if self.output == 'pstats' else 'collapsed.txt'
+        filename = (
+            f"{datetime.now():%Y%m%d-%H%M%S}_{request.method}_{route}_"
+            f"{total * 1000:.0f}ms_{uuid.uuid4().hex[:6]}.{extension}"
+        )
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, filename)
+        if isinstance(profiler, cProfile.Profile):
+            profiler.dump_stats(path)
+        else:
+            profiler.dump(path)
+        with self._stats_lock:
+            self.profiled += 1
+        print(f"[PROFILE] {request.method} {request.path} {total * 1000:.1f}ms → {path}")
+        return filename
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'enabled': self.enabled,
+                'output': self.output,
+                'sample_rate': self.sample_rate,
+                'admin_header': bool(self.admin_token),
+                'profiled': self.profiled,
+                'skipped_busy': self.skipped_busy
+            }
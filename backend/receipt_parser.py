@@ -0,0 +1,200 @@
+"""
+약봉투 영수증 OCR 텍스트에서 약품 표(약품명 / 투약량 / 횟수 / 일수)를 읽는 파서.
+
+- 정규식은 모듈을 불러올 때 한 번만 컴파일
+- 제외/표 끝/헤더 키워드는 Aho-Corasick 자동자 하나로 묶어서, 줄마다 한 번만 훑고 분류
+- 숫자는 줄마다 한 번만 찾아서 이름 자르기, 복용 횟수/일수, 표 모양 판단에 같이 사용
+"""
+import re
+from collections import deque
+
+
+class KeywordMatcher:
+    """
+    여러 키워드를 한 번에 찾는 Aho-Corasick 자동자.
+    키워드마다 태그(문자열)를 붙여 두면, tags(text)가 text에 등장한 키워드들의 태그 집합을 돌려준다.
+    """
+
+    def __init__(self, tagged_keywords):
+        goto = [{}]
+        outputs = [set()]
+        for keyword, tag in tagged_keywords:
+            state = 0
+            for ch in keyword:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append(set())
+                state = nxt
+            outputs[state].add(tag)
+
+        # 실패 링크를 따라가며 전이를 미리 다 채워 둠 (훑을 때는 dict 조회 한 번)
+        alphabet = {ch for edges in goto for ch in edges}
+        fail = [0] * len(goto)
+        transitions = [dict() for _ in goto]
+        queue = deque()
+        for ch in alphabet:
+            nxt = goto[0].get(ch)
+            if nxt is not None:
+                transitions[0][ch] = nxt
+                queue.append(nxt)
+        while queue:
+            state = queue.popleft()
+            outputs[state] |= outputs[fail[state]]
+            for ch in alphabet:
+                nxt = goto[state].get(ch)
+                if nxt is not None:
+                    fail[nxt] = transitions[fail[state]].get(ch, 0)
+                    transitions[state][ch] = nxt
+                    queue.append(nxt)
+                else:
+                    fallback = transitions[fail[state]].get(ch, 0)
+                    if fallback:
+                        transitions[state][ch] = fallback
+
+        self._transitions = transitions
+        self._outputs = [frozenset(out) for out in outputs]
+
+    def tags(self, text):
+        transitions = self._transitions
+        outputs = self._outputs
+        found = set()
+        state = 0
+        for ch in text:
+            state = transitions[state].get(ch, 0)
+            if outputs[state]:
+                found |= outputs[state]
+        return found
+
+
+# 명백히 약이 아닌 줄 (사업자명/금액/성명/주소 등)
+SKIP_KEYWORDS = [
+    '사업자', '등록번호', '요양기관', '성명', '환자', '연락처', '전화', 'TEL',
+    '주소', '대구광역시', '광역시', '구 ', '동 ', '합계', '총 수 납', '총수납',
+    '요양급여', '본인부담', '영수증', '카드', '현금', '처방전', '조제', '조제료',
+    '사용상', '주의사항', '주의 하세요', '보험', '발행일', '금액', '총액',
+    '유효기간', '유효 사용기간', '유효사용기간', '유효 사용 기한', '주사액'
+]
+# 이 키워드가 나오면 표가 끝났다고 봄
+STOP_KEYWORDS = ['유효기간', '유효사용기간', '유효 사용기간', '사용상 주의사항']
+# 헤더 줄: "약품" + (횟수/일수/투약) 중 하나
+HEADER_NAME_KEYWORDS = ['약품', '약 품']
+HEADER_COLUMN_KEYWORDS = ['횟수', '일수', '투약', '투약량']
+
+LINE_MATCHER = KeywordMatcher(
+    [(k, 'skip') for k in SKIP_KEYWORDS]
+    + [(k, 'stop') for k in STOP_KEYWORDS]
+    + [(k, 'header_name') for k in HEADER_NAME_KEYWORDS]
+    + [(k, 'header_column') for k in HEADER_COLUMN_KEYWORDS]
+)
+
+_NUMERIC_ONLY_RE = re.compile(r'[\d\s,\.원]+')
+_NAME_END_RE = re.compile(r'\s+\d+(\s|$)')
+_DIGITS_RE = re.compile(r'\d+')
+_UNIT_SUFFIX_RE = re.compile(r'\s*\d+\s*(mg|MG|ml|ML)\b.*$')
+
+
+def _parse_line(line):
+    """parse_medication_line 본체. (약 dict 또는 None, 줄의 숫자 개수)"""
+    # 거의 숫자/원/콤마만 있으면 건너뛰기
+    if _NUMERIC_ONLY_RE.fullmatch(line):
+        return None, 0
+    # 약 이름: 처음으로 "공백 + 숫자"가 등장하기 전까지를 이름으로 사용
+    m = _NAME_END_RE.search(line)
+    name = line[:m.start()] if m else line
+    # 맨 끝의 숫자 두 개를 dosage/days로 사용 (없으면 None)
+    nums = _DIGITS_RE.findall(line)
+    dosage = days = None
+    if len(nums) >= 2:
+        dosage = int(nums[-2])
+        days = int(nums[-1])
+    # 이름 후처리: 뒤에 붙은 "250mg", "500ML" 같은 건 잘라냄
+    name = _UNIT_SUFFIX_RE.sub('', name.strip()).strip()
+    if not name:
+        return None, len(nums)
+    return {
+        "name": name,
+        "dosage": dosage,
+        "days": days,
+        "before_meal": None,
+        "times": []
+    }, len(nums)
+
+
+def parse_medication_line(line):
+    """
+    영수증 표의 한 줄을 가능한 한 '약 1개'로 해석한다.
+    - 숫자가 없어도 이름만 있으면 약으로 취급
+    - 숫자가 여러 개 있으면 마지막 두 개를 (1일 복용횟수, 복용일수)로 가정
+    """
+    line = line.strip()
+    if not line:
+        return None
+    return _parse_line(line)[0]
+
+
+def table_confidence(header_found, meds, number_counts):
+    """
+    표 직접 파싱 결과를 얼마나 믿을 수 있는지 0.0~1.0 점수로 계산.
+    - 헤더 줄(약품명 + 횟수/일수)을 찾았는가: 0.4
+    - 모든 행의 숫자 칸 개수가 같은가 (표 모양이 일정한가): 0.2
+    - 1일 횟수/일수가 그럴듯한 숫자로 채워져 있는가: 0.4
+    """
+    if not meds:
+        return 0.0
+    score = 0.4 if header_found else 0.0
+    most_common = max(set(number_counts), key=number_counts.count)
+    if most_common >= 2:
+        score += 0.2 * number_counts.count(most_common) / len(number_counts)
+    plausible = sum(
+        1 for m in meds
+        if m["dosage"] is not None and m["days"] is not None
+        and 1 <= m["dosage"] <= 6 and 1 <= m["days"] <= 180
+    )
+    score += 0.4 * plausible / len(meds)
+    return round(score, 3)
+
+
+def parse_medication_table(raw_text):
+    """
+    약봉투 영수증 하단 표를 최대한 느슨하게 파싱해서 (약 목록, 신뢰도 0.0~1.0)을 반환.
+    - 헤더 줄을 찾으면 그 다음 줄부터, 못 찾으면 전체 텍스트를 대상으로
+    - 숫자가 없어도 이름만 있으면 약으로 취급
+    - 사업자명/금액/성명/주소/유효기간 같은 건 강하게 제외
+    - 유효기간/주의사항 줄이 나오면 표가 끝났다고 보고 멈춤
+    """
+    if not raw_text:
+        return [], 0.0
+    # 줄마다 키워드 분류는 한 번만
+    lines = []
+    header_idx = None
+    for line in raw_text.splitlines():
+        line = line.strip()
+        tags = LINE_MATCHER.tags(line) if line else ()
+        if header_idx is None and 'header_name' in tags and 'header_column' in tags:
+            header_idx = len(lines) + 1
+        lines.append((line, tags))
+    header_found = header_idx is not None
+
+    meds = []
+    number_counts = []  # 행마다 숫자 칸 개수 (표 모양이 일정한지 보기 위함)
+    for line, tags in lines[header_idx or 0:]:
+        if not line:
+            continue
+        if 'stop' in tags:
+            break
+        if 'skip' in tags:
+            continue
+        parsed, number_count = _parse_line(line)
+        if not parsed:
+            continue
+        meds.append(parsed)
+        number_counts.append(number_count)
+    return meds, table_confidence(header_found, meds, number_counts)
+
+
+def extract_table_medications(raw_text):
+    """parse_medication_table에서 약 목록만"""
+    return parse_medication_table(raw_text)[0]
@@ -0,0 +1,128 @@
+import json
+import os
+import sqlite3
+import threading
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS medications (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    registered_date TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_medications_registered_date ON medications (registered_date);
+
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    medication_id INTEGER,
+    date TEXT NOT NULL,
+    time TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_date ON history (date);
+CREATE INDEX IF NOT EXISTS idx_history_medication_id ON history (medication_id);
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL
+);
+"""
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False)
+
+
+class SQLiteStore:
+    """
+    약/복용 기록/사용자 정보를 SQLite 파일에 영구 저장 (별도 DB 서버 없이 사용).
+    - WAL 모드: 읽기와 쓰기가 서로 막지 않음
+    - 여러 건 저장은 executemany + 트랜잭션 한 번으로 처리
+    - 쿼리는 모두 ? 바인딩 (sqlite3 모듈이 준비된 문장을 캐시해서 재사용)
+    - 약/사용자는 덮어쓰지 않고 INSERT만 함: 여러 워커가 같은 id를 발급하면 sqlite3.IntegrityError
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        folder = os.path.dirname(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        # sqlite3 연결은 스레드 간 공유가 안 되므로 스레드마다 하나씩
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, cached_statements=64)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write_many(self, sql, rows):
+        if not rows:
+            return
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(sql, rows)
+
+    # -------- 약 --------
+
+    def insert_medications(self, medications):
+        self._write_many(
+            "INSERT INTO medications (id, name, registered_date, data) VALUES (?, ?, ?, ?)",
+            [(m['id'], m.get('name'), m.get('registered_date'), _dumps(m)) for m in medications]
+        )
+
+    def max_id(self, table):
+        """medications/users 테이블에서 가장 큰 id (비어 있으면 0)"""
+        if table not in ('medications', 'users'):
+            raise ValueError(f"알 수 없는 테이블입니다: {table}")
+        row = self._connect().execute(f"SELECT MAX(id) FROM {table}").fetchone()
+        return row[0] or 0
+
+    def load_medications(self):
+        rows = self._connect().execute("SELECT data FROM medications ORDER BY id").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    # -------- 복용 기록 --------
+
+    def insert_history_records(self, records):
+        self._write_many(
+            "INSERT INTO history (medication_id, date, time, data) VALUES (?, ?, ?, ?)",
+            [(r.get('medication_id'), r['date'], r.get('time'), _dumps(r)) for r in records]
+        )
+
+    def load_history(self):
+        rows = self._connect().execute("SELECT data FROM history ORDER BY id").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def history_between(self, start_date, end_date):
+        """date 인덱스로 기간 조회 ('YYYY-MM-DD', 양 끝 포함)"""
+        rows = self._connect().execute(
+            "SELECT data FROM history WHERE date BETWEEN ? AND ? ORDER BY id",
+            (start_date, end_date)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def history_for_medication(self, medication_id):
+        rows = self._connect().execute(
+            "SELECT data FROM history WHERE medication_id = ? ORDER BY id",
+            (medication_id,)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    # -------- 사용자 --------
+
+    def insert_user(self, user):
+        self._write_many(
+            "INSERT INTO users (id, data) VALUES (?, ?)",
+            [(user['id'], _dumps(user))]
+        )
+
+    def load_users(self):
+        rows = self._connect().execute("SELECT data FROM users ORDER BY id").fetchall()
+        return [json.loads(row[0]) for row in rows]
@@ -0,0 +1,132 @@
+"""
+복용 기간 구간 인덱스(MedicationRepository)와 날짜별 집계(DailyRollup)가
+예전 방식(약/복용 기록 전체를 날짜마다 훑는 계산)과 같은 결과를 내는지 확인.
+무작위 약/복용 기록을 여러 번 만들어서 '오늘의 약'과 '이달의 복용 내역'을 비교한다.
+
+사용법: python -m pytest test_adherence.py  (또는 python test_adherence.py)
+"""
+import random
+from datetime import date, datetime, timedelta
+
+from adherence import DailyRollup
+from medication_store import MAX_COURSE_DAYS, MedicationRepository, validate_medication
+
+TIMES = ["아침", "점심", "저녁"]
+BASE_DAY = date(2025, 3, 15)
+
+
+# -------- 비교용: 예전 계산 (app.py에 있던 그대로) --------
+
+def legacy_today(medications, today):
+    result = []
+    for med in medications:
+        days_value = med.get('days') or 0
+        if days_value <= 0:
+            continue
+        days_diff = (today - datetime.fromisoformat(med['registered_date']).date()).days
+        if 0 <= days_diff < days_value:
+            for t in med['times']:
+                result.append((med['id'], t))
+    return result
+
+
+def legacy_month(medications, history, year, month):
+    daily_history = {}
+    for record in history:
+        d = datetime.fromisoformat(record['date'])
+        if d.year == year and d.month == month:
+            daily_history.setdefault(record['date'], []).append(record)
+
+    daily_status = {}
+    current = date(year, month, 1)
+    while current.month == month:
+        date_str = current.isoformat()
+        required = set()
+        for med in medications:
+            days_value = med.get('days') or 0
+            if days_value <= 0:
+                continue
+            days_diff = (current - datetime.fromisoformat(med['registered_date']).date()).days
+            if 0 <= days_diff < days_value:
+                required.update((med['id'], t) for t in med.get('times', []))
+        day_records = [r for r in history if r['date'] == date_str]
+        if required and any(r['time'] == '저녁' for r in day_records):
+            taken = {(r['medication_id'], r['time']) for r in day_records}
+            daily_status[date_str] = 'O' if required.issubset(taken) else 'X'
+        current += timedelta(days=1)
+    return daily_history, daily_status
+
+
+def make_data(seed, num_medications=40, num_history=600):
+    rng = random.Random(seed)
+    medications = []
+    for i in range(num_medications):
+        registered = datetime.combine(BASE_DAY - timedelta(days=rng.randint(0, 90)), datetime.min.time())
+        medications.append({
+            "id": i + 1,
+            "name": f"약{i}",
+            "days": rng.choice([1, 3, 5, 7, 14, 30, 90]),
+            "times": rng.sample(TIMES, rng.randint(1, 3)),
+            "registered_date": (registered + timedelta(hours=rng.randint(0, 23))).isoformat(),
+        })
+    history = []
+    for _ in range(num_history):
+        med = rng.choice(medications)
+        day = (BASE_DAY - timedelta(days=rng.randint(0, 90))).isoformat()
+        history.append({
+            'medication_id': med['id'],
+            'time': rng.choice(med['times']),
+            'date': day,
+            'completed_at': f"{day}T12:00:00"
+        })
+    return medications, history
+
+
+def build(medications, history):
+    repository = MedicationRepository()
+    repository.add_many([dict(m) for m in medications])
+    rollup = DailyRollup(repository)
+    rollup.rebuild(history)
+    return repository, rollup
+
+
+def test_today_matches_legacy_scan():
+    for seed in range(5):
+        medications, history = make_data(seed)
+        repository, _ = build(medications, history)
+        for offset in range(-100, 10):
+            day = BASE_DAY + timedelta(days=offset)
+            expected = legacy_today(medications, day)
+            actual = [(m['id'], t) for m in repository.active_on(day) for t in m['times']]
+            assert actual == expected, (seed, day)
+
+
+def test_month_matches_legacy_scan():
+    for seed in range(5):
+        medications, history = make_data(seed)
+        _, rollup = build(medications, history)
+        for year, month in [(2024, 12), (2025, 1), (2025, 2), (2025, 3), (2025, 4)]:
+            assert rollup.month(year, month) == legacy_month(medications, history, year, month), (seed, year, month)
+
+
+def test_validate_rejects_unreasonable_course():
+    good = {"days": 7, "registered_date": BASE_DAY.isoformat()}
+    validate_medication(good)
+    for bad in [
+        dict(good, days=MAX_COURSE_DAYS + 1),
+        dict(good, days=0),
+        dict(good, days="7"),
+        dict(good, registered_date="어제"),
+    ]:
+        try:
+            validate_medication(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"잘못된 값이 통과됨: {bad}")
+
+
+if __name__ == "__main__":
+    test_today_matches_legacy_scan()
+    test_month_matches_legacy_scan()
+    test_validate_rejects_unreasonable_course()
+    print("OK")
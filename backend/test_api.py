@@ -0,0 +1,220 @@
+"""
+Flask 테스트 클라이언트로 API를 직접 호출하는 테스트 (서버/OpenAI 없이 실행).
+OpenAI 클라이언트 자리에는 정해진 답을 돌려주는 가짜 클라이언트를 넣는다.
+
+사용법: python -m pytest test_api.py  (또는 python test_api.py)
+"""
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+
+import app as app_module
+from medication_store import MAX_COURSE_DAYS
+from sqlite_store import SQLiteStore
+
+RECEIPT = "약품명 1회투약량 1일투약횟수 투약일수\n시클러캡슐250mg 1 3 3일분\n코푸정 1 2 5일분"
+
+
+class _Message:
+    def __init__(self, content):
+        self.content = content
+
+
+class _Choice:
+    def __init__(self, content):
+        self.message = _Message(content)
+
+
+class _Response:
+    def __init__(self, content):
+        self.choices = [_Choice(content)]
+        self.usage = None
+
+
+class _Completions:
+    # 테스트가 Vision OCR 호출을 잠시 붙잡아 둘 때 사용 (set되어 있으면 바로 통과)
+    vision_gate = threading.Event()
+    vision_gate.set()
+
+    def create(self, model, messages, call_site=None, **kwargs):
+        system = messages[0]['content'] if isinstance(messages[0]['content'], str) else ''
+        if 'OCR 엔진' in system:
+            assert self.vision_gate.wait(10)
+            return _Response(RECEIPT)
+        if '약 설명' in system:
+            count = int(messages[1]['content'].split('약은 총 ')[1].split('개')[0])
+            return _Response('\n'.join(f'흰색 동그란 알약 {i}' for i in range(count)))
+        return _Response(json.dumps({"raw_text": RECEIPT, "medications": []}, ensure_ascii=False))
+
+
+class _Chat:
+    completions = _Completions()
+
+
+class FakeClient:
+    chat = _Chat()
+
+
+def make_client():
+    app_module.client = FakeClient()
+    return app_module.app.test_client()
+
+
+def read_events(body):
+    """server-sent events 본문 → [(event, data dict), ...] (keep-alive 주석은 건너뜀)"""
+    events = []
+    for block in body.split('\n\n'):
+        event, data = 'message', None
+        for line in block.splitlines():
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: '):
+                data = json.loads(line[len('data: '):])
+        if data is not None:
+            events.append((event, data))
+    return events
+
+
+def test_async_ocr_job_streams_until_done():
+    client = make_client()
+    image = base64.b64encode(b'\xff\xd8async-ocr-job' * 50).decode()
+    response = client.post('/api/ocr?async=1', json={'image': image})
+    assert response.status_code == 202
+    events_url = response.get_json()['events_url']
+
+    events = read_events(client.get(events_url).get_data(as_text=True))
+    stage, last = events[-1]
+    assert stage == 'done'
+    assert last['status'] == 'done' and last['status_code'] == 200
+    names = [med['name'] for med in last['result']['medications']]
+    assert names and all('image_hash' not in med for med in last['result']['medications'])
+
+    # 같은 작업을 상태 조회 API로 봐도 결과가 같아야 함
+    job = client.get(f"/api/ocr/jobs/{last['job_id']}").get_json()
+    assert [med['name'] for med in job['result']['medications']] == names
+
+
+def wait_for_job(client, job_id, condition, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/api/ocr/jobs/{job_id}").get_json()
+        if condition(job):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"작업 상태가 바뀌지 않음: {job_id}")
+
+
+def test_coalesced_ocr_job_reports_progress():
+    client = make_client()
+    image = base64.b64encode(b'\xff\xd8coalesced-ocr-job' * 50).decode()
+    gate = _Completions.vision_gate
+    gate.clear()
+    try:
+        leader = client.post('/api/ocr?async=1', json={'image': image}).get_json()['job_id']
+        wait_for_job(client, leader, lambda job: job['stage'] == 'ocr')
+        # 같은 사진의 두 번째 작업은 진행 중인 OCR에 합류하고, 지금 단계(ocr)부터 받아야 함
+        follower = client.post('/api/ocr?async=1', json={'image': image}).get_json()['job_id']
+        wait_for_job(client, follower, lambda job: job['stage'] == 'ocr')
+    finally:
+        gate.set()
+    for job_id in (leader, follower):
+        job = wait_for_job(client, job_id, lambda job: job['status'] in ('done', 'failed'))
+        assert job['status_code'] == 200
+        stages = [entry['stage'] for entry in job['stages']]
+        assert stages[:3] == ['queued', 'ocr', 'extract'] and stages[-1] == 'done', stages
+
+
+def test_medication_pages_cover_list_once():
+    client = make_client()
+    for i in range(7):
+        assert client.post('/api/medications', json={'name': f'페이지약{i}', 'days': 3}).status_code == 200
+    expected = [m['id'] for m in reversed(app_module.medications_db.all())]
+
+    seen, cursor = [], None
+    while True:
+        query = '/api/medications?limit=3&fields=id,name' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(query).get_json()
+        assert all(set(med) == {'id', 'name'} for med in body['medications'])
+        seen.extend(med['id'] for med in body['medications'])
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert seen == expected
+
+    for query in ['/api/medications?cursor=!!!', '/api/medications?limit=0', '/api/history?cursor=e30']:
+        response = client.get(query)
+        assert response.status_code == 400 and 'error' in response.get_json(), query
+
+
+def test_writes_invalidate_etags():
+    client = make_client()
+    medications = client.get('/api/medications')
+    month = client.get('/api/history/month')
+    assert client.get('/api/medications', headers={'If-None-Match': medications.headers['ETag']}).status_code == 304
+
+    created = client.post('/api/medications', json={'name': 'ETag약', 'days': 3}).get_json()['medication']
+    response = client.get('/api/medications', headers={'If-None-Match': medications.headers['ETag']})
+    assert response.status_code == 200
+    assert created['id'] in [m['id'] for m in response.get_json()['medications']]
+
+    # 복용 완료는 history 묶음을 올리므로 이달의 복용 내역도 다시 계산
+    month_etag = client.get('/api/history/month').headers['ETag']
+    assert month_etag != month.headers['ETag']
+    assert client.post('/api/medications/complete', json={'medication_id': created['id'], 'time': '아침'}).status_code == 200
+    assert client.get('/api/history/month', headers={'If-None-Match': month_etag}).status_code == 200
+
+
+def test_create_medication_rejects_bad_course():
+    client = make_client()
+    before = len(app_module.medications_db)
+    for days in [0, -1, MAX_COURSE_DAYS + 1, 1_000_000]:
+        response = client.post('/api/medications', json={'name': '잘못된 약', 'days': days})
+        assert response.status_code == 400, days
+        assert 'days' in response.get_json()['error']
+    response = client.post('/api/medications', json={'name': '잘못된 약', 'days': 3, 'registered_date': '어제'})
+    assert response.status_code == 400 and 'registered_date' in response.get_json()['error']
+    # 거절된 요청은 아무것도 저장하지 않음
+    assert len(app_module.medications_db) == before
+
+    for days in [1, MAX_COURSE_DAYS]:
+        response = client.post('/api/medications', json={'name': '경계 약', 'days': days})
+        assert response.status_code == 200 and response.get_json()['medication']['days'] == days
+
+
+def test_sqlite_id_collision_does_not_overwrite_other_worker():
+    client = make_client()
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'app.sqlite3')
+        original = app_module.sqlite_store
+        app_module.sqlite_store = SQLiteStore(path)
+        try:
+            # 다른 워커가 이 워커가 다음에 발급할 id로 약/사용자를 먼저 저장한 상황
+            other_worker = SQLiteStore(path)
+            taken_med_id = app_module.medications_db.next_id() + 1
+            other_worker.insert_medications([{'id': taken_med_id, 'name': '다른 워커 약'}])
+            other_worker.insert_user({'id': app_module.next_user_id(), 'name': '다른 워커 사용자'})
+
+            response = client.post('/api/medications', json={'name': '이 워커 약', 'days': 3})
+            assert response.status_code == 200
+            assert response.get_json()['medication']['id'] > taken_med_id
+            response = client.post('/api/users', json={'name': '이 워커 사용자'})
+            assert response.status_code == 200
+
+            store = SQLiteStore(path)
+            assert {m['name'] for m in store.load_medications()} == {'다른 워커 약', '이 워커 약'}
+            assert {u['name'] for u in store.load_users()} == {'다른 워커 사용자', '이 워커 사용자'}
+        finally:
+            app_module.sqlite_store = original
+
+
+if __name__ == "__main__":
+    test_async_ocr_job_streams_until_done()
+    test_coalesced_ocr_job_reports_progress()
+    test_medication_pages_cover_list_once()
+    test_writes_invalidate_etags()
+    test_create_medication_rejects_bad_course()
+    test_sqlite_id_collision_does_not_overwrite_other_worker()
+    print("OK")
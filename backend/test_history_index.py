@@ -0,0 +1,57 @@
+"""
+복용 기록 날짜 인덱스(HistoryDateIndex)가 목록을 거꾸로 훑는 예전 방식과 같은 위치를 같은 순서로 내는지 확인.
+날짜가 저장 순서와 어긋난 기록(과거 날짜로 불러온 기록 등)도 섞어서 비교한다.
+
+사용법: python -m pytest test_history_index.py  (또는 python test_history_index.py)
+"""
+import random
+from datetime import date, timedelta
+
+from history_index import HistoryDateIndex
+
+BASE_DAY = date(2025, 3, 15)
+
+
+def legacy_positions(history, start_date, end_date, before):
+    return [pos for pos in range(before - 1, -1, -1) if start_date <= history[pos]['date'] <= end_date]
+
+
+def make_history(seed, count=2000):
+    rng = random.Random(seed)
+    return [{'date': (BASE_DAY - timedelta(days=rng.randint(0, 120))).isoformat()} for _ in range(count)]
+
+
+def test_positions_match_legacy_scan():
+    for seed in range(5):
+        history = make_history(seed)
+        rng = random.Random(seed)
+        index = HistoryDateIndex()
+        stored = []
+        # 여러 번 나눠서 저장 (save_history_records처럼)
+        for start in range(0, len(history), 300):
+            index.append(stored, history[start:start + 300])
+        assert stored == history
+        for _ in range(50):
+            start = (BASE_DAY - timedelta(days=rng.randint(0, 130))).isoformat()
+            end = (BASE_DAY - timedelta(days=rng.randint(0, 130))).isoformat()
+            before = rng.randint(0, len(history))
+            expected = legacy_positions(history, start, end, before)
+            assert list(index.positions_between(start, end, before=before)) == expected, (seed, start, end, before)
+
+
+def test_rebuild_matches_append():
+    history = make_history(7)
+    appended = HistoryDateIndex()
+    appended.append([], history)
+    rebuilt = HistoryDateIndex()
+    rebuilt.rebuild(history)
+    start, end = (BASE_DAY - timedelta(days=30)).isoformat(), BASE_DAY.isoformat()
+    assert list(rebuilt.positions_between(start, end)) == list(appended.positions_between(start, end))
+    rebuilt.rebuild([])
+    assert list(rebuilt.positions_between(start, end)) == []
+
+
+if __name__ == "__main__":
+    test_positions_match_legacy_scan()
+    test_rebuild_matches_append()
+    print("OK")
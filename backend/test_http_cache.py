@@ -0,0 +1,71 @@
+"""
+조건부 GET(http_cache.py) 테스트: ETag/304, 응답 본문 캐시, 쓰기 후 버전 증가.
+작은 Flask 앱에 데코레이터를 붙여서 라우트가 실제로 몇 번 실행됐는지 센다.
+
+사용법: python -m pytest test_http_cache.py  (또는 python test_http_cache.py)
+"""
+from flask import Flask, jsonify, request
+
+from cache import LRUCache
+from http_cache import CollectionVersions, conditional_get
+
+
+def make_app():
+    app = Flask(__name__)
+    versions = CollectionVersions(['medications', 'history'])
+    calls = []
+
+    @app.route('/items')
+    @conditional_get(versions, LRUCache(maxsize=16), 'medications')
+    def items():
+        calls.append(request.full_path)
+        if request.args.get('fail'):
+            return jsonify({'error': '실패'}), 400
+        return jsonify({'calls': len(calls)})
+
+    return app.test_client(), versions, calls
+
+
+def test_etag_and_304():
+    client, _, calls = make_app()
+    first = client.get('/items')
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'no-cache'
+    etag = first.headers['ETag']
+
+    again = client.get('/items', headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.headers['ETag'] == etag and again.data == b''
+    # ETag가 없는 다른 클라이언트는 캐시된 본문을 받음 (라우트는 한 번만 실행)
+    cached = client.get('/items')
+    assert cached.status_code == 200 and cached.data == first.data and cached.headers['ETag'] == etag
+    assert len(calls) == 1
+
+
+def test_bump_changes_etag():
+    client, versions, calls = make_app()
+    etag = client.get('/items').headers['ETag']
+
+    # 관계없는 묶음이 바뀌어도 ETag는 그대로
+    versions.bump('history')
+    assert client.get('/items', headers={'If-None-Match': etag}).status_code == 304
+
+    versions.bump('medications')
+    fresh = client.get('/items', headers={'If-None-Match': etag})
+    assert fresh.status_code == 200 and fresh.headers['ETag'] != etag
+    assert fresh.get_json() == {'calls': 2}
+    assert len(calls) == 2
+
+
+def test_query_is_part_of_etag_and_errors_are_not_cached():
+    client, _, calls = make_app()
+    assert client.get('/items?a=1').headers['ETag'] != client.get('/items?a=2').headers['ETag']
+    for _ in range(2):
+        response = client.get('/items?fail=1')
+        assert response.status_code == 400 and 'ETag' not in response.headers
+    assert len(calls) == 4
+
+
+if __name__ == "__main__":
+    test_etag_and_304()
+    test_bump_changes_etag()
+    test_query_is_part_of_etag_and_errors_are_not_cached()
+    print("OK")
@@ -0,0 +1,96 @@
+"""
+OpenAI 전송 계층(ResilientClient) 테스트. 실제 네트워크 대신 httpx.MockTransport로 응답한다.
+
+사용법: python -m pytest test_llm_transport.py  (또는 python test_llm_transport.py)
+"""
+import json
+import tempfile
+
+import httpx
+import openai
+
+from llm_backend import CassetteBackend
+from llm_transport import ResilientClient
+
+TIMEOUTS = {'default': 30.0, 'ocr': 60.0, 'chat': 20.0}
+
+
+def mock_openai(handler):
+    return openai.OpenAI(
+        api_key='sk-test',
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)),
+        max_retries=0
+    )
+
+
+def ok_response(request):
+    body = json.loads(request.content)
+    return httpx.Response(200, json={
+        "id": "x", "object": "chat.completion", "created": 0, "model": body['model'],
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "네"}}]
+    })
+
+
+def ask(client, call_site, text='안녕'):
+    return client.chat.completions.create(
+        call_site=call_site, model='gpt-4o-mini', messages=[{'role': 'user', 'content': text}]
+    )
+
+
+def test_record_mode_keeps_per_site_timeouts():
+    seen = []
+
+    def handler(request):
+        seen.append(request.extensions['timeout'])
+        return ok_response(request)
+
+    with tempfile.TemporaryDirectory() as folder:
+        backend = CassetteBackend(folder, mode='record', inner=mock_openai(handler))
+        client = ResilientClient(backend, TIMEOUTS, connect_timeout=2.0)
+        ask(client, 'ocr')
+        ask(client, 'chat')
+        assert backend.stats()['recorded'] == 2
+    assert seen[0] == {'connect': 2.0, 'read': 60.0, 'write': 60.0, 'pool': 60.0}
+    assert seen[1] == {'connect': 2.0, 'read': 20.0, 'write': 20.0, 'pool': 20.0}
+
+
+def test_bad_request_does_not_close_breaker():
+    state = {'mode': 'down'}
+
+    def handler(request):
+        if state['mode'] == 'down':
+            return httpx.Response(503, json={'error': {'message': 'down'}})
+        if state['mode'] == 'bad':
+            return httpx.Response(400, json={'error': {'message': 'bad request'}})
+        return ok_response(request)
+
+    client = ResilientClient(mock_openai(handler), TIMEOUTS, max_attempts=1,
+                             failure_threshold=2, reset_timeout=0.0)
+    for _ in range(2):
+        try:
+            ask(client, 'chat')
+        except openai.InternalServerError:
+            pass
+    assert client.stats()['breakers']['chat'] == {'state': 'open', 'failures': 2, 'rejected': 0}
+
+    # reset_timeout이 지나 시험 호출이 잘못된 요청(400)이면 브레이커는 닫히지 않고 실패 횟수도 그대로
+    state['mode'] = 'bad'
+    try:
+        ask(client, 'chat')
+        raise AssertionError("400 응답이 그대로 올라와야 함")
+    except openai.BadRequestError:
+        pass
+    assert client.stats()['breakers']['chat']['state'] == 'half_open'
+    assert client.stats()['breakers']['chat']['failures'] == 2
+
+    # 다음 시험 호출이 실제로 성공해야 닫힘
+    state['mode'] = 'ok'
+    ask(client, 'chat')
+    assert client.stats()['breakers']['chat']['state'] == 'closed'
+    assert client.stats()['breakers']['chat']['failures'] == 0
+
+
+if __name__ == "__main__":
+    test_record_mode_keeps_per_site_timeouts()
+    test_bad_request_does_not_close_breaker()
+    print("OK")
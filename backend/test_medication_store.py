@@ -0,0 +1,106 @@
+"""
+복용 기간 구간 인덱스(ActiveIntervalIndex)와 MedicationRepository의 기간 조회 경계 테스트.
+복용 기간은 등록일부터 days일 (등록일 포함, 마지막날 = 등록일 + days - 1).
+
+사용법: python -m pytest test_medication_store.py  (또는 python test_medication_store.py)
+"""
+import random
+from datetime import date, timedelta
+
+from medication_store import (MAX_COURSE_DAYS, ActiveIntervalIndex, MedicationRepository, course_interval,
+                              validate_medication)
+
+START = date(2025, 3, 15)
+# 버킷(구간 길이 2^k) 경계 앞뒤와 최대 복용 일수
+COURSE_LENGTHS = [1, 2, 3, 4, 7, 8, 9, 15, 16, 17, 31, 32, 33, 364, MAX_COURSE_DAYS]
+
+
+def medication(medication_id, days, registered=START, hour=0, times=("아침",)):
+    return {
+        "id": medication_id,
+        "name": f"약{medication_id}",
+        "days": days,
+        "times": list(times),
+        "registered_date": f"{registered.isoformat()}T{hour:02d}:30:00"
+    }
+
+
+def test_course_first_and_last_day():
+    repository = MedicationRepository()
+    for i, days in enumerate(COURSE_LENGTHS, start=1):
+        repository.add(medication(i, days))
+    for i, days in enumerate(COURSE_LENGTHS, start=1):
+        last = START + timedelta(days=days - 1)
+        assert i not in [m['id'] for m in repository.active_on(START - timedelta(days=1))]
+        assert i in [m['id'] for m in repository.active_on(START)]
+        assert i in [m['id'] for m in repository.active_on(last)], days
+        assert i not in [m['id'] for m in repository.active_on(last + timedelta(days=1))], days
+
+
+def test_registered_time_of_day_does_not_shift_course():
+    # 밤 11시에 등록해도 그날이 복용 첫날
+    repository = MedicationRepository()
+    repository.add(medication(1, 3, hour=23))
+    assert [m['id'] for m in repository.active_on(START)] == [1]
+    assert [m['id'] for m in repository.active_on(START + timedelta(days=2))] == [1]
+    assert repository.active_on(START + timedelta(days=3)) == []
+
+
+def test_course_interval_rejects_missing_course():
+    assert course_interval(medication(1, 0)) is None
+    assert course_interval(medication(1, -3)) is None
+    assert course_interval(medication(1, True)) is None
+    assert course_interval({"days": 3, "registered_date": "어제"}) is None
+    # 날짜 범위 끝 근처에서도 마지막날이 date.max를 넘지 않음
+    assert course_interval(medication(1, MAX_COURSE_DAYS, registered=date.max))[1] == date.max.toordinal()
+
+
+def test_validate_medication_course_limits():
+    validate_medication(medication(1, 1))
+    validate_medication(medication(1, MAX_COURSE_DAYS))
+    for days in (0, -1, MAX_COURSE_DAYS + 1, 3.5, None):
+        try:
+            validate_medication(medication(1, days))
+        except ValueError:
+            continue
+        raise AssertionError(f"잘못된 days가 통과됨: {days}")
+
+
+def test_active_between_clips_to_range():
+    repository = MedicationRepository()
+    repository.add(medication(1, 10))
+    repository.add(medication(2, 1, registered=START + timedelta(days=20)))
+    found = repository.active_between(START + timedelta(days=5), START + timedelta(days=30))
+    assert [(m['id'], first, last) for m, first, last in found] == [
+        (1, START + timedelta(days=5), START + timedelta(days=9)),
+        (2, START + timedelta(days=20), START + timedelta(days=20)),
+    ]
+    assert repository.active_between(START + timedelta(days=10), START + timedelta(days=19)) == []
+
+
+def test_interval_index_matches_brute_force():
+    rng = random.Random(3)
+    index = ActiveIntervalIndex()
+    intervals = []
+    for key in range(500):
+        start = rng.randint(0, 2000)
+        end = start + rng.choice(COURSE_LENGTHS) - 1
+        index.add(key, start, end)
+        intervals.append((start, end, key))
+    assert len(index) == len(intervals)
+    for _ in range(300):
+        lo = rng.randint(-50, 2500)
+        hi = lo + rng.randint(0, 60)
+        expected = sorted(item for item in intervals if item[0] <= hi and item[1] >= lo)
+        assert sorted(index.overlapping(lo, hi)) == expected, (lo, hi)
+        assert sorted(index.stabbing(lo)) == sorted(k for s, e, k in intervals if s <= lo <= e)
+
+
+if __name__ == "__main__":
+    test_course_first_and_last_day()
+    test_registered_time_of_day_does_not_shift_course()
+    test_course_interval_rejects_missing_course()
+    test_validate_medication_course_limits()
+    test_active_between_clips_to_range()
+    test_interval_index_matches_brute_force()
+    print("OK")
@@ -0,0 +1,75 @@
+"""
+목록 API 공통 도구(pagination.py) 테스트: 커서 왕복, 잘못된 커서/limit, 필드 선택 뷰.
+
+사용법: python -m pytest test_pagination.py  (또는 python test_pagination.py)
+"""
+import base64
+
+from pagination import (DEFAULT_LIMIT, MAX_LIMIT, RecordView, decode_cursor, encode_cursor, parse_fields, parse_page_args,
+                        project)
+
+
+def expect_value_error(func, *args):
+    try:
+        func(*args)
+    except ValueError:
+        return
+    raise AssertionError(f"ValueError가 나야 함: {args}")
+
+
+def test_cursor_round_trip():
+    for position in [{'id': 1}, {'pos': 0}, {'pos': 10 ** 12}, {'id': 42, 'extra': '한글'}]:
+        cursor = encode_cursor(position)
+        # URL에 그대로 쓸 수 있어야 함 (패딩/+/ 없음)
+        assert '=' not in cursor and '+' not in cursor and '/' not in cursor
+        assert decode_cursor(cursor) == position
+        key, value = next(iter(position.items()))
+        assert parse_page_args({'cursor': cursor}, key) == (True, DEFAULT_LIMIT, value)
+
+
+def test_invalid_cursor():
+    not_a_dict = base64.urlsafe_b64encode(b'[1, 2]').decode().rstrip('=')
+    broken_json = base64.urlsafe_b64encode(b'{"id"').decode()
+    for cursor in ['!!!', '한글', not_a_dict, broken_json]:
+        expect_value_error(decode_cursor, cursor)
+        expect_value_error(parse_page_args, {'cursor': cursor}, 'id')
+    # '{}'는 읽히지만 필요한 키가 없으므로 거절
+    assert decode_cursor(encode_cursor({})) == {}
+    expect_value_error(parse_page_args, {'cursor': encode_cursor({})}, 'id')
+    for value in ['3', 1.5, True, None]:
+        expect_value_error(parse_page_args, {'cursor': encode_cursor({'id': value})}, 'id')
+    # 다른 목록의 커서(키가 다름)도 거절
+    expect_value_error(parse_page_args, {'cursor': encode_cursor({'pos': 3})}, 'id')
+
+
+def test_limit_bounds():
+    assert parse_page_args({}, 'id') == (False, None, None)
+    assert parse_page_args({'limit': '1'}, 'id') == (True, 1, None)
+    assert parse_page_args({'limit': str(MAX_LIMIT)}, 'id') == (True, MAX_LIMIT, None)
+    for limit in ['0', str(MAX_LIMIT + 1), '-1', 'ten']:
+        expect_value_error(parse_page_args, {'limit': limit}, 'id')
+
+
+def test_fields_and_record_view():
+    assert parse_fields(None) is None
+    assert parse_fields(' , ') is None
+    assert parse_fields('id, name,,times') == ('id', 'name', 'times')
+
+    record = {'id': 1, 'name': '타이레놀', 'image_hash': 'a' * 64}
+    view = RecordView(record, ('name', 'image_hash', 'missing'), frozenset(['image_hash']))
+    assert dict(view) == view.to_dict() == {'name': '타이레놀'}
+    assert 'id' not in view and len(view) == 1
+    # 원본을 복사하지 않으므로 바뀐 값이 그대로 보임
+    record['name'] = '타이레놀정'
+    assert view['name'] == '타이레놀정'
+    assert project([record], None, frozenset(['image_hash']))[0].to_dict() == {'id': 1, 'name': '타이레놀정'}
+    records = [record]
+    assert project(records, None) is records
+
+
+if __name__ == "__main__":
+    test_cursor_round_trip()
+    test_invalid_cursor()
+    test_limit_bounds()
+    test_fields_and_record_view()
+    print("OK")
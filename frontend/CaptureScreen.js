@@ -3,6 +3,27 @@ import { View, Text, StyleSheet, TouchableOpacity, Alert, Image } from 'react-na
 import { Camera } from 'expo-camera';
 import * as ImagePicker from 'expo-image-picker';
 
+const API_BASE_URL = 'https://sibaljom.onrender.com/api';
+
+// 촬영한 사진 파일을 base64로 바꾸지 않고 multipart/form-data로 그대로 업로드
+async function uploadCapturedImage(uri) {
+  const formData = new FormData();
+  formData.append('image', {
+    uri,
+    name: 'capture.jpg',
+    type: 'image/jpeg',
+  });
+  const response = await fetch(`${API_BASE_URL}/ocr`, {
+    method: 'POST',
+    body: formData,
+  });
+  const data = await response.json();
+  if (!response.ok || !data.success) {
+    throw new Error(data.error || `서버 오류 (${response.status})`);
+  }
+  return data;
+}
+
 export default function CaptureScreen() {
   const [hasPermission, setHasPermission] = useState(null);
   const [type, setType] = useState(Camera.Constants.Type.back);
@@ -47,13 +68,16 @@ export default function CaptureScreen() {
         // 촬영된 이미지 URI를 상태로 저장
         setCapturedImage(photo.uri);
         
-        // 이미지 URI를 콘솔에 출력 (추후 업로드/처리용)
         console.log('Captured Image URI:', photo.uri);
+
+        // 서버에 업로드해서 약 정보 추출
+        const data = await uploadCapturedImage(photo.uri);
+        const names = (data.medications || []).map((med) => med.name).join(', ');
         
         // 촬영 성공 알림
         Alert.alert(
           '촬영 완료',
-          '사진이 촬영되었습니다.',
+          names ? `등록된 약: ${names}` : '사진이 촬영되었습니다.',
           [
             {
               text: '다시 촬영',
@@ -67,7 +91,7 @@ export default function CaptureScreen() {
         );
       } catch (error) {
         console.error('Error taking picture:', error);
-        Alert.alert('오류', '사진 촬영 중 오류가 발생했습니다.');
+        Alert.alert('오류', `사진 처리 중 오류가 발생했습니다: ${error.message}`);
       }
     }
   };
@@ -65,10 +65,13 @@
         messageDiv.appendChild(bubble);
         chatMessages.appendChild(messageDiv);
         scrollToBottom();
+        return bubble;
     }
 
     // 백엔드 API URL 설정 (config.js에서 가져오거나 기본값 사용)
     const API_BASE_URL = (typeof API_CONFIG !== 'undefined' && API_CONFIG.BASE_URL) || 'https://sibaljom.onrender.com/api';
+    // 스트리밍 응답 사용 여부 (config.js의 CHAT_STREAMING, 기본값 false)
+    const CHAT_STREAMING = typeof API_CONFIG !== 'undefined' && API_CONFIG.CHAT_STREAMING === true;
     
     // GPT API를 사용한 챗봇 응답 생성
     async function getBotResponse(userMessage) {
@@ -100,6 +103,77 @@
         }
     }
 
+    // 스트리밍 챗봇 응답: 토큰이 도착하는 대로 말풍선에 이어 붙임
+    async function streamBotResponse(userMessage) {
+        const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            },
+            body: JSON.stringify({
+                message: userMessage
+            })
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error('서버 응답 오류');
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder('utf-8');
+        let buffer = '';
+        let bubble = null;
+        let text = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // 이벤트는 빈 줄(\n\n)로 구분됨
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const rawEvent = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+
+                let eventName = 'message';
+                let dataLine = '';
+                rawEvent.split('\n').forEach((line) => {
+                    if (line.startsWith('event:')) eventName = line.slice(6).trim();
+                    if (line.startsWith('data:')) dataLine += line.slice(5).trim();
+                });
+                if (!dataLine) continue;
+
+                const data = JSON.parse(dataLine);
+                if (eventName === 'error') {
+                    // 이미 일부를 보여줬으면 그대로 두고 끝냄 (같은 답을 두 번 보여주지 않도록)
+                    if (bubble) {
+                        bubble.textContent = text + '\n(답변이 중간에 끊겼습니다. 다시 질문해주세요.)';
+                        return;
+                    }
+                    throw new Error(data.error || '서버 응답 오류');
+                }
+                if (eventName === 'done') {
+                    text = data.response || text;
+                } else if (data.delta) {
+                    text += data.delta;
+                }
+                // 첫 토큰이 오면 타이핑 인디케이터를 말풍선으로 교체
+                if (!bubble) {
+                    bubble = addBotMessage(text);
+                } else {
+                    bubble.textContent = text;
+                    scrollToBottom();
+                }
+            }
+        }
+
+        if (!bubble) {
+            addBotMessage('죄송합니다. 응답을 생성할 수 없습니다.');
+        }
+    }
+
     // 메시지 전송 처리
     async function sendMessage() {
         const message = messageInput.value.trim();
@@ -112,6 +186,16 @@
         // 타이핑 인디케이터 표시
         addTypingIndicator();
 
+        // 스트리밍을 켜 두었으면 토큰 단위로 표시, 실패하면 기존 방식으로 재시도
+        if (CHAT_STREAMING) {
+            try {
+                await streamBotResponse(message);
+                return;
+            } catch (error) {
+                console.error('챗봇 스트리밍 오류:', error);
+            }
+        }
+
         // GPT API를 통한 봇 응답
         try {
             const botResponse = await getBotResponse(message);
@@ -3,7 +3,10 @@
 const API_CONFIG = {
     BASE_URL: 'https://sibaljom.onrender.com/api',
     // 로컬 개발 시에는 아래 주석을 해제하고 위를 주석 처리하세요
-    // BASE_URL: 'http://localhost:5001/api'
+    // BASE_URL: 'http://localhost:5001/api',
+
+    // true로 바꾸면 챗봇 답변을 /api/chat/stream으로 받아 글자가 오는 대로 표시합니다
+    CHAT_STREAMING: false
 };
 
 // 식사 시간 설정 (알림 시간 계산용)